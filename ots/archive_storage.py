@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from ZODB import DB, FileStorage
+
+from .timesheet_archive import TimesheetArchive
+
+
+class ArchiveManager:
+    """
+    Opens the yearly archives of a filestore, each of them a separate
+    database next to the filestore, when they are needed. Archives are
+    opened read only, except when archiving more timesheets into them.
+
+    Never stored in the filestore: a new manager is created for each command
+    and closed once the command is done.
+    """
+
+    def __init__(self, config_dir, filestore_file_name):
+        """
+        :param str config_dir: the directory of the filestore
+        :param str filestore_file_name: file name of the filestore, used as
+            the base of the archives' file names
+        """
+        self.config_dir = Path(config_dir)
+        self.filestore_stem = Path(filestore_file_name).stem
+        self._open = {}  # year -> (DB, connection)
+
+    def get_path(self, year):
+        """
+        :return Path: the file of the archive of the year
+        """
+        return self.config_dir / f"{self.filestore_stem}-archive-{year}.fs"
+
+    def get_archive(self, year):
+        """
+        Open the archive of a year for reading, unless it is open already.
+        :param int year:
+        :return TimesheetArchive: or None if the year has no archive
+        """
+        if year not in self._open:
+            path = self.get_path(year)
+            if not path.exists():
+                return None
+            db = DB(FileStorage.FileStorage(str(path), read_only=True))
+            self._open[year] = (db, db.open())
+        _db, connection = self._open[year]
+        return getattr(connection.root, 'timesheet_archive', None)
+
+    def archive_days(self, year, days):
+        """
+        Write the timesheets of some days into the archive of a year,
+        creating the archive if needed. The archive is committed right away.
+        :param int year:
+        :param days: iterable of (date ordinal, Timesheets of the date)
+        """
+        self._close_year(year)
+        db = DB(FileStorage.FileStorage(str(self.get_path(year))))
+        try:
+            with db.transaction() as connection:
+                if not hasattr(connection.root, 'timesheet_archive'):
+                    connection.root.timesheet_archive = TimesheetArchive(year)
+                archive = connection.root.timesheet_archive
+                for date_ordinal, timesheets in days:
+                    archive.add_day(date_ordinal, timesheets)
+        finally:
+            db.close()
+
+    def _close_year(self, year):
+        db, connection = self._open.pop(year, (None, None))
+        if db is not None:
+            # Archives are read only, nothing changed in them is kept
+            connection.transaction_manager.abort()
+            connection.close()
+            db.close()
+
+    def close(self):
+        for year in list(self._open):
+            self._close_year(year)
@@ -0,0 +1,103 @@
+"""
+Updating the timesheets waiting in the outbox from Odoo in a background
+process, so that commands like `start` can return before the work queued
+in the outbox has been done.
+
+The filestore can only be open in one process at a time, so it is not kept
+open while Odoo is contacted: the background process reads what the updates
+need, closes the filestore, fetches it from Odoo, and opens the filestore
+again only to write the results. Pushes are left for `ots sync`.
+
+The background process is started while the command that started it still
+has the filestore open, so it waits for the filestore to be released first.
+"""
+import os
+import subprocess
+import sys
+
+# How long the background process waits for the filestore to be released
+LOCK_WAIT_SECONDS = 30
+
+
+def spawn_background_sync(config_dir):
+    """
+    Start updating the timesheets in the outbox in a detached process,
+    which outlives this one.
+    :param str config_dir: configuration directory of the filestore
+    """
+    if os.name == 'posix':
+        detach = {'close_fds': True, 'start_new_session': True}
+    else:
+        # Before Python 3.7, Windows doesn't support close_fds together with
+        # redirecting the standard streams. DETACHED_PROCESS is new in 3.7.
+        detach = {'creationflags': getattr(subprocess, 'DETACHED_PROCESS', 0x00000008)}
+    subprocess.Popen(
+        [sys.executable, '-m', 'ots.background', config_dir],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **detach
+    )
+
+
+def _open_filestore(config_dir):
+    from .cli import _do_setup
+
+    config, db = _do_setup(config_dir, lock_wait=LOCK_WAIT_SECONDS, quiet=True)
+    return config, db
+
+
+def fetch_missing_data(session_name, task_codes, project_ids, with_employee):
+    """
+    Fetch Odoo data for the filestore, without the filestore.
+    :return: dictionary of the keyword arguments of
+        `TimesheetFileStore.cache_odoo_data`, or None if not logged in to Odoo
+    """
+    from .odoo_cache import fetch_employee_id, fetch_projects, fetch_tasks_by_code
+    from .odoo_connection import OdooConnectionManager
+
+    connection = OdooConnectionManager(session_name)
+    if not connection.is_session_stored():
+        return None
+    odoo = connection.get_odoo()
+    return {
+        'tasks': fetch_tasks_by_code(odoo, task_codes),
+        'projects': fetch_projects(odoo, project_ids),
+        'employee_id': fetch_employee_id(odoo) if with_employee else None,
+        'with_employee': with_employee,
+    }
+
+
+def main(config_dir):
+    config, db = _open_filestore(config_dir)
+    try:
+        with db.transaction() as connection:
+            storage = connection.root.timesheet_storage
+            storage.set_config(config)
+            missing = storage.get_missing_update_data()
+    finally:
+        db.close()
+    if missing is None:
+        return
+
+    _session_name, task_codes, project_ids, with_employee = missing
+    fetched = {}
+    if task_codes or project_ids or with_employee:
+        fetched = fetch_missing_data(*missing)
+        if fetched is None:
+            # Left in the outbox for `ots sync`
+            return
+
+    config, db = _open_filestore(config_dir)
+    try:
+        with db.transaction() as connection:
+            storage = connection.root.timesheet_storage
+            storage.set_config(config)
+            storage.cache_odoo_data(**fetched)
+            storage.apply_cached_updates(task_codes, project_ids)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
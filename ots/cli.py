@@ -2,13 +2,25 @@ import os
 import click
 import json
 import datetime
+import time
 
 from contextlib import contextmanager
-from dateutil import parser, relativedelta
 from pathlib import Path
-from ZODB import DB, FileStorage
-
-from .migration.migrate import check_and_migrate
+from ZODB import DB
+
+from .__about__ import __version__
+from .archive_storage import ArchiveManager
+from .helpers import format_size
+from .maintenance import (
+    DEFAULT_AUTO_PACK_MB,
+    DEFAULT_PACK_KEEP_DAYS,
+    needs_auto_pack,
+    pack_database,
+)
+from .migration.migration_helpers import MIGRATION_CHUNK_SIZE
+from .odoo_cache import DEFAULT_CACHE_TTL_HOURS, DEFAULT_CACHE_MAX_ENTRIES
+from .report import GROUP_BY_OPTIONS, GROUP_BY_PROJECT, FORMAT_OPTIONS, FORMAT_TABLE
+from .storage import DEFAULT_BACKEND, STORAGE_BACKENDS, open_storage
 from .timesheet_filestore import TimesheetFileStore
 
 
@@ -16,6 +28,11 @@ OTS_PATH = str(Path.home() / '.ots')
 DEFAULT_FILESTORE_FILE_NAME = 'filestore.fs'
 
 DEFAULT_APP_DIR = click.get_app_dir("ots", force_posix=True)
+DEFAULT_DAEMON_SYNC_INTERVAL = 300
+
+# How long a command waits for another ots process to release the filestore
+DEFAULT_LOCK_WAIT_SECONDS = 10
+LOCK_RETRY_INTERVAL = 0.2
 
 
 def ensure_path(path):
@@ -44,6 +61,22 @@ def _save_config(config, path):
     click.echo("Configuration saved")
 
 
+def _ensure_interactive(obj, hint="", need="ask you something"):
+    """
+    Commands run by the ots daemon can't prompt the user for anything,
+    nor read the standard input.
+    :param obj: context object
+    :param str hint: how the prompt could be avoided, if possible
+    :param str need: what the command needs to do that the daemon can't
+    """
+    if obj.get('daemon'):
+        raise click.ClickException(
+            f"This command needs to {need}, which is not possible while "
+            f"the ots daemon is running. {hint}Alternatively stop the daemon with "
+            "'ots daemon stop' and try again."
+        )
+
+
 def _get_database(obj):
     db = obj.get('db')
     if db is None:
@@ -52,13 +85,81 @@ def _get_database(obj):
 
 
 @contextmanager
-def ots_filestore(obj):
+def ots_filestore(obj, migrate=True):
     db = _get_database(obj)
-    auto_migrate = obj.get('config', {}).get('auto_migrate', True)
+    config = obj.get('config', {})
+    auto_migrate = config.get('auto_migrate', True)
+    archives = ArchiveManager(
+        obj['config_dir'], config.get('filestore', DEFAULT_FILESTORE_FILE_NAME))
+    try:
+        with db.transaction() as connection:
+            timesheet_storage = connection.root.timesheet_storage
+            # The version is stored in the root object, which is loaded
+            # anyway. Only import the migrations when they are needed.
+            if migrate and getattr(timesheet_storage, 'version', None) != __version__:
+                from .migration.migrate import check_and_migrate
+
+                check_and_migrate(timesheet_storage, auto_migrate=auto_migrate)
+            timesheet_storage.set_config(config)
+            timesheet_storage.set_archives(archives)
+            yield timesheet_storage
+            if obj.get('odoo_stats'):
+                _print_odoo_stats(timesheet_storage.get_odoo_connection())
+            background_sync = timesheet_storage.pop_background_sync_request()
+            last_pack_size = timesheet_storage.last_pack_size
+    finally:
+        archives.close()
+
+    # Only once the changes have been committed
+    if background_sync:
+        _sync_in_background(obj)
+    if needs_auto_pack(db, last_pack_size, config.get('auto_pack_mb', DEFAULT_AUTO_PACK_MB)):
+        # On stderr, not to mix with the output of commands such as `export`
+        click.echo("The filestore has grown since it was last packed, packing it.", err=True)
+        _pack(obj, config.get('pack_keep_days', DEFAULT_PACK_KEEP_DAYS), err=True)
+
+
+def _pack(obj, keep_days, keep_old=False, err=False):
+    """
+    Pack the database, print the results and remember the packed size
+    """
+    db = _get_database(obj)
+    result = pack_database(db, keep_days=keep_days, keep_old=keep_old)
     with db.transaction() as connection:
-        timesheet_storage = connection.root.timesheet_storage
-        check_and_migrate(timesheet_storage, auto_migrate=auto_migrate)
-        yield timesheet_storage
+        connection.root.timesheet_storage.last_pack_size = result['size_after']
+    click.echo(
+        f"Packed the filestore from {format_size(result['size_before'])} to "
+        f"{format_size(result['size_after'])} in {result['seconds']} s, "
+        f"reclaiming {format_size(result['reclaimed'])}.",
+        err=err,
+    )
+    click.echo(
+        f"The index is {format_size(result['index_size'])} for {result['objects']} objects.",
+        err=err,
+    )
+
+
+def _sync_in_background(obj):
+    """
+    Run `ots sync` without making the user wait for it: in the daemon
+    once it has answered, or otherwise in a separate process.
+    """
+    ots_daemon = obj.get('daemon')
+    if ots_daemon:
+        ots_daemon.request_sync()
+    else:
+        from .background import spawn_background_sync
+
+        spawn_background_sync(obj['config_dir'])
+
+
+def _print_odoo_stats(odoo_connection):
+    stats = odoo_connection.get_stats()
+    click.echo(
+        f"Odoo: {stats['session_loads']} session load(s) in {stats['session_load_seconds']} s, "
+        f"{stats['requests']} request(s) in {stats['request_seconds']} s.",
+        err=True,
+    )
 
 
 @click.group()
@@ -71,9 +172,19 @@ def ots_filestore(obj):
     help=f"The path to the directory containing the configuration files and "
          f"filestore. Will be created if it does not exist.",
 )
+@click.option(
+    "--odoo-stats", is_flag=True,
+    help="Print how many requests were made to Odoo, and how long they took.",
+)
 @click.pass_context
-def cli(ctx, config_dir):
+def cli(ctx, config_dir, odoo_stats):
     """ Simple tool to record your time usage and send it to Odoo. """
+    ctx.ensure_object(dict)
+    ctx.obj['odoo_stats'] = odoo_stats
+    if ctx.obj.get('daemon'):
+        # Running inside the ots daemon, which keeps the database open
+        # and gives it to us.
+        return
 
     config, db = _do_setup(config_dir)
 
@@ -81,20 +192,43 @@ def cli(ctx, config_dir):
     ctx.call_on_close(db.close)
 
     # Database and config to context for sub commands
-    ctx.ensure_object(dict)
     ctx.obj['config_dir'] = config_dir
     ctx.obj['db'] = db
     ctx.obj['config'] = config
 
 
-def _do_setup(config_dir):
+def _open_storage_waiting(config, filestore_path, lock_wait, quiet=False):
+    """
+    Open the storage of the filestore, waiting for another ots process,
+    such as a background sync, to release it first.
+    :param float lock_wait: seconds to wait at most
+    :param bool quiet: don't say that we are waiting
+    """
+    from zc.lockfile import LockError
+
+    deadline = time.monotonic() + lock_wait
+    waiting = False
+    while True:
+        try:
+            return open_storage(config.get('storage'), filestore_path)
+        except LockError:
+            if time.monotonic() > deadline:
+                raise click.ClickException(
+                    "The filestore is in use by another ots process, try again later.")
+            if not waiting and not quiet:
+                click.echo("Waiting for another ots process to release the filestore...", err=True)
+            waiting = True
+            time.sleep(LOCK_RETRY_INTERVAL)
+
+
+def _do_setup(config_dir, lock_wait=DEFAULT_LOCK_WAIT_SECONDS, quiet=False):
     config = _load_config(config_dir)
     filestore_file_name = config.get('filestore', DEFAULT_FILESTORE_FILE_NAME)
     # Make sure the directory path for `.ots` exists.
     ots_path = Path(config_dir)
     ensure_path(ots_path)
-    file_storage = FileStorage.FileStorage(str(ots_path / filestore_file_name))
-    db = DB(file_storage)
+    storage = _open_storage_waiting(config, ots_path / filestore_file_name, lock_wait, quiet=quiet)
+    db = DB(storage)
     with db.transaction() as connection:
         if not hasattr(connection.root, 'timesheet_storage'):
             connection.root.timesheet_storage = TimesheetFileStore()
@@ -117,8 +251,7 @@ def add(obj, task_code, duration, description, task_id, project_id, date):
     on the task in Odoo (field `code` in project.task). The task code is case
     sensitive.
     """
-    if date is None:
-        date = datetime.date.today()
+    date = date.date() if date else datetime.date.today()
     with ots_filestore(obj) as timesheet_storage:
 
         timesheet_storage.add_timesheet(
@@ -171,7 +304,9 @@ def stop(obj):
 @click.option('-c', '--code', help="Task Code")
 @click.option('-t', '--task-id', type=click.types.INT)
 @click.option('-p', '--project-id', type=click.types.INT)
-def edit(obj, index, description, duration, code, task_id, project_id):
+@click.option('--date', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Move the timesheet to another date. YYYY-MM-DD")
+def edit(obj, index, description, duration, code, task_id, project_id, date):
     """
     Edit information on an existing timesheet.
     Index is the index of the timesheet as shown by the command (ots list).
@@ -179,6 +314,8 @@ def edit(obj, index, description, duration, code, task_id, project_id):
     separated by a period ".", such that the date off set marks how many days
     in the past the timesheet is. So, the index for the first timesheet for yesterday
     would be in the format "1.0" (date offset 1, index 0).
+    A timesheet can also be referenced by its id prefixed with "#", e.g. "#42".
+    The ids are shown by `ots list --ids`.
     """
     with ots_filestore(obj) as timesheet_storage:
         timesheet_edited = timesheet_storage.edit_timesheet(
@@ -188,6 +325,7 @@ def edit(obj, index, description, duration, code, task_id, project_id):
             task_code=code,
             task_id=task_id,
             project_id=project_id,
+            date=date.date() if date else None,
         )
         if timesheet_edited:
             click.echo('Timesheet updated.')
@@ -207,8 +345,11 @@ def drop(obj, index, force):
     separated by a period ".", such that the date off set marks how many days
     in the past the timesheet is. So, the index for the first timesheet for yesterday
     would be in the format "1.0" (date offset 1, index 0).
+    A timesheet can also be referenced by its id prefixed with "#", e.g. "#42".
+    The ids are shown by `ots list --ids`.
     """
     if not force:
+        _ensure_interactive(obj, hint="Use -f to drop without confirmation. ")
         drop_confirmed = click.confirm("Confirm dropping timesheet", default=False)
         if not drop_confirmed:
             click.echo("Timesheet drop aborted.")
@@ -342,55 +483,167 @@ def alias_update(ctx, name, update_all):
 @click.argument('index', required=False)
 @click.option('--date', 'dt', type=click.types.DateTime(formats=['%Y-%m-%d']),
               help="Date to push, if not today. YYYY-MM-DD")
+@click.option('--from', 'date_from', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="First date of a date range to push. YYYY-MM-DD")
+@click.option('--to', 'date_to', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Last date of a date range to push, defaults to today. YYYY-MM-DD")
+@click.option('--resend', is_flag=True,
+              help="Also push timesheets that have not changed since they were last pushed.")
 @click.option('-f', '--force', is_flag=True)
 @click.pass_obj
-def push(obj, index, dt, force):
+def push(obj, index, dt, date_from, date_to, resend, force):
     """
     Push timesheets to Odoo. If no arguments or options are given,
     all timesheets of today will be pushed. If an index is given, only that
     one timesheet is pushed. If a date is given as an option, all timesheets
-    of that one day will be pushed.
+    of that one day will be pushed. A range of dates can be pushed using
+    the options --from and --to.
+
+    All new timesheets are created in Odoo with a single request, and
+    existing ones are updated with as few requests as possible. Timesheets
+    that have not changed since they were last pushed are skipped, unless
+    --resend is given.
     """
-    date = None
+    if date_to and not date_from:
+        raise click.UsageError("--to can only be used together with --from.")
+    if dt and date_from:
+        raise click.UsageError("Give either a single date with --date, or a range with "
+                               "--from and --to, not both.")
+
+    date_min = date_max = None
     if dt:
-        date = dt.date()
-        if index:
-            click.UsageError(
-                "Give an index or a date, not both. If you want to push a single timesheet, "
-                "use an index. If you want to push an entire date, use a date instead.")
+        date_min = dt.date()
+    elif date_from:
+        date_min = date_from.date()
+        date_max = date_to.date() if date_to else datetime.date.today()
+        if date_max < date_min:
+            raise click.UsageError("The end of the date range is before the start.")
+
+    if index and date_min:
+        raise click.UsageError(
+            "Give an index or a date, not both. If you want to push a single timesheet, "
+            "use an index. If you want to push an entire date, use a date instead.")
 
     if not force:
-        to_be_pushed = index or date and date.isoformat() or datetime.date.today().isoformat()
+        _ensure_interactive(obj, hint="Use -f to push without confirmation. ")
+        if index:
+            to_be_pushed = index
+        elif date_max:
+            to_be_pushed = f"{date_min.isoformat()} - {date_max.isoformat()}"
+        else:
+            to_be_pushed = (date_min or datetime.date.today()).isoformat()
         if not click.confirm(f"Push {to_be_pushed}?"):
             raise click.Abort()
 
     with ots_filestore(obj) as timesheet_storage:
-        timesheet_storage.push(index, date)
+        timesheet_storage.push(index, date_min, date_max, include_unchanged=resend)
+
+
+@cli.command()
+@click.option('--from', 'date_from', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="First date to pull. YYYY-MM-DD")
+@click.option('--to', 'date_to', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Last date to pull. YYYY-MM-DD")
+@click.option('--full', is_flag=True,
+              help="Fetch all the timesheets of the range, not only the ones changed since "
+                   "the previous pull.")
+@click.option('--overwrite-local', is_flag=True,
+              help="Apply the changes made in Odoo even to timesheets that have been changed "
+                   "locally since they were last pushed.")
+@click.pass_obj
+def pull(obj, date_from, date_to, full, overwrite_local):
+    """
+    Fetch your timesheets from Odoo. Timesheets added in Odoo are added
+    locally, and changes made to pushed timesheets in Odoo are applied to
+    the local timesheets.
+
+    If a timesheet has been changed both in Odoo and locally after it was
+    pushed, it is reported as a conflict and left as is. Push it to keep
+    the local changes, or pull with --overwrite-local to keep the changes
+    made in Odoo.
+
+    Only the timesheets changed in Odoo since the previous pull are fetched,
+    unless --full is given.
+    """
+    date_min = date_from.date() if date_from else None
+    date_max = date_to.date() if date_to else None
+    if date_min and date_max and date_max < date_min:
+        raise click.UsageError("The end of the date range is before the start.")
+
+    with ots_filestore(obj) as timesheet_storage:
+        timesheet_storage.pull(date_min, date_max, full=full, overwrite_local=overwrite_local)
 
 
 @cli.command('search')
 @click.argument('search_term')
+@click.option('--remote', is_flag=True,
+              help="Search directly from Odoo instead of the local cache.")
 @click.pass_obj
-def search(obj, search_term):
+def search(obj, search_term, remote):
     """
-    Searches for a task in Odoo.
+    Searches for a task or a project.
+    Once tasks and projects have been synced with `ots sync-metadata`, the
+    search is done locally against task codes, task names and project names,
+    matching whole words or their beginnings, best matches first.
+    Otherwise, or if --remote is given, the search is done in Odoo:
     If a task code is given and a perfect match is found, only that one matching
     task is shown as a result.
     Otherwise a search is done for both tasks and projects based on their
     named and the search term.
     """
-    # TODO: Search a matching ID, matching code or matching name
-    #  For every search prints findings separately (or in a table).
-    #  If nothing was found, just print some sort of a "nothing found"
     with ots_filestore(obj) as timesheet_storage:
-        timesheet_storage.odoo_search_task(search_term)
+        timesheet_storage.odoo_search_task(search_term, remote=remote)
+
+
+@cli.command('sync')
+@click.option('--now', 'retry_now', is_flag=True,
+              help="Also retry the failed operations that are not due yet.")
+@click.option('--list', 'show_list', is_flag=True,
+              help="List the operations waiting in the outbox instead of doing them.")
+@click.option('-q', '--quiet', is_flag=True, help="Don't say anything if there is nothing to do.")
+@click.pass_obj
+def sync(obj, retry_now, show_list, quiet):
+    """
+    Do the operations waiting in the outbox, such as pushes and updates
+    that could not be done because Odoo couldn't be reached.
+    Failed operations are retried after a delay, which doubles after
+    every failure, up to six hours.
+
+    Can be run from cron. The ots daemon runs it periodically by itself.
+    """
+    with ots_filestore(obj) as timesheet_storage:
+        if show_list:
+            timesheet_storage.print_outbox()
+        else:
+            timesheet_storage.sync_outbox(retry_now=retry_now, quiet=quiet)
+
+
+@cli.command('sync-metadata')
+@click.option('--full', is_flag=True,
+              help="Fetch everything again, instead of only what changed since the previous sync.")
+@click.pass_obj
+def sync_metadata(obj, full):
+    """
+    Fetch all open tasks and all projects from Odoo into the local cache.
+    After a sync, adding timesheets with a task code and searching
+    work without contacting Odoo. Run again to pick up new tasks and
+    changes; only tasks and projects changed since the previous sync are
+    fetched. Tasks that are archived or deleted in Odoo are only removed
+    from the cache by a full sync.
+    """
+    with ots_filestore(obj) as timesheet_storage:
+        timesheet_storage.sync_odoo_metadata(full=full)
 
 
 @cli.command('list')
 @click.argument('days', type=int, default=1)
-@click.option('--date', help="Date to print, if not today. YYYY-MM-DD")
+@click.option('--date', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Date to print, if not today. YYYY-MM-DD")
+@click.option('--ids', 'show_ids', is_flag=True,
+              help="Show the ids of the timesheets, which can be used to reference them "
+                   "as '#<id>' instead of an index.")
 @click.pass_obj
-def list_timesheets(obj, days, date):
+def list_timesheets(obj, days, date, show_ids):
     """
     Lists all timesheets for a given number of days, starting from a given date.
     If date not given, defaults to today.
@@ -399,14 +652,106 @@ def list_timesheets(obj, days, date):
     """
 
     if date:
-        date_obj = parser.parse(date).date()
+        date_obj = date.date()
     else:
         date_obj = datetime.date.today()
 
     with ots_filestore(obj) as timesheet_storage:
         for days in reversed(range(0, days)):
-            date_to_list = date_obj - relativedelta.relativedelta(days=days)
-            timesheet_storage.print_date(date_to_list)
+            date_to_list = date_obj - datetime.timedelta(days=days)
+            timesheet_storage.print_date(date_to_list, show_ids=show_ids)
+
+
+@cli.command()
+@click.option('--from', 'date_from', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="First date of the report, defaults to the first day of this month. YYYY-MM-DD")
+@click.option('--to', 'date_to', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Last date of the report, defaults to today. YYYY-MM-DD")
+@click.option('--group-by', type=click.Choice(GROUP_BY_OPTIONS), default=GROUP_BY_PROJECT,
+              show_default=True, help="How to group the work time.")
+@click.option('--format', 'output_format', type=click.Choice(FORMAT_OPTIONS), default=FORMAT_TABLE,
+              show_default=True, help="Output format.")
+@click.pass_obj
+def report(obj, date_from, date_to, group_by, output_format):
+    """
+    Report the work time of a range of dates, grouped by project, task,
+    day or week. Only work time is included, e.g. lunch is not.
+    """
+    today = datetime.date.today()
+    date_min = date_from.date() if date_from else today.replace(day=1)
+    date_max = date_to.date() if date_to else today
+    if date_max < date_min:
+        raise click.UsageError("The end of the date range is before the start.")
+
+    with ots_filestore(obj) as timesheet_storage:
+        timesheet_storage.print_report(date_min, date_max, group_by, output_format)
+
+
+@cli.command()
+@click.option('--format', 'output_format', type=click.Choice(['csv', 'jsonl']), default='csv',
+              show_default=True, help="Output format, CSV or JSON Lines.")
+@click.option('--from', 'date_from', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="First date to export. YYYY-MM-DD")
+@click.option('--to', 'date_to', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Last date to export. YYYY-MM-DD")
+@click.option('--since-id', type=click.types.INT,
+              help="Only export the timesheets with a greater id, i.e. the ones added after it.")
+@click.pass_obj
+def export(obj, output_format, date_from, date_to, since_id):
+    """
+    Export timesheets to the standard output as CSV or JSON Lines.
+    By default every timesheet is exported in date order. Each timesheet
+    is written out as soon as it has been read, so the export can be piped
+    to another program.
+
+    For incremental exports, give the greatest id of the previous export
+    with --since-id. The timesheets are then exported in the order they
+    were added.
+    """
+    date_min = date_from.date() if date_from else None
+    date_max = date_to.date() if date_to else None
+    if date_min and date_max and date_max < date_min:
+        raise click.UsageError("The end of the date range is before the start.")
+
+    with ots_filestore(obj) as timesheet_storage:
+        timesheet_storage.export_timesheets(
+            output_format, date_min=date_min, date_max=date_max, since_id=since_id)
+
+
+@cli.command('import')
+@click.argument('file', type=click.File('r'))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help="Format of the file. Guessed from the file extension if not given.")
+@click.option('--skip-invalid', is_flag=True,
+              help="Import the valid rows even if some rows are invalid.")
+@click.pass_obj
+def import_timesheets(obj, file, file_format, skip_invalid):
+    """
+    Import timesheets from a CSV or JSON Lines file, for example one written
+    by `ots export`. Each row needs a date (YYYY-MM-DD), and can have a
+    task_code or an alias, a description, a duration (HH:mm) or hours,
+    a project_id, a task_id and is_worktime. Use '-' to read from the
+    standard input.
+
+    All the timesheets are imported at once, and nothing is imported if
+    any row is invalid, unless --skip-invalid is given. The tasks and
+    projects of the imported timesheets are fetched from Odoo in a single
+    batch at the end.
+    """
+    from .timesheet_import import guess_format, read_rows
+
+    # Files opened by path always have a name, the standard input may not
+    if getattr(file, 'name', '<stdin>') == '<stdin>':
+        _ensure_interactive(
+            obj, hint="Give the path of the file instead. ", need="read the standard input")
+
+    if file_format is None:
+        file_format = guess_format(file.name)
+
+    with ots_filestore(obj) as timesheet_storage:
+        imported = timesheet_storage.import_timesheets(
+            read_rows(file, file_format), skip_invalid=skip_invalid)
+    click.echo(f"Imported {imported} timesheet(s).")
 
 
 @cli.command()
@@ -419,6 +764,7 @@ def login(obj, database):
     any connections to Odoo.
     To remove the session, use `ots logout`
     """
+    _ensure_interactive(obj)
     config = obj.get('config', {})
 
     default_hostname = config.get('odoo_hostname')
@@ -476,6 +822,7 @@ def setup(obj, advanced):
     """
     Set up basic configurations.
     """
+    _ensure_interactive(obj)
     config = obj.get('config', {})
     # DEFAULTS
     default_filestore = config.get('filestore', DEFAULT_FILESTORE_FILE_NAME)
@@ -498,19 +845,301 @@ def setup(obj, advanced):
 
         config_values['filestore'] = filestore
 
+        config_values['cache_ttl_hours'] = click.prompt(
+            "How many hours should task and project information fetched from Odoo be "
+            "kept in the local cache? 0 to keep it until refreshed manually.",
+            default=config.get('cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS),
+            type=click.types.IntRange(min=0),
+        )
+        config_values['cache_max_entries'] = click.prompt(
+            "Maximum number of tasks and projects to keep in the local cache. "
+            "0 for no limit.",
+            default=config.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+            type=click.types.IntRange(min=0),
+        )
+        config_values['auto_pack_mb'] = click.prompt(
+            "Pack the filestore automatically when it has grown by this many megabytes "
+            "since it was last packed? 0 to only pack with 'ots maintenance pack'.",
+            default=config.get('auto_pack_mb', DEFAULT_AUTO_PACK_MB),
+            type=click.types.IntRange(min=0),
+        )
+        config_values['pack_keep_days'] = click.prompt(
+            "How many days of history should be kept when packing the filestore?",
+            default=config.get('pack_keep_days', DEFAULT_PACK_KEEP_DAYS),
+            type=click.types.IntRange(min=0),
+        )
+        config_values['background_updates'] = click.prompt(
+            "Fetch the tasks and projects of new timesheets from Odoo in the background "
+            "instead of waiting for them?",
+            default=config.get('background_updates', True),
+            type=bool,
+        )
+        storage_config = dict(config.get('storage', {}))
+        storage_config['backend'] = click.prompt(
+            "Storage backend of the filestore. Options of the backends can be set in the "
+            "'storage' section of config.json, see the README.",
+            default=storage_config.get('backend', DEFAULT_BACKEND),
+            type=click.Choice(list(STORAGE_BACKENDS)),
+        )
+        config_values['storage'] = storage_config
+
     config.update(config_values)
     _save_config(config, obj['config_dir'])
 
 
 @cli.command()
-@click.argument('index')
+@click.argument('index', required=False)
+@click.option('--from', 'date_from', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Update all timesheets starting from this date. YYYY-MM-DD")
+@click.option('--to', 'date_to', type=click.types.DateTime(formats=['%Y-%m-%d']),
+              help="Update all timesheets until this date, defaults to today. YYYY-MM-DD")
+@click.option('-a', '--all', 'update_all', is_flag=True, help="Update all timesheets.")
 @click.pass_obj
-def update(obj, index):
+def update(obj, index, date_from, date_to, update_all):
     """
     Update the project/task information of a timesheet from Odoo.
     This command only updates the project name / task name of a timesheet
     based on their Task Code or project_id, this does not pull or push any
     timesheet values to/from Odoo.
+
+    Give a range of dates with --from and --to, or --all, to update many
+    timesheets at once, for example after a project has been renamed.
+    The tasks and projects are then fetched from Odoo all at once.
+    """
+    if date_to and not date_from:
+        raise click.UsageError("--to can only be used together with --from.")
+    given = [bool(index), bool(date_from), update_all]
+    if sum(given) != 1:
+        raise click.UsageError("Give either an index, a range of dates with --from and --to, "
+                               "or --all.")
+
+    with ots_filestore(obj) as timesheet_storage:
+        if index:
+            timesheet_storage.update_timesheet_odoo_data(index)
+        elif update_all:
+            timesheet_storage.update_timesheets_odoo_data()
+        else:
+            date_min = date_from.date()
+            date_max = date_to.date() if date_to else datetime.date.today()
+            if date_max < date_min:
+                raise click.UsageError("The end of the date range is before the start.")
+            timesheet_storage.update_timesheets_odoo_data(date_min, date_max)
+
+
+@cli.group()
+def cache():
+    """
+    Command group for handling the local cache of task and project
+    information fetched from Odoo.
+    """
+
+
+@cache.command('refresh')
+@click.pass_obj
+def cache_refresh(obj):
+    """
+    Fetch all the cached tasks and projects again from Odoo.
     """
     with ots_filestore(obj) as timesheet_storage:
-        timesheet_storage.update_timesheet_odoo_data(index)
+        timesheet_storage.refresh_odoo_cache()
+
+
+@cache.command('clear')
+@click.pass_obj
+def cache_clear(obj):
+    """
+    Remove everything from the local cache.
+    """
+    with ots_filestore(obj) as timesheet_storage:
+        timesheet_storage.clear_odoo_cache()
+
+
+@cli.command()
+@click.option('--before', type=click.types.DateTime(formats=['%Y-%m-%d']), required=True,
+              help="Archive the timesheets dated before this date. YYYY-MM-DD")
+@click.pass_obj
+def archive(obj, before):
+    """
+    Move old timesheets out of the filestore into a separate archive file
+    for each year, to keep the filestore small. `list`, `report` and
+    `export` read the archives when given dates that have been archived.
+    Archived timesheets can't be changed or pushed.
+
+    Run `ots maintenance pack` afterwards to reclaim the space the archived
+    timesheets took in the filestore.
+    """
+    before = before.date()
+    if before > datetime.date.today():
+        raise click.UsageError("Timesheets can only be archived up to today.")
+    with ots_filestore(obj) as timesheet_storage:
+        count = timesheet_storage.archive_timesheets(before)
+    click.echo(f"Archived {count} timesheet(s).")
+
+
+@cli.group()
+def maintenance():
+    """
+    Command group for keeping the filestore in shape.
+    """
+
+
+@maintenance.command('pack')
+@click.option('--keep-days', type=click.types.IntRange(min=0),
+              help="Keep the history of the last this many days. "
+                   f"Defaults to {DEFAULT_PACK_KEEP_DAYS}, or the value given in setup.")
+@click.option('--keep-old', is_flag=True,
+              help="Keep a copy of the filestore from before packing it, with the suffix .old")
+@click.pass_obj
+def maintenance_pack(obj, keep_days, keep_old):
+    """
+    Pack the filestore. Every change to a timesheet leaves its previous
+    version in the filestore, until the filestore is packed. Packing drops
+    the versions replaced more than --keep-days ago, the latest version of
+    everything is always kept.
+    """
+    if keep_days is None:
+        keep_days = obj.get('config', {}).get('pack_keep_days', DEFAULT_PACK_KEEP_DAYS)
+    _pack(obj, keep_days, keep_old=keep_old)
+
+
+@maintenance.command('migrate')
+@click.option('--dry-run', is_flag=True,
+              help="Only tell how many objects the migrations would change.")
+@click.option('--chunk-size', type=click.types.IntRange(min=1), default=MIGRATION_CHUNK_SIZE,
+              show_default=True, help="Days of timesheets to migrate between commits.")
+@click.pass_obj
+def maintenance_migrate(obj, dry_run, chunk_size):
+    """
+    Migrate the filestore to the current version of ots. This is normally
+    done automatically by the first command run after ots is upgraded.
+    Migrations commit as they go, so an interrupted migration continues
+    from where it stopped the next time.
+    """
+    from .migration.migrate import check_and_migrate, count_migration_changes
+
+    with ots_filestore(obj, migrate=False) as timesheet_storage:
+        if timesheet_storage.version == __version__:
+            click.echo("The filestore is up to date, nothing to migrate.")
+            return
+        if dry_run:
+            counts = count_migration_changes(timesheet_storage)
+            for mig_version, touched in counts:
+                click.echo(f"Migration to version {mig_version} would change {touched} object(s).")
+            if not counts:
+                click.echo("The filestore is up to date, nothing to migrate.")
+            return
+        check_and_migrate(timesheet_storage, chunk_size=chunk_size)
+
+
+@maintenance.command('benchmark')
+@click.option('-b', '--backend', 'backends', type=click.Choice(list(STORAGE_BACKENDS)), multiple=True,
+              help="Backend to benchmark, can be given many times. Defaults to all backends.")
+@click.option('-n', '--timesheets', 'timesheet_count', type=click.types.IntRange(min=1), default=5000,
+              show_default=True, help="Number of timesheets in the benchmark filestore.")
+@click.option('--commits', type=click.types.IntRange(min=1), default=20, show_default=True,
+              help="Number of small transactions to time.")
+def maintenance_benchmark(backends, timesheet_count, commits):
+    """
+    Compare the storage backends. Each backend gets a new filestore in a
+    temporary directory, which is filled with generated timesheets. Then
+    opening it, committing a single new timesheet, and going through the
+    last 30 days and all of the timesheets are timed. Your own filestore
+    is not touched.
+    """
+    from tabulate import tabulate
+    from .storage_benchmark import run_benchmark
+
+    results = run_benchmark(backends, timesheet_count=timesheet_count, commits=commits)
+    headers = ["Backend", "Populate (ms)", "Open (ms)", "Commit (ms)", "Last 30 days (ms)",
+               "All timesheets (ms)"]
+    table = [
+        [result['backend'], result['populate_ms'], result['open_ms'] if result['open_ms'] is not None else "-",
+         result['commit_ms'], result['scan_recent_ms'], result['scan_all_ms']]
+        for result in results
+    ]
+    click.echo(tabulate(table, headers=headers))
+
+
+@maintenance.command('benchmark-startup')
+@click.option('--runs', type=click.types.IntRange(min=1), default=10, show_default=True,
+              help="How many times to run each measurement.")
+def maintenance_benchmark_startup(runs):
+    """
+    Time how long `ots stop` takes from start to finish, each time in a new
+    process, using a new filestore in a temporary directory. Also times
+    importing the migrations, which commands skip when the filestore is
+    up to date.
+    """
+    from .startup_benchmark import run_startup_benchmark
+
+    results = run_startup_benchmark(runs=runs)
+    click.echo(f"ots stop: {results['stop_ms']} ms (median of {results['runs']} runs)")
+    click.echo(f"Importing the migrations, skipped when the filestore is up to date: "
+               f"{results['migration_import_ms']} ms")
+
+
+@cli.group()
+def daemon():
+    """
+    Command group for the ots daemon. The daemon keeps the filestore open
+    and runs the commands given to ots while it is running, which makes
+    each command faster. Commands that need to ask something, such as
+    `login`, can't be used while the daemon is running.
+
+    The daemon is not available on Windows.
+    """
+
+
+@daemon.command('start')
+@click.option('--sync-interval', type=click.types.INT, default=DEFAULT_DAEMON_SYNC_INTERVAL,
+              show_default=True,
+              help="Run 'ots sync' every this many seconds. 0 to never run it.")
+@click.pass_obj
+def daemon_start(obj, sync_interval):
+    """
+    Start the daemon. The daemon runs in the foreground until stopped
+    with `ots daemon stop` or Ctrl+C, so start it in the background,
+    for example with `ots daemon start &`.
+    """
+    if obj.get('daemon'):
+        raise click.ClickException("The ots daemon is already running.")
+
+    from .daemon import OtsDaemon
+
+    ots_daemon = OtsDaemon(
+        cli, _get_database(obj), obj['config_dir'], sync_interval=sync_interval or None)
+    ots_daemon.start()
+    click.echo(f"ots daemon listening on {ots_daemon.socket_path}")
+    try:
+        ots_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    click.echo("ots daemon stopped.")
+
+
+@daemon.command('stop')
+@click.pass_obj
+def daemon_stop(obj):
+    """
+    Stop the running daemon.
+    """
+    ots_daemon = obj.get('daemon')
+    if not ots_daemon:
+        click.echo("The ots daemon is not running.")
+        return
+    ots_daemon.shutdown_requested = True
+    click.echo("Stopping the ots daemon.")
+
+
+@daemon.command('status')
+@click.pass_obj
+def daemon_status(obj):
+    """
+    Show whether or not the daemon is running.
+    """
+    ots_daemon = obj.get('daemon')
+    if not ots_daemon:
+        click.echo("The ots daemon is not running.")
+        return
+    click.echo(f"The ots daemon is running with pid {os.getpid()}, and has run "
+               f"{ots_daemon.commands_served} command(s).")
@@ -0,0 +1,124 @@
+"""
+The `ots` entry point. If an ots daemon (see `ots daemon --help`) is running
+for the configuration directory, the command is sent to the daemon to be
+run there. Otherwise the command is run in this process as usual.
+
+This module is imported on every command, so it should stay light: nothing
+here may import the rest of ots, ZODB or click unless the command is run
+in this process.
+"""
+import json
+import os
+import socket
+import sys
+
+
+SOCKET_FILE_NAME = 'ots.sock'
+# Same as `click.get_app_dir("ots", force_posix=True)`, which is the default
+# configuration directory of `ots.cli`
+DEFAULT_CONFIG_DIR = os.path.expanduser('~/.ots')
+
+
+def get_socket_path(config_dir):
+    return os.path.join(config_dir, SOCKET_FILE_NAME)
+
+
+def is_daemon_supported():
+    return hasattr(socket, 'AF_UNIX')
+
+
+def _get_config_dir(args):
+    """
+    Find the configuration directory option from the arguments given to ots
+    """
+    for index, arg in enumerate(args):
+        if arg in ('-c', '--config-dir') and index + 1 < len(args):
+            return args[index + 1]
+        if arg.startswith('--config-dir='):
+            return arg.split('=', 1)[1]
+        if not arg.startswith('-'):
+            # Options of the sub command are not ours
+            break
+    return DEFAULT_CONFIG_DIR
+
+
+def send_request(config_dir, request, on_output=None):
+    """
+    Send a request to the daemon running for the configuration directory.
+    The daemon answers with a JSON message per line: the output of the
+    command as it is written, e.g. {"stdout": "..."}, and finally
+    {"exit_code": 0}.
+    :param str config_dir: configuration directory of the daemon
+    :param dict request: the request
+    :param on_output: function(stream name, text) called with the output as
+        it arrives. If not given, the output is collected into the response.
+    :return: the response as a dictionary with the exit code, and the output
+        if it was collected, or None if no daemon is running
+    """
+    if not is_daemon_supported():
+        return None
+
+    socket_path = get_socket_path(config_dir)
+    if not os.path.exists(socket_path):
+        return None
+
+    output = {'stdout': [], 'stderr': []}
+    response = None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # The daemon has died without cleaning up after itself
+            return None
+        client.sendall(json.dumps(request).encode() + b'\n')
+        client.shutdown(socket.SHUT_WR)
+
+        with client.makefile('rb') as messages:
+            for line in messages:
+                message = json.loads(line.decode())
+                # Answered, even if the daemon dies before the exit code
+                response = response or {'exit_code': 1}
+                for name, text in message.items():
+                    if name == 'exit_code':
+                        response['exit_code'] = text
+                    elif on_output is not None:
+                        on_output(name, text)
+                    else:
+                        output[name].append(text)
+
+    if response is not None and on_output is None:
+        response.update((name, ''.join(texts)) for name, texts in output.items())
+    return response
+
+
+def _write_output(name, text):
+    stream = sys.stdout if name == 'stdout' else sys.stderr
+    stream.write(text)
+    stream.flush()
+
+
+def forward_command(args):
+    """
+    Run the command in the daemon if one is running. The output of the
+    command is written out as the daemon sends it.
+    :param list args: arguments given to ots
+    :return: exit code of the command, or None if no daemon is running
+    """
+    request = {
+        'args': args,
+        'cwd': os.getcwd(),
+        'color': sys.stdout.isatty(),
+    }
+    response = send_request(_get_config_dir(args), request, on_output=_write_output)
+    if response is None:
+        return None
+    return response['exit_code']
+
+
+def main():
+    exit_code = forward_command(sys.argv[1:])
+    if exit_code is None:
+        from .cli import cli
+        cli(prog_name='ots')
+    else:
+        sys.exit(exit_code)
@@ -0,0 +1,353 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+import click
+
+from .client import get_socket_path, is_daemon_supported
+
+
+# Characters of output collected before sending them to the client
+OUTPUT_CHUNK_SIZE = 65536
+# Seconds between checking whether the running sync is done
+SYNC_POLL_INTERVAL = 0.2
+
+
+class OtsDaemon:
+    """
+    Keeps the database open and runs the commands sent to it by the `ots`
+    entry point over a Unix socket, so that every command doesn't need to
+    open the filestore again.
+
+    Commands are run one at a time, in the order they are received.
+    `ots sync` makes its requests to Odoo in another thread, so that commands
+    don't wait for Odoo, see `sync`.
+    """
+
+    def __init__(self, cli, db, config_dir, sync_interval=None):
+        """
+        :param cli: the root click group to run the commands with
+        :param db: ZODB.DB to run the commands against
+        :param str config_dir: the configuration directory the database
+            belongs to. The socket is created in this directory.
+        :param int sync_interval: run `ots sync` every this many seconds,
+            or never if None
+        """
+        self.cli = cli
+        self.db = db
+        self.config_dir = config_dir
+        self.socket_path = get_socket_path(config_dir)
+        self.sync_interval = sync_interval
+        self.last_sync = time.monotonic()
+        self.sync_requested = False
+        # The OutboxSync running in `sync_thread`, if any
+        self.running_sync = None
+        self.sync_thread = None
+        self.commands_served = 0
+        self.shutdown_requested = False
+        self.server = None
+
+    def _bind(self):
+        if not is_daemon_supported():
+            raise click.ClickException("The ots daemon is not supported on this platform.")
+
+        if os.path.exists(self.socket_path):
+            # Either a stale socket of a daemon that died, or a daemon is
+            # already running. The latter can't really happen, since a
+            # running daemon keeps the filestore locked.
+            os.unlink(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        # Only the user themself should be able to run commands
+        os.chmod(self.socket_path, 0o600)
+        server.listen(5)
+        return server
+
+    def start(self):
+        """
+        Start listening to the socket. Call `serve_forever` to start serving.
+        """
+        self.server = self._bind()
+
+    def serve_forever(self):
+        """
+        Serve commands until shutdown is requested.
+        """
+        if self.server is None:
+            self.start()
+        try:
+            while not self.shutdown_requested:
+                timeout = SYNC_POLL_INTERVAL if self.sync_thread is not None else None
+                if self.sync_interval:
+                    until_sync = self.last_sync + self.sync_interval - time.monotonic()
+                    if until_sync <= 0:
+                        self.sync()
+                        continue
+                    timeout = until_sync if timeout is None else min(timeout, until_sync)
+                self.server.settimeout(timeout)
+                try:
+                    connection, _address = self.server.accept()
+                except socket.timeout:
+                    pass
+                else:
+                    with connection:
+                        connection.settimeout(None)
+                        self._handle(connection)
+                self._finish_sync()
+                if self.sync_requested:
+                    self.sync()
+        finally:
+            # Not to lose what the running sync did in Odoo
+            self._finish_sync(wait=True)
+            self.close()
+
+    def request_sync(self):
+        """
+        Run `ots sync` as soon as the current command has been answered.
+        """
+        self.sync_requested = True
+
+    def sync(self):
+        """
+        Start `ots sync --quiet`, unless it is running already. Only the
+        requests to Odoo are made in another thread. The filestore is read
+        here, and the results are written by `_finish_sync` once the thread
+        is done, so that the commands run meanwhile have the filestore to
+        themselves.
+        """
+        self.last_sync = time.monotonic()
+        if self.sync_thread is not None:
+            # Requested syncs are started once the running one is done
+            return
+        self.sync_requested = False
+        try:
+            with self._open_filestore() as timesheet_storage:
+                outbox_sync = timesheet_storage.prepare_outbox_sync(quiet=True)
+        except Exception:
+            traceback.print_exc()
+            return
+        if outbox_sync is not None:
+            self.running_sync = outbox_sync
+            self.sync_thread = threading.Thread(target=outbox_sync.run, daemon=True)
+            self.sync_thread.start()
+
+    def _finish_sync(self, wait=False):
+        """
+        Write the results of the running sync to the filestore, if it is done.
+        :param bool wait: wait for the sync to be done
+        """
+        if self.sync_thread is None or (self.sync_thread.is_alive() and not wait):
+            return
+        self.sync_thread.join()
+        outbox_sync = self.running_sync
+        self.sync_thread = self.running_sync = None
+        try:
+            with self._open_filestore() as timesheet_storage:
+                if timesheet_storage.finish_outbox_sync(outbox_sync):
+                    self.request_sync()
+        except Exception:
+            traceback.print_exc()
+
+    def _open_filestore(self):
+        from .cli import ots_filestore
+
+        return ots_filestore(self._get_obj())
+
+    def _get_obj(self):
+        """
+        :return: the context object of the commands run by the daemon
+        """
+        from .cli import _load_config
+
+        return {
+            'config_dir': self.config_dir,
+            'db': self.db,
+            # Reload the configuration, in case it has been changed
+            'config': _load_config(self.config_dir),
+            'daemon': self,
+        }
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    def _handle(self, connection):
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        try:
+            request = json.loads(b''.join(chunks).decode())
+        except ValueError:
+            return
+
+        channel = _OutputChannel(connection)
+        response = self.run_command(
+            request.get('args', []),
+            cwd=request.get('cwd'),
+            color=request.get('color'),
+            channel=channel,
+        )
+        try:
+            channel.flush()
+            channel.send({'exit_code': response['exit_code']})
+        except OSError:
+            # Nobody to tell anymore
+            pass
+
+    def run_command(self, args, cwd=None, color=None, channel=None):
+        """
+        Run a command in this process against the open database.
+        :param list args: arguments given to ots
+        :param str cwd: working directory of the client
+        :param bool color: whether or not the output should be coloured
+        :param _OutputChannel channel: send the output to the client as the
+            command goes, instead of collecting it
+        :return: dictionary with the exit code of the command, and the output
+            unless it was sent through the channel
+        """
+        if channel is not None:
+            stdout = _ChannelStream(channel, 'stdout')
+            stderr = _ChannelStream(channel, 'stderr')
+        else:
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+        obj = self._get_obj()
+
+        exit_code = 0
+        original_cwd = os.getcwd()
+        # Prompts fail immediately, since there is no one to answer them
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr), \
+                _replace_stdin(io.StringIO()):
+            try:
+                if cwd:
+                    os.chdir(cwd)
+                result = self.cli.main(
+                    args=args,
+                    prog_name='ots',
+                    obj=obj,
+                    standalone_mode=False,
+                    color=color,
+                )
+                # With `standalone_mode` off, click returns the exit code
+                # instead of exiting, e.g. for `--help`
+                if isinstance(result, int):
+                    exit_code = result
+            except click.ClickException as e:
+                e.show()
+                exit_code = e.exit_code
+            except click.Abort:
+                click.echo("Aborted!", err=True)
+                exit_code = 1
+            except SystemExit as e:
+                # click exits when the client has gone away, e.g. with a
+                # broken pipe, even with `standalone_mode` off
+                exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os.chdir(original_cwd)
+
+        self.commands_served += 1
+        if channel is not None:
+            return {'exit_code': exit_code}
+        return {
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+            'exit_code': exit_code,
+        }
+
+
+class _OutputChannel:
+    """
+    Sends the output of a command to the client as JSON messages, one per
+    line, so that long outputs such as `ots export` reach the client as
+    they are written instead of all at once. Output is sent whenever the
+    command flushes it, or once `OUTPUT_CHUNK_SIZE` characters are waiting,
+    and stdout and stderr are kept in the order they were written.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.disconnected = False
+        self._stream_name = None
+        self._chunks = []
+        self._size = 0
+
+    def send(self, message):
+        if self.disconnected:
+            return
+        try:
+            self.connection.sendall(json.dumps(message).encode() + b'\n')
+        except OSError:
+            # The client has gone away, e.g. `ots export | head`. Stop the
+            # command, and drop whatever it writes while stopping.
+            self.disconnected = True
+            raise
+
+    def write(self, stream_name, text):
+        if stream_name != self._stream_name:
+            self.flush()
+            self._stream_name = stream_name
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= OUTPUT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._chunks:
+            text = ''.join(self._chunks)
+            self._chunks = []
+            self._size = 0
+            self.send({self._stream_name: text})
+
+
+class _ChannelStream(io.TextIOBase):
+    """
+    stdout or stderr of a command run by the daemon, see `_OutputChannel`.
+    """
+
+    def __init__(self, channel, name):
+        super().__init__()
+        self.channel = channel
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        # Like any text stream. click tells text streams from binary ones
+        # by trying to write bytes to them.
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self.channel.write(self.name, text)
+        return len(text)
+
+    def flush(self):
+        # click.echo flushes after every record, so that pipes such as
+        # `ots export | head` get the output as it goes
+        self.channel.flush()
+
+
+@contextlib.contextmanager
+def _replace_stdin(stream):
+    original_stdin = sys.stdin
+    sys.stdin = stream
+    try:
+        yield
+    finally:
+        sys.stdin = original_stdin
@@ -1,4 +1,7 @@
+import csv
 import datetime
+import io
+
 import click
 
 
@@ -53,9 +56,41 @@ def apply_duration_string(duration_str, base_duration=None):
     return res_duration
 
 
+def format_size(num_bytes):
+    """
+    :param int num_bytes: size in bytes
+    :return str: the size in human readable units, e.g. 1.5 MB
+    """
+    size = float(num_bytes)
+    for unit in ("B", "kB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
 def limit_str_length(value, max_len=50):
     max_len = max(max_len, 3)
     value = str(value) if value is not None else ""
     if len(value) > max_len:
         return f"{value[:max_len - 3]}..."
     return value
+
+
+def echo_csv(columns, rows):
+    """
+    Write rows as CSV to the standard output, one row at a time. Each row is
+    flushed as soon as it is written, so the output can be piped onwards
+    while the rows are still being generated.
+    :param list columns: names of the columns
+    :param rows: iterable of row dictionaries
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator='\n')
+    writer.writeheader()
+    click.echo(buffer.getvalue(), nl=False)
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        click.echo(buffer.getvalue(), nl=False)
@@ -0,0 +1,81 @@
+"""
+Keeping the database small. FileStorage only ever appends to its file, so
+every change to a timesheet leaves the previous revision of the changed
+objects behind in the file until the storage is packed.
+"""
+import os
+import time
+
+
+# How many days of history `ots maintenance pack` keeps by default
+DEFAULT_PACK_KEEP_DAYS = 30
+# Pack automatically once the filestore has grown by this many megabytes
+# since it was last packed. 0 to never pack automatically.
+DEFAULT_AUTO_PACK_MB = 0
+
+
+def _get_file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def get_storage_size(db):
+    """
+    :param db: ZODB.DB
+    :return int: size of the storage in bytes
+    """
+    return db.storage.getSize()
+
+
+def pack_database(db, keep_days=DEFAULT_PACK_KEEP_DAYS, keep_old=False):
+    """
+    Remove the revisions of objects that have been replaced more than
+    `keep_days` days ago, and the objects no longer referenced at all.
+    The current revision of every object is always kept.
+    :param db: ZODB.DB
+    :param int keep_days: days of history to keep
+    :param bool keep_old: keep the file storage's copy of the database from
+        before the pack (`<filestore>.old`)
+    :return: dictionary of the size of the storage before and after the pack
+        and the bytes reclaimed in total, the size of the index file of the
+        file storage (0 if there is none), and the number of objects
+    """
+    storage = db.storage
+    file_name = getattr(storage, '_file_name', None)
+    size_before = get_storage_size(db)
+
+    start = time.perf_counter()
+    db.pack(days=keep_days)
+    seconds = time.perf_counter() - start
+
+    if file_name and not keep_old:
+        old_file_name = f"{file_name}.old"
+        if os.path.exists(old_file_name):
+            os.remove(old_file_name)
+
+    size_after = get_storage_size(db)
+    return {
+        'size_before': size_before,
+        'size_after': size_after,
+        'reclaimed': max(size_before - size_after, 0),
+        'index_size': _get_file_size(f"{file_name}.index") if file_name else 0,
+        'objects': len(storage),
+        'seconds': round(seconds, 3),
+    }
+
+
+def needs_auto_pack(db, last_pack_size, threshold_mb):
+    """
+    :param db: ZODB.DB
+    :param int last_pack_size: size of the storage after the previous pack,
+        None if it has never been packed
+    :param int threshold_mb: growth in megabytes that triggers a pack,
+        0 or None to never pack automatically
+    :return bool:
+    """
+    if not threshold_mb:
+        return False
+    growth = get_storage_size(db) - (last_pack_size or 0)
+    return growth > threshold_mb * 1024 * 1024
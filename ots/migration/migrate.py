@@ -2,8 +2,11 @@ import click
 from packaging.version import parse as version_parse
 from ..__about__ import __version__ as ots_version
 
+from .migration_helpers import MIGRATION_CHUNK_SIZE, MigrationRun
+
 from .version_migrate_0_1 import __version_mig__ as mig_0_1
 from .version_migrate_0_2 import __version_mig__ as mig_0_2
+from .version_migrate_0_3 import __version_mig__ as mig_0_3
 # Because of the nature of the filestorage OTS uses, it is possible for new
 # versions to introduce new attributes to classes that don't get retroactively
 # added to instances of those object stored in the database. To make sure
@@ -18,10 +21,36 @@ def get_migration_functions():
     return [
         mig_0_1,
         mig_0_2,
+        mig_0_3,
     ]
 
 
-def check_and_migrate(filestore, auto_migrate=True):
+def get_pending_migrations(filestore):
+    """
+    :return: list of the (version, migration function) the filestore
+        has not been migrated with yet
+    """
+    filestore_v = version_parse(getattr(filestore, 'version', "0.0"))
+    return [
+        (mig_version, mig_func) for mig_version, mig_func in get_migration_functions()
+        if filestore_v < version_parse(mig_version)
+    ]
+
+
+def count_migration_changes(filestore):
+    """
+    Dry run the pending migrations, without changing anything.
+    :return: list of (version, number of objects the migration would change)
+    """
+    counts = []
+    for mig_version, mig_func in get_pending_migrations(filestore):
+        migration = MigrationRun(filestore, dry_run=True)
+        mig_func(filestore, migration)
+        counts.append((mig_version, migration.touched))
+    return counts
+
+
+def check_and_migrate(filestore, auto_migrate=True, chunk_size=MIGRATION_CHUNK_SIZE):
     filestore_version = filestore.version if hasattr(filestore, 'version') else "0.0"
     if filestore_version != ots_version:
         if not auto_migrate:
@@ -43,15 +72,17 @@ def check_and_migrate(filestore, auto_migrate=True):
                        f"({filestore_version} < {ots_version}). "
                        f"Migrating database to current version...")
 
-        filestore_v = version_parse(filestore_version)
-        for mig_version, mig_func in get_migration_functions():
-            if filestore_v < version_parse(mig_version):
-                click.echo(f"Running filestore migration to version \"{mig_version}\"")
-                mig_func(filestore)
+        # Migrations commit as they go, and continue from where they were
+        # if they are interrupted, see `MigrationRun`
+        for mig_version, mig_func in get_pending_migrations(filestore):
+            click.echo(f"Running filestore migration to version \"{mig_version}\"")
+            migration = MigrationRun(filestore, chunk_size=chunk_size)
+            mig_func(filestore, migration)
 
         # Update the filestore's `version` to be the current one.
         # Do it here instead of in the migration function itself to avoid
         # having to always create a migration function for a new version
         # if it wouldn't otherwise require one.
         click.secho(f"Filestore migrated to version {ots_version}", fg='green', bold=True)
+        filestore.migration_progress = None
         filestore.version = ots_version
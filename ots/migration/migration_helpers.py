@@ -1,13 +1,91 @@
-def ensure_attribute(iterable, attribute, default):
+import itertools
+
+import click
+
+
+# How many days of timesheets a migration goes through between commits
+MIGRATION_CHUNK_SIZE = 200
+# Progress of a step that has been completed
+STEP_DONE = "done"
+
+
+class MigrationRun:
     """
-    Ensures that all instances of all objects in `iterable` have
-    an attribute `attribute`m ny setting that attribute with a default
-    value `default` if the attribute doesn't exist yet.
-    :param iterable: Any iterable of any objects
-    :param attribute: Name of the attribute
-    :param default: Default value to assign
-    :return: None
+    A run of the migrations of a filestore. Migrations go through the days
+    of timesheets in chunks, and commit after every chunk, so that however
+    many timesheets there are, the transactions stay small and the memory
+    use constant. The progress is stored in the filestore with every
+    commit, so an interrupted migration continues where it stopped.
+
+    In a dry run nothing is changed, and the objects that would be changed
+    are only counted.
     """
-    for i in iterable:
-        if not hasattr(i, attribute):
-            setattr(i, attribute, default)
+
+    def __init__(self, filestore, dry_run=False, chunk_size=MIGRATION_CHUNK_SIZE):
+        self.filestore = filestore
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        # Number of objects changed, or that would be changed in a dry run
+        self.touched = 0
+
+    def ensure_attribute(self, iterable, attribute, default):
+        """
+        Ensures that all instances of all objects in `iterable` have
+        an attribute `attribute`, by setting that attribute with a default
+        value `default` if the attribute doesn't exist yet.
+        :param iterable: Any iterable of any objects
+        :param attribute: Name of the attribute
+        :param default: Default value to assign
+        """
+        for obj in iterable:
+            if not hasattr(obj, attribute):
+                self.touched += 1
+                if not self.dry_run:
+                    setattr(obj, attribute, default)
+
+    def _get_progress(self, step):
+        return (self.filestore.migration_progress or {}).get(step)
+
+    def _save_progress(self, step, progress):
+        if self.dry_run:
+            return
+        migration_progress = dict(self.filestore.migration_progress or {})
+        migration_progress[step] = progress
+        self.filestore.migration_progress = migration_progress
+
+        jar = self.filestore._p_jar
+        if jar is not None:
+            jar.transaction_manager.commit()
+            jar.cacheGC()
+
+    def for_each_day(self, step, migrate_day):
+        """
+        Migrate the timesheets of every day, committing after every chunk
+        of days. Days handled by an earlier, interrupted run are skipped.
+        :param str step: name of the step, unique among all the migrations
+        :param migrate_day: function(date ordinal, timesheets of the day,
+            dry run) migrating a day, and returning the number of objects
+            it changed, or would change in a dry run
+        """
+        progress = self._get_progress(step)
+        if progress == STEP_DONE:
+            return
+
+        timesheets = self.filestore.timesheets
+        total = len(timesheets)
+        done = len(timesheets.keys(max=progress)) if progress is not None else 0
+        while True:
+            # The days of the chunk are listed before migrating them, since
+            # a migration may replace the days it goes through
+            keys = timesheets.keys(min=progress, excludemin=True) if progress is not None else timesheets.keys()
+            chunk = list(itertools.islice(keys, self.chunk_size))
+            if not chunk:
+                break
+            for date_ordinal in chunk:
+                self.touched += migrate_day(date_ordinal, timesheets[date_ordinal], self.dry_run)
+            progress = chunk[-1]
+            done += len(chunk)
+            if total > self.chunk_size and not self.dry_run:
+                click.echo(f"Migration step {step}: {done}/{total} days")
+            self._save_progress(step, progress)
+        self._save_progress(step, STEP_DONE)
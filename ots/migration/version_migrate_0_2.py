@@ -1,20 +1,24 @@
 import datetime
-from .migration_helpers import ensure_attribute
 
 
-def migration_0_2(filestore):
+def _set_dates(date_ordinal, sheets, dry_run):
+    missing = [timesheet for timesheet in sheets if not hasattr(timesheet, 'date')]
+    if not dry_run:
+        for timesheet in missing:
+            timesheet.date = datetime.date.fromordinal(date_ordinal)
+    return len(missing)
+
+
+def migration_0_2(filestore, migration):
     """
     Migrates database initiated on version <0.2 to be compatible
     with version 0.2
     """
     # Set `date` attribute on Timesheets
-    for date_ordinal, sheets in filestore.timesheets.iteritems():
-        # date-attribute
-        date = datetime.datetime.fromordinal(date_ordinal)
-        ensure_attribute(sheets, "date", date)
+    migration.for_each_day("0.2-dates", _set_dates)
     # Filestore did not have a version attribute prior to the first version
     # update.
-    ensure_attribute((filestore,), "version", "0.2")
+    migration.ensure_attribute((filestore,), "version", "0.2")
 
 
 __version_mig__ = ("0.2", migration_0_2)
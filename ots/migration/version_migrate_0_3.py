@@ -0,0 +1,58 @@
+from BTrees.IOBTree import IOBTree
+
+from ..odoo_cache import OdooMetadataCache
+from ..outbox import Outbox
+from ..timesheet_day import TimesheetDay
+from ..timesheet_index import TimesheetIndex
+from ..timesheet_totals import TimesheetTotals
+
+
+def migration_0_3(filestore, migration):
+    """
+    Migrates database initiated on version <0.3 to be compatible
+    with version 0.3
+
+    The sync state of Timesheets (`odoo_pushed_vals` and `last_push`), and
+    the new scalar attributes of the filestore, have class level defaults,
+    so they don't need to be stored. Timesheets pushed before this have no
+    record of the pushed values, and will be considered changed.
+    """
+    # The Timesheets of each day are stored in a TimesheetDay instead of
+    # a plain list
+    def convert_day(date_ordinal, sheets, dry_run):
+        if isinstance(sheets, TimesheetDay):
+            return 0
+        if not dry_run:
+            filestore.timesheets[date_ordinal] = TimesheetDay(sheets)
+        return 1
+
+    migration.for_each_day("0.3-days", convert_day)
+
+    # Indexes of Timesheets by their id, task code, project and Odoo id,
+    # and the work time totals of each day and week
+    migration.ensure_attribute((filestore,), "timesheet_ids", IOBTree())
+    migration.ensure_attribute((filestore,), "timesheet_index", TimesheetIndex())
+    migration.ensure_attribute((filestore,), "timesheet_totals", TimesheetTotals())
+
+    def index_day(date_ordinal, sheets, dry_run):
+        indexed_ids = getattr(filestore, 'timesheet_ids', {})
+        touched = 0
+        for timesheet in sheets:
+            if timesheet.id is None or timesheet.id not in indexed_ids:
+                touched += 1
+            if dry_run:
+                continue
+            if timesheet.id is None:
+                timesheet.id = filestore._get_next_id()
+            # Indexing again is harmless if an interrupted run got this far
+            filestore._index_timesheet(timesheet)
+        return touched
+
+    migration.for_each_day("0.3-index", index_day)
+
+    # Local cache of Odoo data
+    migration.ensure_attribute((filestore,), "odoo_cache", OdooMetadataCache())
+    migration.ensure_attribute((filestore,), "outbox", Outbox())
+
+
+__version_mig__ = ("0.3", migration_0_3)
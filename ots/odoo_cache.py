@@ -0,0 +1,442 @@
+import datetime
+import time
+
+from persistent import Persistent
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
+from BTrees.Length import Length
+
+from .search_index import SearchIndex, CODE_WEIGHT, NAME_WEIGHT, PROJECT_NAME_WEIGHT
+
+
+DEFAULT_CACHE_TTL_HOURS = 24
+DEFAULT_CACHE_MAX_ENTRIES = 2000
+DEFAULT_SYNC_PAGE_SIZE = 500
+
+TASK_FIELDS = ["code", "name", "project_id", "stage_id", "write_date"]
+PROJECT_FIELDS = ["name", "write_date"]
+TIMESHEET_LINE_FIELDS = [
+    "date", "name", "unit_amount", "project_id", "task_id", "employee_id", "write_date",
+]
+# Tasks in a folded stage are considered closed
+OPEN_TASKS_DOMAIN = ['|', ('stage_id', '=', False), ('stage_id.fold', '=', False)]
+# Seconds between recording the uses of a cached entry. Recording a use
+# writes to the filestore, which commands that only read from the cache
+# shouldn't do every time.
+LRU_TOUCH_INTERVAL = 3600
+
+
+class CacheEntry(Persistent):
+    """
+    Values of a single Odoo record stored in the metadata cache.
+    Pinned entries come from a full sync and are never evicted, but
+    replaced by the next full sync.
+    """
+
+    def __init__(self, values, pinned=False):
+        self.values = dict(values)
+        self.fetched = time.time()
+        self.last_used = self.fetched
+        self.pinned = pinned
+
+    def is_expired(self, ttl):
+        """
+        :param ttl: time to live in seconds, or None if entries never expire
+        :return bool:
+        """
+        return ttl is not None and time.time() - self.fetched > ttl
+
+
+class OdooMetadataCache(Persistent):
+    """
+    Local cache of the Odoo data needed to fill in the details of Timesheets
+    and Aliases, so that the same tasks, projects and employees don't need
+    to be fetched from Odoo over and over again.
+
+    Tasks and projects are evicted in least recently used order once the
+    cache grows over its maximum size. Tasks and projects stored by a full
+    sync are not counted towards the maximum size.
+
+    All cached tasks and projects are kept in a search index, so that they
+    can be searched without contacting Odoo.
+    """
+
+    def __init__(self):
+        self.tasks = IOBTree()  # task id -> CacheEntry
+        self.task_codes = OOBTree()  # task code -> task id
+        self.projects = IOBTree()  # project id -> CacheEntry
+        self.employees = OOBTree()  # Odoo session name -> CacheEntry
+        # (last used timestamp, kind, id) of every task and project entry,
+        # in order to find the least recently used one quickly
+        self.lru = OOBTree()
+        self.size = Length()
+        self.last_sync = None  # datetime.datetime of the last sync
+        # The latest `write_date` seen during syncs, in Odoo's format.
+        # The next sync only fetches records written since.
+        self.sync_write_date = None
+        self.search_index = SearchIndex()
+
+    def _get_tree(self, kind):
+        return self.tasks if kind == 'task' else self.projects
+
+    def _touch(self, kind, key, entry):
+        if entry.pinned:
+            # Pinned entries are not evicted, so no need to track their usage
+            return
+        now = time.time()
+        if now - entry.last_used < LRU_TOUCH_INTERVAL:
+            # Recently used is close enough
+            return
+        self.lru.pop((entry.last_used, kind, key), None)
+        entry.last_used = now
+        self.lru[(entry.last_used, kind, key)] = None
+
+    def _get(self, kind, key, ttl):
+        entry = self._get_tree(kind).get(key)
+        if entry is None or entry.is_expired(ttl):
+            return None
+        self._touch(kind, key, entry)
+        return dict(entry.values)
+
+    def _remove(self, kind, key):
+        entry = self._get_tree(kind).pop(key, None)
+        if entry is None:
+            return
+        if not entry.pinned:
+            self.lru.pop((entry.last_used, kind, key), None)
+            self.size.change(-1)
+        code = entry.values.get('code')
+        if kind == 'task' and code and self.task_codes.get(code) == key:
+            del self.task_codes[code]
+        self.search_index.unindex_document((kind, key))
+
+    def _store(self, kind, values, max_entries=None, pinned=False):
+        key = values['id']
+        self._remove(kind, key)
+        entry = CacheEntry(values, pinned=pinned)
+        self._get_tree(kind)[key] = entry
+        if kind == 'task' and values.get('code'):
+            self.task_codes[values['code']] = key
+        self._index(kind, values)
+        if not pinned:
+            self.lru[(entry.last_used, kind, key)] = None
+            self.size.change(1)
+            self.evict(max_entries)
+
+    def _index(self, kind, values):
+        if kind == 'task':
+            weighted_texts = [
+                (values.get('code'), CODE_WEIGHT),
+                (values.get('name'), NAME_WEIGHT),
+                (values.get('project_title'), PROJECT_NAME_WEIGHT),
+            ]
+        else:
+            weighted_texts = [(values.get('name'), NAME_WEIGHT)]
+        self.search_index.index_document((kind, values['id']), weighted_texts)
+
+    def evict(self, max_entries):
+        """
+        Remove the least recently used entries until there are at most
+        `max_entries` tasks and projects in the cache.
+        :param max_entries: maximum number of entries, or None for no limit
+        """
+        if max_entries is None:
+            return
+        while self.size() > max_entries:
+            _last_used, kind, key = self.lru.minKey()
+            self._remove(kind, key)
+
+    def get_task_by_code(self, task_code, ttl=None):
+        task_id = self.task_codes.get(task_code)
+        if task_id is None:
+            return None
+        return self._get('task', task_id, ttl)
+
+    def get_task(self, task_id, ttl=None):
+        return self._get('task', task_id, ttl)
+
+    def get_project(self, project_id, ttl=None):
+        return self._get('project', project_id, ttl)
+
+    def store_task(self, values, max_entries=None, pinned=False):
+        self._store('task', values, max_entries=max_entries, pinned=pinned)
+
+    def store_project(self, values, max_entries=None, pinned=False):
+        self._store('project', values, max_entries=max_entries, pinned=pinned)
+
+    def replace_synced(self, tasks, projects):
+        """
+        Replace everything stored by the previous syncs with the given
+        tasks and projects.
+        :param tasks: list of task value dictionaries
+        :param projects: list of project value dictionaries
+        """
+        for kind in ('task', 'project'):
+            tree = self._get_tree(kind)
+            pinned_keys = [key for key, entry in tree.items() if entry.pinned]
+            for key in pinned_keys:
+                self._remove(kind, key)
+
+        self.sync_write_date = None
+        self.update_synced(tasks, projects)
+
+    def update_synced(self, tasks, projects, closed_task_ids=()):
+        """
+        Store tasks and projects changed since the previous sync.
+        :param tasks: list of task value dictionaries
+        :param projects: list of project value dictionaries
+        :param closed_task_ids: ids of tasks that are no longer open
+        """
+        for task_id in closed_task_ids:
+            self._remove('task', task_id)
+        for project_vals in projects:
+            self.store_project(project_vals, pinned=True)
+        for task_vals in tasks:
+            self.store_task(task_vals, pinned=True)
+
+        # Renaming a project doesn't change the `write_date` of its tasks
+        if projects and self.sync_write_date:
+            project_titles = {vals['id']: vals['name'] for vals in projects}
+            renamed = [
+                entry for entry in self.tasks.values()
+                if entry.pinned
+                and entry.values.get('project_id') in project_titles
+                and entry.values.get('project_title') != project_titles[entry.values['project_id']]
+            ]
+            for entry in renamed:
+                task_vals = dict(entry.values)
+                task_vals['project_title'] = project_titles[task_vals['project_id']]
+                self.store_task(task_vals, pinned=True)
+
+        write_dates = [vals['write_date'] for vals in tasks + projects if vals.get('write_date')]
+        if self.sync_write_date:
+            write_dates.append(self.sync_write_date)
+        self.sync_write_date = max(write_dates, default=None)
+        self.last_sync = datetime.datetime.now()
+
+    def search(self, search_term, limit=None):
+        """
+        Search the cached tasks and projects.
+        :param str search_term:
+        :param int limit: maximum number of results
+        :return: generator of (kind, values) tuples, the best match first
+        """
+        for (kind, key), _score in self.search_index.search(search_term, limit=limit):
+            entry = self._get_tree(kind).get(key)
+            if entry is not None:
+                yield kind, dict(entry.values)
+
+    def get_employee_id(self, session_name, ttl=None):
+        """
+        :return: tuple (found, employee_id). The employee id can be None
+            even when found, if the user has no employee in Odoo.
+        """
+        entry = self.employees.get(session_name)
+        if entry is None or entry.is_expired(ttl):
+            return False, None
+        return True, entry.values['id']
+
+    def store_employee_id(self, session_name, employee_id):
+        self.employees[session_name] = CacheEntry({'id': employee_id})
+
+    def clear(self):
+        self.tasks.clear()
+        self.task_codes.clear()
+        self.projects.clear()
+        self.employees.clear()
+        self.lru.clear()
+        self.size.set(0)
+        self.last_sync = None
+        self.sync_write_date = None
+        self.search_index.clear()
+
+
+class ResolvedOdooData:
+    """
+    Odoo data fetched in advance for a batch of Timesheets or aliases.
+    Has the same lookup methods as TimesheetFileStore, so it can be given to
+    their `update` in place of the filestore to update them without any
+    further requests to Odoo.
+    """
+
+    def __init__(self, tasks=(), projects=(), employee_id=None):
+        self.tasks = {task_vals['code']: task_vals for task_vals in tasks}
+        self.projects = {project_vals['id']: project_vals for project_vals in projects}
+        self.employee_id = employee_id
+
+    def get_odoo_task(self, task_code):
+        return self.tasks.get(task_code)
+
+    def get_odoo_project(self, project_id):
+        return self.projects.get(project_id)
+
+    def get_odoo_employee_id(self):
+        return self.employee_id
+
+
+# ============================
+# =====   Odoo fetching  =====
+# ============================
+# These functions only talk to Odoo, and never touch the cache, so that
+# they can be used to fetch data in batches for any number of records.
+
+def _task_values(task_vals):
+    project_id, project_title = task_vals.get("project_id") or (None, "")
+    _stage_id, stage = task_vals.get("stage_id") or (None, "")
+    return {
+        'id': task_vals['id'],
+        'code': task_vals.get("code") or "",
+        'name': task_vals.get("name") or "",
+        'project_id': project_id,
+        'project_title': project_title,
+        'stage': stage,
+        'write_date': task_vals.get("write_date"),
+    }
+
+
+def _project_values(project_vals):
+    return {
+        'id': project_vals['id'],
+        'name': project_vals.get("name") or "",
+        'write_date': project_vals.get("write_date"),
+    }
+
+
+def _search_read_paged(odoo, model, domain, fields, page_size=DEFAULT_SYNC_PAGE_SIZE):
+    """
+    Generator that reads all the records matching the domain, one page
+    at a time.
+    """
+    offset = 0
+    while True:
+        page = odoo.env[model].search_read(
+            domain, fields, offset=offset, limit=page_size, order="id") or []
+        yield from page
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+
+def fetch_tasks_by_code(odoo, task_codes):
+    """
+    Fetch the tasks matching the given task codes with a single request.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param task_codes: iterable of task codes
+    :return: list of task value dictionaries
+    """
+    task_codes = list(task_codes)
+    if not task_codes:
+        return []
+    task_vals = odoo.env['project.task'].search_read([('code', 'in', task_codes)], TASK_FIELDS)
+    return [_task_values(vals) for vals in task_vals or []]
+
+
+def fetch_projects(odoo, project_ids):
+    """
+    Fetch the projects with the given ids with a single request.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param project_ids: iterable of project database ids
+    :return: list of project value dictionaries
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return []
+    project_vals = odoo.env['project.project'].search_read(
+        [('id', 'in', project_ids)], PROJECT_FIELDS)
+    return [_project_values(vals) for vals in project_vals or []]
+
+
+def fetch_tasks(odoo, task_ids):
+    """
+    Fetch the tasks with the given ids with a single request.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param task_ids: iterable of task database ids
+    :return: list of task value dictionaries
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return []
+    task_vals = odoo.env['project.task'].search_read([('id', 'in', task_ids)], TASK_FIELDS)
+    return [_task_values(vals) for vals in task_vals or []]
+
+
+def fetch_employee_id(odoo):
+    """
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :return: database id of the employee of the logged in user, or None
+    """
+    employee_id = odoo.env['hr.employee'].search([('user_id', '=', odoo.env.uid)], limit=1)
+    return employee_id[0] if employee_id else None
+
+
+def _changed_since_domain(changed_since):
+    # Records written during the same second as the previous sync are
+    # fetched again, in case they were written after the previous sync
+    return [('write_date', '>=', changed_since)] if changed_since else []
+
+
+def fetch_open_tasks(odoo, page_size=DEFAULT_SYNC_PAGE_SIZE, changed_since=None):
+    """
+    Fetch all the open tasks visible to the user.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param int page_size: number of tasks to fetch per request
+    :param str changed_since: only fetch tasks written since this `write_date`
+    :return: list of task value dictionaries
+    """
+    domain = OPEN_TASKS_DOMAIN + _changed_since_domain(changed_since)
+    return [
+        _task_values(vals)
+        for vals in _search_read_paged(
+            odoo, 'project.task', domain, TASK_FIELDS, page_size=page_size)
+    ]
+
+
+def fetch_changed_task_ids(odoo, changed_since):
+    """
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param str changed_since: `write_date` in Odoo's format
+    :return: ids of all tasks, open or not, written since `changed_since`
+    """
+    return odoo.env['project.task'].search(_changed_since_domain(changed_since)) or []
+
+
+def fetch_all_projects(odoo, page_size=DEFAULT_SYNC_PAGE_SIZE, changed_since=None):
+    """
+    Fetch all the projects visible to the user.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param int page_size: number of projects to fetch per request
+    :param str changed_since: only fetch projects written since this `write_date`
+    :return: list of project value dictionaries
+    """
+    return [
+        _project_values(vals)
+        for vals in _search_read_paged(
+            odoo, 'project.project', _changed_since_domain(changed_since), PROJECT_FIELDS,
+            page_size=page_size)
+    ]
+
+
+def fetch_timesheet_lines(odoo, employee_id, date_min=None, date_max=None, changed_since=None,
+                          page_size=DEFAULT_SYNC_PAGE_SIZE):
+    """
+    Fetch the timesheet lines (account.analytic.line) of an employee.
+    :param odoo: odoorpc.ODOO authenticated to a database
+    :param int employee_id: database id of the employee. If None, the lines
+        of the logged in user are fetched instead.
+    :param datetime.date date_min: first date to fetch
+    :param datetime.date date_max: last date to fetch
+    :param str changed_since: only fetch lines written since this `write_date`
+    :param int page_size: number of lines to fetch per request
+    :return: list of line value dictionaries as returned by `search_read`
+    """
+    if employee_id:
+        domain = [('employee_id', '=', employee_id)]
+    else:
+        domain = [('user_id', '=', odoo.env.uid)]
+    if date_min:
+        domain.append(('date', '>=', date_min.isoformat()))
+    if date_max:
+        domain.append(('date', '<=', date_max.isoformat()))
+    domain += _changed_since_domain(changed_since)
+    return list(_search_read_paged(
+        odoo, 'account.analytic.line', domain, TIMESHEET_LINE_FIELDS, page_size=page_size))
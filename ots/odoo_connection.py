@@ -0,0 +1,99 @@
+import configparser
+import os
+import time
+
+
+# The file odoorpc stores its sessions in by default
+ODOORPC_RC_FILE = '~/.odoorpcrc'
+
+
+class OdooConnectionManager:
+    """
+    Keeps the Odoo session of a filestore for the lifetime of the process,
+    so that the session is loaded (and authenticated) only once, however many
+    times it is needed. Also keeps count of the requests made through the
+    session and the time they took.
+
+    Never stored in the filestore: a new manager is created in each process.
+    """
+
+    def __init__(self, session_name, rc_file=ODOORPC_RC_FILE):
+        self.session_name = session_name
+        self.rc_file = os.path.expanduser(rc_file)
+        self._odoo = None
+        self._rc_file_mtime = None
+        self._session_stored = False
+
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self.request_count = 0
+        self.request_seconds = 0.0
+
+    def is_session_stored(self):
+        """
+        :return bool: whether or not the session is stored in odoorpc's
+            session file. The file is only read again once it has changed.
+        """
+        try:
+            mtime = os.stat(self.rc_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._rc_file_mtime:
+            # Read odoorpc's session file directly instead of
+            # `odoorpc.ODOO.list` to avoid importing odoorpc when adding
+            # timesheets.
+            sessions = configparser.ConfigParser()
+            sessions.read([self.rc_file])
+            self._session_stored = sessions.has_section(self.session_name)
+            self._rc_file_mtime = mtime
+        return self._session_stored
+
+    def get_odoo(self):
+        """
+        :return: odoorpc.ODOO authenticated with the stored session, loaded
+            on the first call
+        """
+        if self._odoo is None:
+            import odoorpc
+
+            start = time.perf_counter()
+            odoo = odoorpc.ODOO.load(self.session_name, rc_file=self.rc_file)
+            self.load_seconds += time.perf_counter() - start
+            self.load_count += 1
+            self._time_requests(odoo)
+            self._odoo = odoo
+        return self._odoo
+
+    def _time_requests(self, odoo):
+        # RPC calls of models, like most requests odoorpc makes, go through
+        # `ODOO.json`
+        json_request = odoo.json
+
+        def timed_json_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return json_request(*args, **kwargs)
+            finally:
+                self.request_seconds += time.perf_counter() - start
+                self.request_count += 1
+
+        odoo.json = timed_json_request
+
+    def reset(self):
+        """
+        Forget the loaded session, e.g. after logging in or out.
+        """
+        self._odoo = None
+        self._rc_file_mtime = None
+
+    def get_stats(self):
+        """
+        :return: dictionary of the number of session loads and requests,
+            and the seconds they took
+        """
+        return {
+            'session_loads': self.load_count,
+            'session_load_seconds': round(self.load_seconds, 3),
+            'requests': self.request_count,
+            'request_seconds': round(self.request_seconds, 3),
+        }
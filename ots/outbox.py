@@ -0,0 +1,120 @@
+import datetime
+
+from persistent import Persistent
+from BTrees.OOBTree import OOBTree
+
+
+# Operations waiting in the outbox
+OP_UPDATE = "update"  # Update the task and project information from Odoo
+OP_PUSH = "push"  # Create or write the timesheet in Odoo
+
+# Failed operations are retried after an exponentially growing delay
+RETRY_BASE_DELAY = datetime.timedelta(minutes=1)
+RETRY_MAX_DELAY = datetime.timedelta(hours=6)
+
+
+class OutboxEntry(Persistent):
+    """
+    An operation on a Timesheet waiting to be done in Odoo.
+    """
+
+    # Entries stored by earlier versions
+    first_attempt = None
+
+    def __init__(self, operation, timesheet_id, include_unchanged=False):
+        self.operation = operation
+        self.timesheet_id = timesheet_id
+        # Only for pushes: push even if unchanged since the last push
+        self.include_unchanged = include_unchanged
+        self.queued = datetime.datetime.now()
+
+        self.attempts = 0
+        self.first_attempt = None  # datetime.datetime of the first failed attempt
+        self.next_attempt = None  # datetime.datetime, None when due right away
+        self.last_error = ""
+        # Whether a failed create may have created the timesheet in Odoo
+        # anyway, e.g. if the connection was lost before Odoo answered.
+        self.maybe_created = False
+
+    def is_due(self, now):
+        return self.next_attempt is None or self.next_attempt <= now
+
+    def get_retry_delay(self):
+        """
+        :return datetime.timedelta: how long to wait after the latest failure
+        """
+        delay = RETRY_BASE_DELAY * 2 ** max(self.attempts - 1, 0)
+        return min(delay, RETRY_MAX_DELAY)
+
+
+class Outbox(Persistent):
+    """
+    A persistent queue of operations waiting to be done in Odoo, so that
+    commands don't need to wait for Odoo, or fail when it can't be reached.
+    The queue is drained by `ots sync`.
+
+    Each Timesheet has at most one entry per operation, so queueing an
+    operation again doesn't make it happen twice. Operations on the same
+    Timesheet use its latest values when they are eventually done.
+    """
+
+    def __init__(self):
+        self.entries = OOBTree()  # (operation, timesheet id) -> OutboxEntry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def enqueue(self, operation, timesheet_id, include_unchanged=False):
+        """
+        Queue an operation on a timesheet, unless it is queued already.
+        :return OutboxEntry: the queued entry
+        """
+        key = (operation, timesheet_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = OutboxEntry(
+                operation, timesheet_id, include_unchanged=include_unchanged)
+        elif include_unchanged:
+            entry.include_unchanged = True
+        return entry
+
+    def remove(self, entry):
+        self.entries.pop((entry.operation, entry.timesheet_id), None)
+
+    def remove_timesheet(self, timesheet_id):
+        """
+        Remove all the queued operations of a timesheet
+        """
+        for operation in (OP_UPDATE, OP_PUSH):
+            self.entries.pop((operation, timesheet_id), None)
+
+    def get_entries(self, operation, due_at=None):
+        """
+        :param str operation: OP_UPDATE or OP_PUSH
+        :param datetime.datetime due_at: only the entries due at this time,
+            or all entries if None
+        :return: list of entries
+        """
+        return [
+            entry for entry in self.entries.values(min=(operation, 0), max=(operation, 2 ** 31 - 1))
+            if due_at is None or entry.is_due(due_at)
+        ]
+
+    def mark_failed(self, entry, error, now, maybe_created=False):
+        """
+        Record a failed attempt, and schedule the next one
+        """
+        if entry.first_attempt is None:
+            entry.first_attempt = now
+        entry.attempts += 1
+        entry.last_error = str(error)
+        entry.next_attempt = now + entry.get_retry_delay()
+        entry.maybe_created = entry.maybe_created or maybe_created
+
+    def get_next_attempt(self):
+        """
+        :return datetime.datetime: when the next entry is due, or None if
+            the outbox is empty
+        """
+        attempts = [entry.next_attempt or entry.queued for entry in self.entries.values()]
+        return min(attempts) if attempts else None
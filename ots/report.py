@@ -0,0 +1,141 @@
+"""
+Work time reports over a range of dates, aggregated from the daily totals
+kept by `TimesheetTotals` instead of from the individual Timesheets.
+"""
+import datetime
+import json
+from collections import defaultdict
+
+import click
+
+from .helpers import echo_csv, format_timedelta
+from .timesheet_totals import get_week_ordinal
+
+
+GROUP_BY_PROJECT = 'project'
+GROUP_BY_TASK = 'task'
+GROUP_BY_DAY = 'day'
+GROUP_BY_WEEK = 'week'
+GROUP_BY_OPTIONS = [GROUP_BY_PROJECT, GROUP_BY_TASK, GROUP_BY_DAY, GROUP_BY_WEEK]
+
+FORMAT_TABLE = 'table'
+FORMAT_CSV = 'csv'
+FORMAT_JSON = 'json'
+FORMAT_OPTIONS = [FORMAT_TABLE, FORMAT_CSV, FORMAT_JSON]
+
+# Names of the key and name columns of each grouping
+GROUP_COLUMNS = {
+    GROUP_BY_PROJECT: ("project_id", "project"),
+    GROUP_BY_TASK: ("task_code", "task"),
+    GROUP_BY_DAY: ("date", "weekday"),
+    GROUP_BY_WEEK: ("week", "week_start"),
+}
+
+
+def _hours(duration):
+    return round(duration.total_seconds() / 3600, 2)
+
+
+class ReportAggregator:
+    """
+    Sums up work time into the groups of a report, one day at a time.
+    """
+
+    def __init__(self, group_by):
+        if group_by not in GROUP_COLUMNS:
+            raise click.UsageError(f"Unknown grouping {repr(group_by)}, "
+                                   f"expected one of {', '.join(GROUP_BY_OPTIONS)}.")
+        self.group_by = group_by
+        self.groups = defaultdict(datetime.timedelta)
+
+    def add_day(self, date_ordinal, totals):
+        """
+        :param int date_ordinal: ordinal of the date
+        :param totals: DurationTotals of the date
+        """
+        if self.group_by == GROUP_BY_PROJECT:
+            for project_id, duration in totals.projects.items():
+                self.groups[project_id] += duration
+        elif self.group_by == GROUP_BY_TASK:
+            for task_code, duration in totals.tasks.items():
+                self.groups[task_code] += duration
+        elif self.group_by == GROUP_BY_DAY:
+            self.groups[date_ordinal] += totals.worktime
+        else:
+            self.groups[get_week_ordinal(date_ordinal)] += totals.worktime
+
+    def add_duration(self, date_ordinal, project_id, task_code, duration):
+        """
+        Add work time that is not in the daily totals, e.g. the time
+        a running timesheet has been running.
+        """
+        keys = {
+            GROUP_BY_PROJECT: project_id or None,
+            GROUP_BY_TASK: task_code or None,
+            GROUP_BY_DAY: date_ordinal,
+            GROUP_BY_WEEK: get_week_ordinal(date_ordinal),
+        }
+        self.groups[keys[self.group_by]] += duration
+
+    def get_total(self):
+        return sum(self.groups.values(), datetime.timedelta())
+
+    def get_rows(self, get_name):
+        """
+        :param get_name: function returning the name of a project or task
+            group from its key
+        :return: generator of row dictionaries, ordered by their key
+        """
+        key_column, name_column = GROUP_COLUMNS[self.group_by]
+        # Sort the ungrouped time (None) last
+        for key in sorted(self.groups, key=lambda group_key: (group_key is None, group_key)):
+            duration = self.groups[key]
+            if self.group_by == GROUP_BY_DAY:
+                date = datetime.date.fromordinal(key)
+                key_value, name = date.isoformat(), date.strftime('%A')
+            elif self.group_by == GROUP_BY_WEEK:
+                week_start = datetime.date.fromordinal(key)
+                iso_year, iso_week, _weekday = week_start.isocalendar()
+                key_value, name = f"{iso_year}-W{iso_week:02d}", week_start.isoformat()
+            else:
+                key_value, name = key, get_name(key)
+            yield {
+                key_column: key_value,
+                name_column: name,
+                "duration": format_timedelta(duration),
+                "hours": _hours(duration),
+            }
+
+
+def write_report(aggregator, get_name, date_min, date_max, output_format):
+    """
+    Write the report to the standard output
+    :param ReportAggregator aggregator: the aggregated work time
+    :param get_name: see `ReportAggregator.get_rows`
+    :param datetime.date date_min: first date of the report
+    :param datetime.date date_max: last date of the report
+    :param str output_format: one of FORMAT_OPTIONS
+    """
+    rows = aggregator.get_rows(get_name)
+    columns = [*GROUP_COLUMNS[aggregator.group_by], "duration", "hours"]
+    total = aggregator.get_total()
+
+    if output_format == FORMAT_CSV:
+        echo_csv(columns, rows)
+    elif output_format == FORMAT_JSON:
+        click.echo(json.dumps({
+            "from": date_min.isoformat(),
+            "to": date_max.isoformat(),
+            "group_by": aggregator.group_by,
+            "rows": list(rows),
+            "total": {"duration": format_timedelta(total), "hours": _hours(total)},
+        }, indent=2))
+    else:
+        from tabulate import tabulate
+
+        headers = [column.replace('_', ' ').capitalize() for column in columns]
+        table = [[row[column] for column in columns] for row in rows]
+        click.secho(f"Work time {date_min.isoformat()} - {date_max.isoformat()} "
+                    f"by {aggregator.group_by}", fg='green', bold=True)
+        click.echo(tabulate(table, headers=headers, disable_numparse=True))
+        click.echo(f"Total Work Time: {format_timedelta(total)} ({_hours(total)} h)")
@@ -0,0 +1,112 @@
+import re
+from collections import defaultdict
+
+from persistent import Persistent
+from BTrees.OOBTree import OOBTree
+
+
+# Weights of matches in the different fields of a document. A match by
+# a prefix of a term counts half of the weight of a full match.
+CODE_WEIGHT = 10
+NAME_WEIGHT = 3
+PROJECT_NAME_WEIGHT = 1
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """
+    :param str text:
+    :return: list of lower case words in the text
+    """
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class SearchIndex(Persistent):
+    """
+    An inverted index of words to the documents (cached tasks and projects)
+    they appear in, used to search tasks and projects without Odoo.
+    Documents are identified by tuples of (kind, id), e.g. ('task', 12).
+    """
+
+    def __init__(self):
+        self.terms = OOBTree()  # word -> OOBTree of document -> weight
+        self.documents = OOBTree()  # document -> tuple of indexed words
+
+    def index_document(self, document, weighted_texts):
+        """
+        Add a document to the index, replacing any previous version of it.
+        :param tuple document: (kind, id) of the document
+        :param weighted_texts: iterable of (text, weight) pairs
+        """
+        self.unindex_document(document)
+
+        weights = {}
+        for text, weight in weighted_texts:
+            for word in tokenize(text):
+                weights[word] = max(weights.get(word, 0), weight)
+
+        for word, weight in weights.items():
+            postings = self.terms.get(word)
+            if postings is None:
+                postings = self.terms[word] = OOBTree()
+            postings[document] = weight
+        self.documents[document] = tuple(weights)
+
+    def unindex_document(self, document):
+        words = self.documents.pop(document, ())
+        for word in words:
+            postings = self.terms.get(word)
+            if postings is None:
+                continue
+            postings.pop(document, None)
+            if not postings:
+                del self.terms[word]
+
+    def clear(self):
+        self.terms.clear()
+        self.documents.clear()
+
+    def _match_word(self, word):
+        """
+        :return: dictionary of document -> weight of documents matching
+            the word either fully or by a prefix
+        """
+        matches = {}
+        for term, postings in self.terms.items(min=word):
+            if not term.startswith(word):
+                break
+            divisor = 1 if term == word else 2
+            for document, weight in postings.items():
+                weight = weight / divisor
+                if weight > matches.get(document, 0):
+                    matches[document] = weight
+        return matches
+
+    def search(self, search_term, limit=None):
+        """
+        Search documents containing all the words of the search term,
+        either fully or as a prefix of a word.
+        :param str search_term:
+        :param int limit: maximum number of results
+        :return: list of (document, score) sorted by the best match first
+        """
+        words = tokenize(search_term)
+        if not words:
+            return []
+
+        scores = defaultdict(float)
+        matching = None
+        for word in words:
+            word_matches = self._match_word(word)
+            matching = set(word_matches) if matching is None else matching & set(word_matches)
+            if not matching:
+                return []
+            for document, weight in word_matches.items():
+                scores[document] += weight
+
+        results = sorted(
+            ((document, scores[document]) for document in matching),
+            key=lambda result: (-result[1], result[0]),
+        )
+        return results[:limit] if limit else results
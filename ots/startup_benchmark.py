@@ -0,0 +1,80 @@
+"""
+Timing how long quick commands such as `ots stop` take from start to
+finish, each run in a new interpreter like from the shell, run with
+`ots maintenance benchmark-startup`.
+"""
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Runs a command the way the `ots` entry point does when no daemon is running
+_COMMAND_CODE = "from ots.cli import cli; cli({args!r}, prog_name='ots')"
+
+# Measures importing the migrations on top of the CLI, which the version
+# check of `ots_filestore` skips when the filestore is up to date
+_MIGRATION_IMPORT_CODE = (
+    "import time\n"
+    "import ots.cli\n"
+    "start = time.perf_counter()\n"
+    "import ots.migration.migrate\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def time_command(config_dir, args, runs):
+    """
+    :param str config_dir: configuration directory to run the command with
+    :param list args: the command and its arguments
+    :param int runs: how many times to run the command
+    :return: list of the wall clock seconds of each run
+    """
+    code = _COMMAND_CODE.format(args=['--config-dir', config_dir, *args])
+    timings = []
+    for _run_number in range(runs):
+        start = time.perf_counter()
+        _run(code)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_migration_import(runs):
+    """
+    :return: list of the seconds importing the migrations took in each run
+    """
+    return [float(_run(_MIGRATION_IMPORT_CODE).stdout) for _run_number in range(runs)]
+
+
+def run_startup_benchmark(runs=10):
+    """
+    Time `ots stop` with a new filestore, and the import of the migrations
+    the command skips.
+    :param int runs: how many times to run each measurement
+    :return: dictionary of the median milliseconds
+    """
+    config_dir = tempfile.mkdtemp(prefix="ots-benchmark-startup-")
+    try:
+        # Create the filestore and start a timesheet to stop
+        time_command(config_dir, ['start', 'T1234'], 1)
+        stop_timings = time_command(config_dir, ['stop'], runs)
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+    migration_timings = time_migration_import(runs)
+    return {
+        'runs': runs,
+        'stop_ms': round(statistics.median(stop_timings) * 1000, 1),
+        'migration_import_ms': round(statistics.median(migration_timings) * 1000, 1),
+    }
@@ -0,0 +1,115 @@
+"""
+The storages the filestore's database can be kept in, chosen with the
+`storage` section of config.json, for example:
+
+    "storage": {
+        "backend": "demo",
+        "changes": "/tmp/ots-changes.fs"
+    }
+
+Backends:
+
+file (default)
+    A single FileStorage file in the configuration directory, named by the
+    `filestore` option of the configuration.
+memory
+    An in-memory MappingStorage, nothing is kept once ots exits. Meant for
+    tests and for trying things out.
+demo
+    The filestore file opened read only, with the changes written on top of
+    it into a separate FileStorage given with the `changes` option, or kept
+    in memory if not given. Useful when the filestore is on a slow network
+    drive: the changes can be kept on a local drive. Without `changes`
+    nothing is saved, which every command warns about.
+sqlite
+    RelStorage on an SQLite database in the directory given with the
+    `data_dir` option, `<filestore>.sqlite` in the configuration directory by
+    default. Requires RelStorage, `pip install RelStorage`.
+"""
+from pathlib import Path
+
+import click
+
+
+BACKEND_FILE = 'file'
+BACKEND_MEMORY = 'memory'
+BACKEND_DEMO = 'demo'
+BACKEND_SQLITE = 'sqlite'
+DEFAULT_BACKEND = BACKEND_FILE
+
+
+def _open_file_storage(filestore_path, options):
+    from ZODB.FileStorage import FileStorage
+
+    return FileStorage(str(filestore_path))
+
+
+def _open_memory_storage(filestore_path, options):
+    from ZODB.MappingStorage import MappingStorage
+
+    return MappingStorage()
+
+
+def _open_demo_storage(filestore_path, options):
+    from ZODB.DemoStorage import DemoStorage
+    from ZODB.FileStorage import FileStorage
+
+    # The base needs to exist to be opened read only
+    if not filestore_path.exists():
+        FileStorage(str(filestore_path)).close()
+    base = FileStorage(str(filestore_path), read_only=True)
+    changes = None
+    if options.get('changes'):
+        changes = FileStorage(str(Path(options['changes']).expanduser()))
+    else:
+        click.secho(
+            "The demo storage backend has no 'changes' file in the configuration, "
+            "so none of the changes are kept once ots exits.",
+            fg='yellow', err=True,
+        )
+    return DemoStorage(base=base, changes=changes)
+
+
+def _open_sqlite_storage(filestore_path, options):
+    try:
+        from relstorage.adapters.sqlite.adapter import Sqlite3Adapter
+        from relstorage.options import Options
+        from relstorage.storage import RelStorage
+    except ImportError:
+        raise click.ClickException(
+            "The sqlite storage backend requires RelStorage, install it with "
+            "'pip install RelStorage'.")
+
+    data_dir = options.get('data_dir') or filestore_path.with_suffix('.sqlite')
+    relstorage_options = Options(keep_history=options.get('keep_history', True))
+    adapter = Sqlite3Adapter(
+        str(Path(data_dir).expanduser()), pragmas={}, options=relstorage_options)
+    return RelStorage(adapter, options=relstorage_options)
+
+
+# Backend name -> function(filestore path, options) returning a new storage
+STORAGE_BACKENDS = {
+    BACKEND_FILE: _open_file_storage,
+    BACKEND_MEMORY: _open_memory_storage,
+    BACKEND_DEMO: _open_demo_storage,
+    BACKEND_SQLITE: _open_sqlite_storage,
+}
+
+
+def open_storage(storage_config, filestore_path):
+    """
+    Open the storage described by the `storage` section of the configuration.
+    :param dict storage_config: the `storage` section, with the name of the
+        backend in `backend` and the options of the backend
+    :param Path filestore_path: path of the filestore file, which the
+        backends use for their default locations
+    :return: a ZODB storage
+    """
+    storage_config = storage_config or {}
+    backend = storage_config.get('backend', DEFAULT_BACKEND)
+    open_backend = STORAGE_BACKENDS.get(backend)
+    if open_backend is None:
+        raise click.ClickException(
+            f"Unknown storage backend {repr(backend)} in the configuration. "
+            f"Available backends: {', '.join(STORAGE_BACKENDS)}")
+    return open_backend(Path(filestore_path), storage_config)
@@ -0,0 +1,129 @@
+"""
+Comparing the storage backends of `ots.storage` with a filestore of
+generated timesheets, run with `ots maintenance benchmark`.
+"""
+import datetime
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import click
+from ZODB import DB
+
+from .storage import BACKEND_DEMO, BACKEND_FILE, BACKEND_MEMORY, STORAGE_BACKENDS, open_storage
+from .timesheet_filestore import TimesheetFileStore
+
+
+# How many timesheets the benchmark filestore has on each day
+TIMESHEETS_PER_DAY = 5
+# Days of the range scanned, like `list 30`
+SCAN_DAYS = 30
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _populate(db, timesheet_count, first_date):
+    with db.transaction() as connection:
+        storage = connection.root.timesheet_storage = TimesheetFileStore()
+        for i in range(timesheet_count):
+            storage.add_timesheet(
+                task_code=f"T{i % 20}",
+                description=f"Timesheet {i}",
+                duration="1:00",
+                date=first_date + datetime.timedelta(days=i // TIMESHEETS_PER_DAY),
+                update=False,
+            )
+
+
+def _time_commits(db, commits, date):
+    start = time.perf_counter()
+    for i in range(commits):
+        with db.transaction() as connection:
+            connection.root.timesheet_storage.add_timesheet(
+                description=f"Commit {i}", duration="0:15", date=date, update=False)
+    return (time.perf_counter() - start) / commits
+
+
+def _time_scan(db, date_min, date_max):
+    db.cacheMinimize()
+    start = time.perf_counter()
+    with db.transaction() as connection:
+        count = sum(1 for _ts in connection.root.timesheet_storage.iter_timesheets(date_min, date_max))
+    return time.perf_counter() - start, count
+
+
+def benchmark_backend(backend, timesheet_count=5000, commits=20):
+    """
+    Measure a backend with a new filestore of `timesheet_count` timesheets.
+    :param str backend: name of the backend, see `ots.storage.STORAGE_BACKENDS`
+    :param int timesheet_count: number of timesheets in the filestore
+    :param int commits: number of small transactions to time
+    :return: dictionary of the timings in milliseconds. Opening the storage
+        again is not timed for the memory backend, which can't be reopened.
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix=f"ots-benchmark-{backend}-"))
+    filestore_path = work_dir / 'filestore.fs'
+    storage_config = {'backend': backend}
+    if backend != BACKEND_MEMORY:
+        storage_config['changes'] = str(work_dir / 'changes.fs')
+    first_date = datetime.date(2020, 1, 1)
+    last_date = first_date + datetime.timedelta(days=(timesheet_count - 1) // TIMESHEETS_PER_DAY)
+
+    # The demo backend only writes its changes on top of the filestore,
+    # so the timesheets are put in the filestore itself beforehand
+    populate_config = {'backend': BACKEND_FILE} if backend == BACKEND_DEMO else storage_config
+
+    try:
+        db = DB(open_storage(populate_config, filestore_path))
+        start = time.perf_counter()
+        _populate(db, timesheet_count, first_date)
+        populate_seconds = time.perf_counter() - start
+        if populate_config is not storage_config:
+            db.close()
+            db = DB(open_storage(storage_config, filestore_path))
+        commit_seconds = _time_commits(db, commits, last_date)
+
+        open_seconds = None
+        if backend != BACKEND_MEMORY:
+            db.close()
+            start = time.perf_counter()
+            db = DB(open_storage(storage_config, filestore_path))
+            with db.transaction() as connection:
+                connection.root.timesheet_storage.version
+            open_seconds = time.perf_counter() - start
+
+        recent_seconds, _count = _time_scan(
+            db, last_date - datetime.timedelta(days=SCAN_DAYS - 1), last_date)
+        full_seconds, scanned = _time_scan(db, None, None)
+        db.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'backend': backend,
+        'populate_ms': _ms(populate_seconds),
+        'open_ms': _ms(open_seconds) if open_seconds is not None else None,
+        'commit_ms': _ms(commit_seconds),
+        'scan_recent_ms': _ms(recent_seconds),
+        'scan_all_ms': _ms(full_seconds),
+        'timesheets': scanned,
+    }
+
+
+def run_benchmark(backends=None, timesheet_count=5000, commits=20):
+    """
+    Benchmark the given backends, skipping the ones that can't be used,
+    such as sqlite without RelStorage.
+    :param backends: names of the backends, all of them by default
+    :return: list of the results of `benchmark_backend`
+    """
+    results = []
+    for backend in backends or STORAGE_BACKENDS:
+        try:
+            results.append(benchmark_backend(backend, timesheet_count, commits))
+        except click.ClickException as e:
+            click.secho(f"Skipped {backend}: {e.message}", fg='yellow', err=True)
+    return results
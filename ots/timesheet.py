@@ -7,11 +7,28 @@ from .helpers import format_timedelta, apply_duration_string
 from persistent import Persistent
 
 
+# Sync states of a timesheet compared to what was last pushed to Odoo
+SYNC_STATE_NEW = "new"  # Never pushed
+SYNC_STATE_DIRTY = "dirty"  # Changed since the last push
+SYNC_STATE_SYNCED = "synced"  # Unchanged since the last push
+
+
 class TimeSheet(Persistent):
     """
     A Timesheet that tracks work time spent on a specific Odoo task or project.
     """
 
+    # Defaults of attributes added after the first versions. Timesheets
+    # stored before an attribute existed read the default from the class,
+    # so they don't need to be migrated, until the attribute is set.
+    id = None
+    task_title = ""
+    project_title = ""
+    employee_id = None
+    odoo_id = None
+    odoo_pushed_vals = None
+    last_push = None
+
     def __init__(
             self,
             project_id=None,
@@ -20,7 +37,7 @@ class TimeSheet(Persistent):
             task_code="",
             duration=datetime.timedelta(),
             is_worktime=True,
-            date=datetime.date.today(),
+            date=None,
     ):
         """
         Stuff and shit
@@ -31,7 +48,7 @@ class TimeSheet(Persistent):
         :param str task_code: Odoo task code (project.task.code)
         :param bool is_worktime: Whether or not the time recorded by this timesheet
         is considered work time.
-        :param datetime.date date:
+        :param datetime.date date: Date of the timesheet, defaults to today
         """
         if project_id is not None:
             assert isinstance(project_id, int)
@@ -50,7 +67,7 @@ class TimeSheet(Persistent):
 
         self.start_time = None  # datetime.datetime
         self.duration = duration  # datetime.timedelta
-        self.date = date
+        self.date = date if date is not None else datetime.date.today()
         self.created = datetime.datetime.now()
 
         self.employee_id = None  # Employee ID in Odoo
@@ -58,6 +75,19 @@ class TimeSheet(Persistent):
         # The filestore assigns a value for this once stored for the first time
         self.id = None
         self.odoo_id = None
+        # The values sent to Odoo on the last push, and when that happened.
+        # Used to detect if the timesheet has changed since the last push.
+        self.odoo_pushed_vals = None
+        self.last_push = None  # datetime.datetime
+
+    def __setstate__(self, state):
+        # The 0.2 migration stored the dates of existing timesheets as
+        # datetimes. They are upgraded when loaded, and stored as dates the
+        # next time the timesheet changes.
+        date = state.get('date') if isinstance(state, dict) else None
+        if isinstance(date, datetime.datetime):
+            state = dict(state, date=date.date())
+        super().__setstate__(state)
 
     def __repr__(self):
         string_repr = ""
@@ -152,27 +182,84 @@ class TimeSheet(Persistent):
     def is_running(self):
         return bool(self.start_time)
 
-    def odoo_push(self, odoo):
-
-        timesheet_model = odoo.env['account.analytic.line']
-        timesheet_vals = self._get_odoo_timesheet_vals(round_duration=True)
-
+    def is_pushable(self):
+        """
+        Whether or not this timesheet is something that should be sent to Odoo.
+        Prints a note if a work time timesheet can't be pushed.
+        :return bool:
+        """
         # Things we don't want to push
         if not self.is_worktime:
-            return
+            return False
 
         if not self.project_id:
             click.echo(f"Timesheet {repr(self)}, no project_id. Not pushing.")
+            return False
+
+        return True
+
+    def odoo_push(self, odoo):
+
+        timesheet_model = odoo.env['account.analytic.line']
+
+        if not self.is_pushable():
             return
 
+        timesheet_vals = self._get_odoo_timesheet_vals(round_duration=True)
         if self.odoo_id:
             odoo_timesheet = timesheet_model.browse(self.odoo_id)
             odoo_timesheet.write(timesheet_vals)
         else:
             new_id = timesheet_model.create(timesheet_vals)
             self.odoo_id = new_id
+        self.mark_pushed(timesheet_vals)
         return self.odoo_id
 
+    def mark_pushed(self, timesheet_vals):
+        """
+        Record the values that were pushed to Odoo
+        :param dict timesheet_vals: values sent to Odoo
+        """
+        self.odoo_pushed_vals = dict(timesheet_vals)
+        self.last_push = datetime.datetime.now()
+
+    def apply_odoo_vals(self, timesheet_vals, task_code="", task_title="", project_title=""):
+        """
+        Overwrite this timesheet with values read from Odoo, and record them
+        as the values in Odoo, as if they had been pushed.
+        :param dict timesheet_vals: values in the format of `_get_odoo_timesheet_vals`
+        :param str task_code: code of the task
+        :param str task_title: name of the task
+        :param str project_title: name of the project
+        """
+        self.project_id = timesheet_vals['project_id']
+        self.task_id = timesheet_vals['task_id']
+        self.employee_id = timesheet_vals['employee_id']
+        self.duration = datetime.timedelta(hours=timesheet_vals['unit_amount'])
+        self.date = datetime.datetime.strptime(timesheet_vals['date'], '%Y-%m-%d').date()
+        self.description = timesheet_vals['name']
+        self.task_code = task_code
+        self.task_title = task_title
+        self.project_title = project_title
+        self.mark_pushed(timesheet_vals)
+
+    def get_sync_state(self):
+        """
+        Compare the current values of the timesheet to the ones
+        that were last pushed to Odoo.
+        :return str: one of the SYNC_STATE_* constants
+        """
+        if not self.odoo_id:
+            return SYNC_STATE_NEW
+        # Timesheets pushed before the pushed values were recorded are
+        # considered dirty, since we can't know their state.
+        if self.odoo_pushed_vals != self._get_odoo_timesheet_vals():
+            return SYNC_STATE_DIRTY
+        return SYNC_STATE_SYNCED
+
+    def is_dirty(self):
+        return self.get_sync_state() != SYNC_STATE_SYNCED
+
     def set_duration(self, duration):
         if self.is_running():
             raise click.ClickException("Can't edit the duration of a running timesheet. "
@@ -220,6 +307,30 @@ class TimeSheet(Persistent):
             'name': self.description,
         }
 
+    def get_export_vals(self):
+        """
+        :return: dictionary of the values of this timesheet that can be
+            serialized as CSV or JSON
+        """
+        duration = self.get_duration()
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'task_code': self.task_code,
+            'task_id': self.task_id,
+            'task_title': self.task_title,
+            'project_id': self.project_id,
+            'project_title': self.project_title,
+            'description': self.description,
+            'duration': format_timedelta(duration),
+            'hours': round(duration.total_seconds() / 3600, 2),
+            'is_worktime': self.is_worktime,
+            'running': self.is_running(),
+            'odoo_id': self.odoo_id,
+            'sync_state': self.get_sync_state(),
+            'created': self.created.isoformat(timespec='seconds'),
+        }
+
     def copy(self, **overrides):
         """
         Create a copy of this timesheet.
@@ -236,33 +347,25 @@ class TimeSheet(Persistent):
 
     def update(self, storage):
         """
-        Updates the project and task titles of a Timesheet or TimesheetAlias
-        :param odoo: odoorpc.Odoo authenticated to a database
+        Updates the project and task titles of a Timesheet
+        :param storage: TimesheetFileStore used to get the data from Odoo
         """
-        odoo = storage.load_odoo_session()
-
         task_code = self.task_code
         if task_code:
-            task_id = storage._odoo_search_task_by_code(task_code)
-            if task_id:
-                task = odoo.env['project.task'].browse(task_id)
-                # read returns a list, but only one task so extract the dict
-                task_vals = task.read(["project_id", "name"])[0]
-
-                self.task_id = task_vals.get("id")
-                self.task_title = task_vals.get("name", "")
-
-                project_id, project_title = task_vals.get("project_id", (None, ""))
-                self.project_id = project_id
-                self.project_title = project_title
+            task_vals = storage.get_odoo_task(task_code)
+            if task_vals:
+                self.task_id = task_vals["id"]
+                self.task_title = task_vals["name"]
+                self.project_id = task_vals["project_id"]
+                self.project_title = task_vals["project_title"]
         elif self.project_id:
-            project = odoo.env['project.project'].browse(self.project_id)
-            self.project_title = project.name
+            project_vals = storage.get_odoo_project(self.project_id)
+            if project_vals:
+                self.project_title = project_vals["name"]
 
         else:
             # TODO: Later, we would like to upgrade some information on the timesheet
             #  even though we didn't have the task code, if we have task_id or project_id instead
             click.echo("Timesheet has no task code or project_id, information not updated.")
 
-        employee_id = odoo.env['hr.employee'].search([('user_id', '=', odoo.env.uid)], limit=1)
-        self.employee_id = employee_id[0] if employee_id else None
+        self.employee_id = storage.get_odoo_employee_id()
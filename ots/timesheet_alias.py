@@ -62,29 +62,22 @@ class TimeSheetAlias(Persistent):
     def update(self, storage):
         """
         Updates the project and task titles from Odoo.
-        :param odoo: odoorpc.Odoo authenticated to a database
+        :param storage: TimesheetFileStore used to get the data from Odoo
         """
-        odoo = storage.load_odoo_session()
         task_code = self.task_code
         if task_code:
-            task_id = storage._odoo_search_task_by_code(task_code)
-            if task_id:
-                task = odoo.env['project.task'].browse(task_id)
-                # read returns a list, but only one task so extract the dict
-                task_vals = task.read(["project_id", "name"])[0]
-
-                self.task_id = task_vals.get("id")
-                self.task_title = task_vals.get("name", "")
-
-                project_id, project_title = task_vals.get("project_id", (None, ""))
-                self.project_id = project_id
-                self.project_title = project_title
+            task_vals = storage.get_odoo_task(task_code)
+            if task_vals:
+                self.task_id = task_vals["id"]
+                self.task_title = task_vals["name"]
+                self.project_id = task_vals["project_id"]
+                self.project_title = task_vals["project_title"]
         elif self.project_id:
-            project = odoo.env['project.project'].browse(self.project_id)
-            self.project_title = project.name
+            project_vals = storage.get_odoo_project(self.project_id)
+            if project_vals:
+                self.project_title = project_vals["name"]
 
         else:
             # TODO: Later, we would like to upgrade some information on the timesheet
             #  even though we didn't have the task code, if we have task_id or project_id instead
             click.echo("Alias has no task code or project_id, information not updated.")
-
@@ -0,0 +1,68 @@
+from persistent import Persistent
+from BTrees.IOBTree import IOBTree
+
+from .timesheet import TimeSheet
+from .timesheet_day import TimesheetDay
+from .timesheet_index import TimesheetIndex
+from .timesheet_totals import TimesheetTotals
+
+
+def copy_timesheet(timesheet):
+    """
+    Copy a Timesheet, so that it can be stored in another database.
+    Persistent objects can only belong to a single database.
+    """
+    copy = TimeSheet.__new__(TimeSheet)
+    copy.__setstate__(timesheet.__getstate__())
+    return copy
+
+
+class TimesheetArchive(Persistent):
+    """
+    The Timesheets of a single year, moved out of the filestore by
+    `ots archive`. Every archive is the root object of a database of its
+    own, which is only opened when the timesheets of its year are needed.
+
+    The archive has the same indexes and totals for its timesheets as the
+    filestore has for the rest, so that archived timesheets can be reported
+    and listed the same way.
+    """
+
+    def __init__(self, year):
+        self.year = year
+        self.timesheets = IOBTree()  # date ordinal -> TimesheetDay
+        self.timesheet_ids = IOBTree()  # timesheet id -> Timesheet
+        self.timesheet_index = TimesheetIndex()
+        self.timesheet_totals = TimesheetTotals()
+
+    def _remove_timesheet(self, timesheet):
+        day = self.timesheets.get(timesheet.date.toordinal(), [])
+        for day_index, day_timesheet in enumerate(day):
+            if day_timesheet is timesheet:
+                del day[day_index]
+                break
+        self.timesheet_ids.pop(timesheet.id, None)
+        self.timesheet_index.unindex(timesheet)
+        self.timesheet_totals.remove(timesheet)
+
+    def add_day(self, date_ordinal, timesheets):
+        """
+        Store copies of the timesheets of a day, next to the timesheets of
+        the day archived earlier. A timesheet already in the archive is
+        replaced by its new copy, so archiving the same day again is harmless,
+        and an archiving that failed halfway can simply be done again.
+        :param int date_ordinal: ordinal of the date
+        :param timesheets: the Timesheets of the day in the filestore
+        """
+        day = self.timesheets.get(date_ordinal)
+        if day is None:
+            day = self.timesheets[date_ordinal] = TimesheetDay()
+        for timesheet in timesheets:
+            copy = copy_timesheet(timesheet)
+            archived = self.timesheet_ids.get(copy.id)
+            if archived is not None:
+                self._remove_timesheet(archived)
+            day.append(copy)
+            self.timesheet_ids[copy.id] = copy
+            self.timesheet_index.index(copy)
+            self.timesheet_totals.update(copy)
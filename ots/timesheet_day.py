@@ -0,0 +1,12 @@
+from persistent.list import PersistentList
+
+
+class TimesheetDay(PersistentList):
+    """
+    The Timesheets of a single day, in the order they were added.
+
+    Being a persistent object of its own, the day is stored separately from
+    the BTree bucket containing it, and only holds references to its
+    Timesheets. Adding or removing a Timesheet only stores this small list of
+    references, and changing a Timesheet only stores that Timesheet.
+    """
@@ -1,21 +1,261 @@
 import click
+import concurrent.futures
 import datetime
-import calendar
-import odoorpc
+import heapq
+import itertools
+import json
+import re
 
-from dateutil import relativedelta
 from persistent import Persistent
 from BTrees.IOBTree import IOBTree
 from BTrees.OOBTree import OOBTree
-from tabulate import tabulate
 from collections import defaultdict
 
-from .helpers import format_timedelta
-from .timesheet import TimeSheet
+from .helpers import echo_csv, format_timedelta
+from .timesheet import TimeSheet, SYNC_STATE_NEW, SYNC_STATE_DIRTY, SYNC_STATE_SYNCED
 from .timesheet_alias import TimeSheetAlias
+from .timesheet_archive import copy_timesheet
+from .timesheet_day import TimesheetDay
+from .timesheet_index import TimesheetIndex
+from .timesheet_totals import TimesheetTotals
+from .odoo_cache import (
+    OdooMetadataCache,
+    ResolvedOdooData,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CACHE_TTL_HOURS,
+    fetch_all_projects,
+    fetch_changed_task_ids,
+    fetch_employee_id,
+    fetch_open_tasks,
+    fetch_projects,
+    fetch_tasks,
+    fetch_tasks_by_code,
+    fetch_timesheet_lines,
+)
 from .helpers import apply_duration_string, limit_str_length
+from .odoo_connection import OdooConnectionManager
+from .outbox import Outbox, OP_PUSH, OP_UPDATE
 from .__about__ import __version__
 
+# read always returns id, even if we don't ask for it, but we use it as a header
+# so simpler to include it here and reuse the fields-list as the table headers
+SEARCH_TASK_FIELDS = [
+    "code",
+    "name",
+    "project_id",
+    "stage_id",
+    "id",
+]
+SEARCH_PROJECT_FIELDS = [
+    "name",
+    "id",
+]
+SEARCH_RESULT_LIMIT = 20
+
+# Maximum number of requests made to Odoo at the same time
+ODOO_MAX_WORKERS = 4
+
+# Maximum number of timesheets pushed by `ots sync` with a single request
+OUTBOX_BATCH_SIZE = 200
+# Allowed difference between the clocks of Odoo and this machine, when
+# looking for the lines created by a push that failed
+ADOPT_CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+# Fields of exported timesheets, in the order of the CSV columns
+EXPORT_FIELDS = [
+    "id",
+    "date",
+    "task_code",
+    "task_id",
+    "task_title",
+    "project_id",
+    "project_title",
+    "description",
+    "duration",
+    "hours",
+    "is_worktime",
+    "running",
+    "odoo_id",
+    "sync_state",
+    "created",
+]
+# How many timesheets to export between clearing the object cache
+EXPORT_CACHE_GC_INTERVAL = 1000
+# How many timesheets to import between savepoints
+IMPORT_CHUNK_SIZE = 500
+# How many invalid rows of an import to list
+IMPORT_ERRORS_SHOWN = 20
+
+# NOTE: `odoorpc` and `tabulate` are slow to import, and most commands never
+# need them, so they are imported only in the methods that use them.
+
+
+def _supports_create_multi(odoo):
+    """
+    Odoo accepts a list of values for `create` starting from version 12.0
+    :param odoo: odoorpc.ODOO
+    :return bool:
+    """
+    # Versions can also be in the format "saas~12.3"
+    version_match = re.search(r'(\d+)\.', odoo.version or "")
+    return bool(version_match) and int(version_match.group(1)) >= 12
+
+
+def _to_odoo_datetime(local_datetime):
+    """
+    :param datetime.datetime local_datetime: naive datetime in local time
+    :return str: the datetime in UTC, in the format of Odoo
+    """
+    return local_datetime.astimezone(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _run_concurrently(calls, max_workers=ODOO_MAX_WORKERS):
+    """
+    Make independent requests to Odoo at the same time, sharing the same
+    session. The functions must not touch the filestore, since it can
+    only be used from the main thread.
+    :param calls: list of (function, arguments) tuples
+    :param int max_workers: maximum number of requests at the same time
+    :return: list of the results of the functions, in the same order
+    """
+    if len(calls) <= 1:
+        return [function(*args) for function, args in calls]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(function, *args) for function, args in calls]
+        return [future.result() for future in futures]
+
+
+# (operation, timesheet id) of the outbox entries of the OutboxSyncs that
+# haven't finished yet. Other syncs leave them alone, so that the daemon
+# doesn't push a timesheet twice while its sync runs in another thread.
+_syncing_outbox_keys = set()
+
+
+class _OutboxPush:
+    """
+    A timesheet pushed by an `OutboxSync`.
+    """
+
+    def __init__(self, timesheet_id, timesheet, adopt_since=None):
+        self.timesheet_id = timesheet_id
+        # Copy of the timesheet, not tied to the filestore, which is pushed
+        # and gets the results of the push
+        self.timesheet = timesheet
+        self.pushed_vals = timesheet.odoo_pushed_vals
+        # If a push that failed may have created the timesheet in Odoo, when
+        # the lines it created would have been created, in the Odoo format
+        self.adopt_since = adopt_since
+        self.adopt_vals = None
+        self.line_ids = []  # Lines found in Odoo that the failed push may have created
+        self.error = None
+
+
+class OutboxSync:
+    """
+    Syncing the outbox without the filestore, in three steps:
+    `TimesheetFileStore.prepare_outbox_sync` reads what needs to be done,
+    `run` does it in Odoo, and `TimesheetFileStore.finish_outbox_sync`
+    writes the results to the filestore.
+
+    `run` never touches the filestore nor prints anything, so the daemon
+    can run it in another thread, and go on serving commands while Odoo
+    is slow.
+    """
+
+    def __init__(self, odoo_connection, now):
+        self.odoo_connection = odoo_connection
+        self.now = now
+
+        # Timesheets to update, and what they need that is not cached
+        self.update_ids = []
+        self.task_codes = []
+        self.project_ids = []
+        self.with_employee = False
+        # Lists of _OutboxPushes, each pushed with a single request
+        self.push_batches = []
+
+        # Results of `run`
+        self.connect_error = None
+        self.update_error = None
+        self.fetched = {}  # Keyword arguments of `TimesheetFileStore.cache_odoo_data`
+        self.created = []
+        self.wrote = []
+
+    def claim(self):
+        _syncing_outbox_keys.update(self._get_keys())
+
+    def release(self):
+        _syncing_outbox_keys.difference_update(self._get_keys())
+
+    def _get_keys(self):
+        keys = [(OP_UPDATE, timesheet_id) for timesheet_id in self.update_ids]
+        keys += [(OP_PUSH, push.timesheet_id) for push in itertools.chain.from_iterable(self.push_batches)]
+        return keys
+
+    def needs_fetch(self):
+        """
+        :return bool: whether or not the updates need something from Odoo
+        """
+        return bool(self.update_ids and (self.task_codes or self.project_ids or self.with_employee))
+
+    def run(self, load_odoo=None):
+        """
+        Make the requests to Odoo, and keep the results for
+        `TimesheetFileStore.finish_outbox_sync`.
+        :param load_odoo: function returning the odoorpc.ODOO to use,
+            defaults to the session of the connection manager
+        """
+        if not self.needs_fetch() and not self.push_batches:
+            return
+        try:
+            odoo = (load_odoo or self.odoo_connection.get_odoo)()
+        except Exception as e:  # TODO: Guess
+            self.connect_error = e
+            return
+
+        if self.needs_fetch():
+            try:
+                tasks, projects = _run_concurrently([
+                    (fetch_tasks_by_code, (odoo, self.task_codes)),
+                    (fetch_projects, (odoo, self.project_ids)),
+                ])
+                self.fetched = {
+                    'tasks': tasks,
+                    'projects': projects,
+                    'employee_id': fetch_employee_id(odoo) if self.with_employee else None,
+                    'with_employee': self.with_employee,
+                }
+            except Exception as e:  # TODO: Guess
+                self.update_error = e
+
+        for batch in self.push_batches:
+            try:
+                self._find_created_lines(odoo, [push for push in batch if push.adopt_since is not None])
+                created, wrote, _unchanged = TimesheetFileStore._odoo_push_batch(
+                    odoo, [push.timesheet for push in batch if not push.line_ids], include_unchanged=True)
+            except Exception as e:  # TODO: Guess
+                for push in batch:
+                    push.error = e
+                continue
+            self.created.extend(created)
+            self.wrote.extend(wrote)
+
+    @staticmethod
+    def _find_created_lines(odoo, pushes):
+        """
+        Look for the identical timesheet lines created by the user since the
+        first push that failed, see `TimesheetFileStore._adopt_created_line`.
+        """
+        timesheet_model = odoo.env['account.analytic.line']
+        for push in pushes:
+            push.adopt_vals = push.timesheet._get_odoo_timesheet_vals(round_duration=True)
+            domain = [(field, '=', value) for field, value in push.adopt_vals.items()]
+            domain += [
+                ('create_uid', '=', odoo.env.uid),
+                ('create_date', '>=', push.adopt_since),
+            ]
+            push.line_ids = timesheet_model.search(domain, order="id") or []
+
 
 class TimesheetFileStore(Persistent):
     """
@@ -23,9 +263,25 @@ class TimesheetFileStore(Persistent):
     the Odoo connection.
     """
 
+    # Defaults of attributes added after the first versions, read from the
+    # class by filestores stored before the attribute existed. See
+    # `__init__` for what they are.
+    last_pull_write_date = None
+    last_pack_size = None
+    archived_before = None
+    archived_years = ()
+    # Progress of an interrupted migration, see `migration.migrate`
+    migration_progress = None
+
     def __init__(self):
         self.sequence_next_id = 1
         self.timesheets = IOBTree()
+        # Timesheet id -> Timesheet, to find timesheets by their id
+        self.timesheet_ids = IOBTree()
+        # Timesheets by their task code, project and Odoo id
+        self.timesheet_index = TimesheetIndex()
+        # Work time totals of every day and week
+        self.timesheet_totals = TimesheetTotals()
         self.aliases = OOBTree()
 
         # Specific Timesheets of interest
@@ -38,9 +294,65 @@ class TimesheetFileStore(Persistent):
         self.odoo_port = 8069
         self.odoo_database = ""
         self.odoo_username = ""
+        # Locally cached data from Odoo
+        self.odoo_cache = OdooMetadataCache()
+        # Greatest `write_date` of the timesheet lines pulled from Odoo so far
+        self.last_pull_write_date = None
+        # Operations waiting to be done in Odoo
+        self.outbox = Outbox()
+        # Size of the database after it was last packed
+        self.last_pack_size = None
+        # Timesheets before this date ordinal have been moved to the yearly
+        # archives of these years by `ots archive`
+        self.archived_before = None
+        self.archived_years = ()
         # The ots version this filestore was initiated on.
         self.version = __version__
 
+    def set_config(self, config):
+        """
+        Give the filestore the current configuration. The configuration is
+        never stored in the filestore itself.
+        :param dict config: configuration loaded from config.json
+        """
+        self._v_config = config
+
+    def set_archives(self, archives):
+        """
+        Give the filestore the manager of its archives for the current
+        command. Like the configuration, it is never stored in the filestore.
+        :param ArchiveManager archives:
+        """
+        self._v_archives = archives
+
+    def _get_archives(self, min_ordinal=None, max_ordinal=None):
+        """
+        Open the archives with timesheets in the date range, if any.
+        :param int min_ordinal: ordinal of the first date, None for no limit
+        :param int max_ordinal: ordinal of the last date, None for no limit
+        :return: list of TimesheetArchives in date order
+        """
+        archives = getattr(self, '_v_archives', None)
+        if archives is None or not self.archived_before:
+            return []
+        if min_ordinal is not None and min_ordinal >= self.archived_before:
+            return []
+
+        min_year = datetime.date.fromordinal(min_ordinal).year if min_ordinal else None
+        max_year = datetime.date.fromordinal(max_ordinal).year if max_ordinal else None
+        opened = []
+        for year in self.archived_years:
+            if (min_year and year < min_year) or (max_year and year > max_year):
+                continue
+            archive = archives.get_archive(year)
+            if archive is not None:
+                opened.append(archive)
+        return opened
+
+    def _get_config_value(self, key, default=None):
+        config = getattr(self, '_v_config', None) or {}
+        return config.get(key, default)
+
     def _get_next_id(self):
         next_id = self.sequence_next_id
         self.sequence_next_id += 1
@@ -49,8 +361,9 @@ class TimesheetFileStore(Persistent):
     @staticmethod
     def _split_index(index):
         index_error = click.UsageError(
-            f"The index needs to be an integer, or two integers "
-            f"separated by a period '.'. Index received: {repr(index)}"
+            f"The index needs to be an integer, two integers "
+            f"separated by a period '.', or a timesheet id prefixed with '#'. "
+            f"Index received: {repr(index)}"
         )
 
         index_split = index.split('.')
@@ -76,53 +389,186 @@ class TimesheetFileStore(Persistent):
     # ===== Timesheet stuffs =====
     # ============================
 
-    def _add_timesheet(self, timesheet, date=datetime.date.today()):
+    def _add_timesheet(self, timesheet, date=None, update=True):
         """
 
         :param timesheet: Timesheet
-        :param date: date to add timesheet to
+        :param date: date to add timesheet to, defaults to the date of the timesheet
+        :param bool update: update the timesheet from Odoo right away
         :return:
         """
-        date_ordinal = date.toordinal()
-        timesheets = self.timesheets.get(date_ordinal, [])
-
+        if date is None:
+            date = timesheet.date
         timesheet.id = self._get_next_id()
-        timesheets.append(timesheet)
-        self.timesheets[date_ordinal] = timesheets
+        self._get_day(date.toordinal()).append(timesheet)
+        self._index_timesheet(timesheet)
+
+        if update and self.is_session_stored():
+            if self._get_config_value('background_updates', True):
+                # Don't wait for Odoo: update the timesheet from the cache,
+                # or leave the update to a background sync
+                if not self._update_timesheet_from_cache(timesheet):
+                    self.outbox.enqueue(OP_UPDATE, timesheet.id)
+                    self.request_background_sync()
+            else:
+                # attempt to update the timesheet, but don't explode even if it fails
+                try:
+                    timesheet.update(self)
+                except Exception as e:  # TODO: Guess
+                    self.outbox.enqueue(OP_UPDATE, timesheet.id)
+                    click.secho(
+                        "Something went wrong when trying to update data from Odoo. "
+                        "The update was queued, run 'ots sync' to try again.\n"
+                        f"{e}",
+                        fg='yellow',
+                        bold=True,
+                    )
+            # The update may have found the project of the task
+            self._index_timesheet(timesheet)
+
+    def _update_timesheet_from_cache(self, timesheet):
+        """
+        Update a timesheet from Odoo data in the local cache, without
+        contacting Odoo.
+        :return bool: whether or not everything needed was cached
+        """
+        resolved = self.resolve_odoo_data(
+            task_codes=[timesheet.task_code] if timesheet.task_code else [],
+            project_ids=[timesheet.project_id] if not timesheet.task_code else [],
+            cache_only=True,
+        )
+        if resolved is None:
+            return False
+        timesheet.update(resolved)
+        return True
 
-        # attempt to update the timesheet, but don't explode even if it fails
-        if self.is_session_stored():
-            try:
-                timesheet.update(self)
-            except Exception as e:  # TODO: Guess
-                click.secho(
-                    "Something went wrong when trying to update data from Odoo.\n"
-                    f"{e}",
-                    fg='yellow',
-                    bold=True,
-                )
+    def request_background_sync(self):
+        """
+        Ask for `ots sync` to be run in the background once the current
+        command is done, see `pop_background_sync_request`.
+        """
+        self._v_background_sync_requested = True
+
+    def pop_background_sync_request(self):
+        """
+        :return bool: whether or not a background sync has been requested
+            since the previous call
+        """
+        requested = getattr(self, '_v_background_sync_requested', False)
+        self._v_background_sync_requested = False
+        return requested
+
+    def get_missing_update_data(self):
+        """
+        Find out what the updates waiting in the outbox need from Odoo that
+        is not in the local cache, so that it can be fetched without keeping
+        the filestore open, see `ots.background`.
+        :return: (session name, task codes, project ids, whether or not
+            the employee of the user is needed), or None if there are no
+            updates to do
+        """
+        entries = self.outbox.get_entries(OP_UPDATE, due_at=datetime.datetime.now())
+        if not entries:
+            return None
+        timesheets = [timesheet for _entry, timesheet in self._get_outbox_timesheets(entries)]
+        return (self._get_odoo_session_name(), *self._find_missing_update_data(timesheets))
+
+    def _find_missing_update_data(self, timesheets):
+        """
+        :param timesheets: iterable of the Timesheets to update
+        :return: (task codes, project ids, whether or not the employee of
+            the user is needed) that are not in the local cache
+        """
+        ttl = self._get_cache_ttl()
+        task_codes = set()
+        project_ids = set()
+        for timesheet in timesheets:
+            if timesheet.task_code:
+                if self.odoo_cache.get_task_by_code(timesheet.task_code, ttl=ttl) is None:
+                    task_codes.add(timesheet.task_code)
+            elif timesheet.project_id:
+                if self.odoo_cache.get_project(timesheet.project_id, ttl=ttl) is None:
+                    project_ids.add(timesheet.project_id)
+        found, _employee_id = self.odoo_cache.get_employee_id(self._get_odoo_session_name(), ttl=ttl)
+        return sorted(task_codes), sorted(project_ids), not found
+
+    def cache_odoo_data(self, tasks=(), projects=(), employee_id=None, with_employee=False):
+        """
+        Store Odoo data fetched without the filestore in the local cache.
+        :param tasks: list of task values
+        :param projects: list of project values
+        :param int employee_id: employee of the user, stored if `with_employee`
+        """
+        self._cache_tasks(tasks)
+        self._cache_projects(projects)
+        if with_employee:
+            self.odoo_cache.store_employee_id(self._get_odoo_session_name(), employee_id)
+
+    def apply_cached_updates(self, looked_up_task_codes=(), looked_up_project_ids=(), entries=None):
+        """
+        Do the updates waiting in the outbox whose Odoo data is cached,
+        without contacting Odoo. The rest are left for `sync_outbox`.
+        :param looked_up_task_codes: task codes Odoo was just asked for.
+            The ones that are still not cached don't exist in Odoo, so the
+            updates needing them are done with what there is, instead of
+            waiting for them forever.
+        :param looked_up_project_ids: project ids Odoo was just asked for
+        :param entries: the update entries to do, defaults to the ones due
+        :return: the number of timesheets updated
+        """
+        ttl = self._get_cache_ttl()
+        unknown_task_codes = {
+            task_code for task_code in looked_up_task_codes
+            if self.odoo_cache.get_task_by_code(task_code, ttl=ttl) is None}
+        unknown_project_ids = {
+            project_id for project_id in looked_up_project_ids
+            if self.odoo_cache.get_project(project_id, ttl=ttl) is None}
+
+        if entries is None:
+            entries = self.outbox.get_entries(OP_UPDATE, due_at=datetime.datetime.now())
+        updated = 0
+        for entry, timesheet in self._get_outbox_timesheets(entries):
+            task_code = timesheet.task_code
+            project_id = None if task_code else timesheet.project_id
+            resolved = self.resolve_odoo_data(
+                task_codes=[task_code] if task_code and task_code not in unknown_task_codes else [],
+                project_ids=[project_id] if project_id and project_id not in unknown_project_ids else [],
+                cache_only=True,
+            )
+            if resolved is None:
+                continue
+            timesheet.update(resolved)
+            self._index_timesheet(timesheet)
+            self.outbox.remove(entry)
+            updated += 1
+        return updated
 
     def add_timesheet(
             self,
             task_code="",
             description="",
             is_worktime=True,
-            date=datetime.date.today(),
+            date=None,
             duration=None,
             task_id=None,
             project_id=None,
+            update=True,
     ):
         """
         :param str task_code: Odoo task code
         :param str description: Timesheet description
         :param bool is_worktime: Whether or not the time tracked is work time or not
-        :param datetime.date date: Date of the timesheet
+        :param datetime.date date: Date of the timesheet, defaults to today
         :param (datetime.timedelta, str) duration: Duration of tracked time for the timesheet
         :param int task_id: Odoo database id of the task
         :param int project_id: Odoo database id of the project
+        :param bool update: update the timesheet from Odoo right away
         :return Timesheet: Return created timesheet
         """
 
+        if date is None:
+            date = datetime.date.today()
+
         # Check if the task code is an alias
         if task_code and task_code in self.aliases:
             timesheet = self.aliases[task_code].generate_timesheet()
@@ -147,7 +593,7 @@ class TimesheetFileStore(Persistent):
                 duration = apply_duration_string(duration)
             timesheet.set_duration(duration)
 
-        self._add_timesheet(timesheet, date=date)
+        self._add_timesheet(timesheet, date=date, update=update)
 
         return timesheet
 
@@ -156,6 +602,7 @@ class TimesheetFileStore(Persistent):
 
         if self.current_running:
             self.current_running.stop()
+            self._index_timesheet(self.current_running)
             self.last_running = self.current_running
 
         timesheet.start()
@@ -205,27 +652,84 @@ class TimesheetFileStore(Persistent):
                 # stop it, just in case we somehow stopped the timesheet but left it
                 # as `current_running`
                 self.current_running.stop()
+                self._index_timesheet(self.current_running)
 
             self.last_running = self.current_running
             self.current_running = None
 
-    def edit_timesheet(self, index, **kwargs):
+    def edit_timesheet(self, index, date=None, **kwargs):
         timesheet = self.get_timesheet_by_index(index)
-        return timesheet.edit(storage=self, **kwargs)
+        old_date = timesheet.date
+        edited = timesheet.edit(storage=self, date=date, **kwargs)
+        if date is not None and date != old_date:
+            self._move_timesheet(timesheet, old_date)
+        self._index_timesheet(timesheet)
+        return edited
+
+    def _move_timesheet(self, timesheet, old_date):
+        """
+        Move a timesheet from the day of its old date to the day of
+        its current date.
+        """
+        self._remove_from_day(timesheet, old_date)
+        self._get_day(timesheet.date.toordinal()).append(timesheet)
+
+    def _remove_from_day(self, timesheet, date):
+        day = self.timesheets.get(date.toordinal(), [])
+        for day_index, day_timesheet in enumerate(day):
+            if day_timesheet is timesheet:
+                del day[day_index]
+                break
+        if date.toordinal() in self.timesheets and not day:
+            # Don't leave empty days behind, for archiving and range scans
+            del self.timesheets[date.toordinal()]
+
+    def _index_timesheet(self, timesheet):
+        """
+        Add a timesheet to the indexes and the totals, or update its entries
+        after its date, task, project, duration or Odoo id have changed.
+        """
+        self.timesheet_ids[timesheet.id] = timesheet
+        self.timesheet_index.index(timesheet)
+        self.timesheet_totals.update(timesheet)
+
+    def _unindex_timesheet(self, timesheet):
+        self.timesheet_ids.pop(timesheet.id, None)
+        self.timesheet_index.unindex(timesheet)
+        self.timesheet_totals.remove(timesheet)
+
+    def get_timesheet_by_id(self, timesheet_id):
+        """
+        :param int timesheet_id: id of the timesheet
+        :return: timesheet with the id
+        """
+        timesheet = self.timesheet_ids.get(timesheet_id)
+        if timesheet is None:
+            raise click.ClickException(f"No timesheet with id {timesheet_id}.")
+        return timesheet
 
     def get_timesheet_by_index(self, index):
         """
         index of a timesheet or optionally negative date offset and an index
-         separated by a period ('.').
+         separated by a period ('.'), or an id of a timesheet prefixed with '#'.
 
         Index "2" => timesheets at index 1 for today (no offset). This is same as "0.2"
         Index "1.2" => Yesterday's (today - date offset of 1) timesheets at index 2
+        Index "#42" => the timesheet with id 42, regardless of its date
         :param index: string
         :return: timesheet matching the index
         """
+        if index.strip().startswith('#'):
+            try:
+                timesheet_id = int(index.strip()[1:])
+            except ValueError:
+                raise click.UsageError(
+                    f"A timesheet id needs to be an integer after '#'. Index received: {repr(index)}")
+            return self.get_timesheet_by_id(timesheet_id)
+
         date_offset, task_index = self._split_index(index)
 
-        timesheet_date = datetime.date.today() - relativedelta.relativedelta(days=date_offset)
+        timesheet_date = datetime.date.today() - datetime.timedelta(days=date_offset)
         timesheet_ordinal = timesheet_date.toordinal()
         timesheets = self.timesheets.get(timesheet_ordinal, [])
         if not timesheets:
@@ -240,7 +744,75 @@ class TimesheetFileStore(Persistent):
         timesheet = timesheets[task_index]
         return timesheet
 
+    def _get_day(self, date_ordinal):
+        """
+        Get the TimesheetDay of a date, creating it if it doesn't exist yet.
+        :param int date_ordinal: ordinal of the date
+        :return TimesheetDay:
+        """
+        day = self.timesheets.get(date_ordinal)
+        if day is None:
+            day = self.timesheets[date_ordinal] = TimesheetDay()
+        return day
+
+    def get_timesheet_by_odoo_id(self, odoo_id):
+        """
+        :param int odoo_id: Odoo database id of a pushed timesheet
+        :return: the timesheet pushed with the id, or None
+        """
+        timesheet_id = self.timesheet_index.get_odoo_id(odoo_id)
+        if timesheet_id is None:
+            return None
+        return self.timesheet_ids.get(timesheet_id)
+
+    def find_timesheets(self, task_code=None, project_id=None, date_min=None, date_max=None):
+        """
+        Find the timesheets of a task or a project, in date order.
+        Only the matching timesheets are loaded, not every timesheet of the
+        date range.
+        :param str task_code: Odoo task code
+        :param int project_id: Odoo database id of the project
+        :param datetime.date date_min: first date to include
+        :param datetime.date date_max: last date to include
+        :return: generator of timesheets
+        """
+        if not task_code and not project_id:
+            raise ValueError("Either a task code or a project id is required.")
+
+        min_ordinal = date_min.toordinal() if date_min else None
+        max_ordinal = date_max.toordinal() if date_max else None
+        index = self.timesheet_index
+        if task_code:
+            timesheet_ids = index.get_task_code_ids(task_code, min_ordinal, max_ordinal)
+        else:
+            timesheet_ids = index.get_project_ids(project_id, min_ordinal, max_ordinal)
+
+        for timesheet_id in timesheet_ids:
+            timesheet = self.timesheet_ids[timesheet_id]
+            if project_id and timesheet.project_id != project_id:
+                continue
+            yield timesheet
+
     def find_timesheet(self, date, project_id=None, task_id=None, description=None):
+        """
+        Find the first timesheet of the date matching all the given values.
+        :param datetime.date date: date of the timesheet
+        :param int project_id: Odoo database id of the project
+        :param int task_id: Odoo database id of the task
+        :param str description: description of the timesheet
+        :return: the matching timesheet, or None
+        """
+        if project_id:
+            candidates = self.find_timesheets(project_id=project_id, date_min=date, date_max=date)
+        else:
+            candidates = self.timesheets.get(date.toordinal(), [])
+
+        for timesheet in candidates:
+            if task_id is not None and timesheet.task_id != task_id:
+                continue
+            if description is not None and timesheet.description != description:
+                continue
+            return timesheet
         return None
 
     def get_timesheets(self, date_min, date_max):
@@ -254,16 +826,205 @@ class TimesheetFileStore(Persistent):
         max_ordinal = date_max.toordinal()
         return self.timesheets.values(min=min_ordinal, max=max_ordinal)
 
+    def iter_timesheets(self, date_min=None, date_max=None, since_id=None, include_archived=True):
+        """
+        Go through the timesheets one at a time, without loading them all
+        into memory at once.
+        :param datetime.date date_min: first date to include
+        :param datetime.date date_max: last date to include
+        :param int since_id: only include the timesheets with a greater id,
+            i.e. the ones added after it. The timesheets are then given in
+            the order they were added, instead of in date order.
+        :param bool include_archived: also include the read only timesheets
+            of the archives
+        :return: generator of timesheets
+        """
+        min_ordinal = date_min.toordinal() if date_min else None
+        max_ordinal = date_max.toordinal() if date_max else None
+        # Archived timesheets are older than the ones in the filestore
+        archives = self._get_archives(min_ordinal, max_ordinal) if include_archived else []
+        sources = archives + [self]
+        if since_id is not None:
+            timesheets = heapq.merge(
+                *(source.timesheet_ids.values(min=since_id, excludemin=True) for source in sources),
+                key=lambda timesheet: timesheet.id,
+            )
+            timesheets = (
+                timesheet for timesheet in timesheets
+                if (min_ordinal is None or timesheet.date.toordinal() >= min_ordinal)
+                and (max_ordinal is None or timesheet.date.toordinal() <= max_ordinal)
+            )
+        else:
+            timesheets = itertools.chain.from_iterable(
+                itertools.chain.from_iterable(source.timesheets.values(min=min_ordinal, max=max_ordinal))
+                for source in sources
+            )
+
+        for count, timesheet in enumerate(timesheets, start=1):
+            yield timesheet
+            # Let go of the timesheets already handled, so that going
+            # through years of them doesn't keep them all in memory
+            if count % EXPORT_CACHE_GC_INTERVAL == 0:
+                for source in sources:
+                    if source._p_jar is not None:
+                        source._p_jar.cacheGC()
+
+    def export_timesheets(self, output_format, date_min=None, date_max=None, since_id=None):
+        """
+        Write timesheets to the standard output as CSV or JSON Lines, one
+        timesheet at a time. See `iter_timesheets` for the arguments.
+        :param str output_format: 'csv' or 'jsonl'
+        """
+        rows = (
+            timesheet.get_export_vals()
+            for timesheet in self.iter_timesheets(date_min, date_max, since_id=since_id)
+        )
+        if output_format == 'csv':
+            echo_csv(EXPORT_FIELDS, rows)
+        else:
+            for row in rows:
+                click.echo(json.dumps(row))
+
+    def import_timesheets(self, rows, chunk_size=IMPORT_CHUNK_SIZE, skip_invalid=False):
+        """
+        Add timesheets read from a file. All the timesheets are added in the
+        current transaction, which is saved to a savepoint after every chunk
+        to keep the memory use constant. The added timesheets are updated
+        from Odoo once all of them have been added, fetching the tasks and
+        projects they need with a single request each.
+        :param rows: iterable of (line number, row dictionary), see
+            `timesheet_import.read_rows`
+        :param int chunk_size: number of timesheets per savepoint
+        :param bool skip_invalid: skip invalid rows instead of failing the
+            whole import
+        :return: the number of timesheets added
+        """
+        from .timesheet_import import InvalidRowError, parse_row
+
+        transaction_manager = self._p_jar.transaction_manager if self._p_jar else None
+        errors = []
+        imported_ids = []
+        for line_number, row in rows:
+            try:
+                timesheet_vals = parse_row(row, self.aliases)
+            except InvalidRowError as e:
+                errors.append(f"Line {line_number}: {e}")
+                continue
+
+            timesheet = self.add_timesheet(update=False, **timesheet_vals)
+            imported_ids.append(timesheet.id)
+            if transaction_manager and len(imported_ids) % chunk_size == 0:
+                transaction_manager.savepoint(optimistic=True)
+
+        if errors:
+            error_lines = "\n".join(errors[:IMPORT_ERRORS_SHOWN])
+            if len(errors) > IMPORT_ERRORS_SHOWN:
+                error_lines += f"\n... and {len(errors) - IMPORT_ERRORS_SHOWN} more."
+            if not skip_invalid:
+                raise click.ClickException(
+                    f"Nothing was imported, because {len(errors)} row(s) are invalid:\n{error_lines}")
+            click.secho(f"Skipped {len(errors)} invalid row(s):\n{error_lines}", fg='yellow')
+
+        if imported_ids and self.is_session_stored():
+            try:
+                self._update_timesheets_from_odoo(
+                    self.timesheet_ids[timesheet_id] for timesheet_id in imported_ids)
+            except Exception as e:
+                for timesheet_id in imported_ids:
+                    self.outbox.enqueue(OP_UPDATE, timesheet_id)
+                click.secho(
+                    "Something went wrong when trying to update data from Odoo. "
+                    "The updates were queued, run 'ots sync' to try again.\n"
+                    f"{e}",
+                    fg='yellow',
+                    bold=True,
+                )
+        return len(imported_ids)
+
     def drop_timesheet(self, index):
-        date_offset, timesheet_index = self._split_index(index)
-        timesheet_date = datetime.date.today() - relativedelta.relativedelta(days=date_offset)
-        timesheet_ordinal = timesheet_date.toordinal()
-        timesheets = self.timesheets.get(timesheet_ordinal, [])
-        timesheet = timesheets.pop(timesheet_index)
-        self.timesheets[timesheet_ordinal] = timesheets
+        timesheet = self.get_timesheet_by_index(index)
+        self._remove_from_day(timesheet, timesheet.date)
+        self._unindex_timesheet(timesheet)
+        self.outbox.remove_timesheet(timesheet.id)
+        if self.current_running is timesheet:
+            self.current_running = None
+        if self.last_running is timesheet:
+            self.last_running = None
         click.echo(f"Dropped timesheet {repr(timesheet)}")
 
-    def print_date(self, date=None):
+    def is_archived(self, date):
+        """
+        :param datetime.date date:
+        :return bool: whether or not the timesheets of the date are archived
+        """
+        return bool(self.archived_before) and date.toordinal() < self.archived_before
+
+    def archive_timesheets(self, before):
+        """
+        Move the timesheets dated before a date out of the filestore, into
+        a separate read only archive for each year. Days with the running
+        timesheet, or with timesheets waiting in the outbox, are kept in the
+        filestore.
+
+        The archives are written and committed first, and only then are the
+        timesheets removed from the filestore when the current transaction
+        is committed. If anything fails in between, archiving again is
+        harmless.
+        :param datetime.date before: the first date not to archive
+        :return: number of timesheets archived
+        """
+        archives = getattr(self, '_v_archives', None)
+        if archives is None:
+            raise click.ClickException("Something went wrong, unable to find the archives.")
+
+        before_ordinal = before.toordinal()
+        waiting_ids = {entry.timesheet_id for entry in self.outbox.entries.values()}
+        days_by_year = defaultdict(list)
+        skipped_days = []
+        empty_days = []
+        for date_ordinal, day in self.timesheets.items(max=before_ordinal, excludemax=True):
+            if not day:
+                # Left behind by edits and drops before they were removed
+                empty_days.append(date_ordinal)
+                continue
+            if any(ts is self.current_running or ts.id in waiting_ids for ts in day):
+                skipped_days.append(date_ordinal)
+                continue
+            year = datetime.date.fromordinal(date_ordinal).year
+            days_by_year[year].append((date_ordinal, list(day)))
+
+        for date_ordinal in empty_days:
+            del self.timesheets[date_ordinal]
+
+        count = 0
+        for year, days in sorted(days_by_year.items()):
+            archives.archive_days(year, days)
+            for date_ordinal, timesheets in days:
+                for timesheet in timesheets:
+                    self._unindex_timesheet(timesheet)
+                    if self.last_running is timesheet:
+                        self.last_running = None
+                    count += 1
+                del self.timesheets[date_ordinal]
+            click.echo(f"Archived {sum(len(ts) for _o, ts in days)} timesheet(s) of {year} "
+                       f"into {archives.get_path(year)}")
+
+        if days_by_year:
+            self.archived_years = tuple(sorted(set(self.archived_years) | set(days_by_year)))
+        if skipped_days:
+            first_skipped = min(skipped_days)
+            click.secho(
+                f"Kept {len(skipped_days)} day(s) with a running timesheet or timesheets waiting "
+                f"to be synced to Odoo, starting from {datetime.date.fromordinal(first_skipped)}.",
+                fg='yellow',
+            )
+            before_ordinal = first_skipped
+        self.archived_before = max(self.archived_before or 0, before_ordinal)
+        return count
+
+    def print_date(self, date=None, show_ids=False):
+        from tabulate import tabulate
+
         ordinal_today = datetime.date.today().toordinal()
         if date is None:
             date_ordinal = ordinal_today
@@ -272,16 +1033,27 @@ class TimesheetFileStore(Persistent):
         date_offset = ordinal_today - date_ordinal
 
         timesheets_for_date = self.timesheets.get(date_ordinal, [])
-        weekday = calendar.day_name[date.weekday()]
+        day_totals = self.timesheet_totals
+        for archive in self._get_archives(date_ordinal, date_ordinal):
+            if date_ordinal in archive.timesheets:
+                timesheets_for_date = archive.timesheets[date_ordinal]
+                day_totals = archive.timesheet_totals
+        weekday = date.strftime('%A')
 
         headers = ["Project", "Task", "Description", "Duration"]
+        if show_ids:
+            headers.insert(0, "Id")
+
+        sync_state_colours = {
+            SYNC_STATE_NEW: "red",
+            SYNC_STATE_DIRTY: "yellow",
+            SYNC_STATE_SYNCED: "green",
+        }
 
         def get_coloured_duration(ts):
             dur = ts.get_formatted_duration(show_running=True)
             if ts.is_worktime:
-                # TODO: This doesn't care if the time has changed since last
-                #  push, so green is not always a sign of "good status"
-                colour = "green" if ts.odoo_id else "red"
+                colour = sync_state_colours[ts.get_sync_state()]
                 dur = click.style(dur, fg=colour)
             return dur
 
@@ -295,15 +1067,19 @@ class TimesheetFileStore(Persistent):
             ]
             for ts in timesheets_for_date
         ]
+        if show_ids:
+            table = [[f"#{ts.id}", *row] for ts, row in zip(timesheets_for_date, table)]
         # Generate values for the index column. This adds the date offset for
         # dates other than today.
         no_indices = len(table)
         index_prefix = str(date_offset) if date_offset else ""
         indices = [f"{index_prefix}.{i}" if index_prefix else str(i) for i in range(no_indices)]
 
-        # Total work time
-        worktime_sheets = [ts for ts in timesheets_for_date if ts.is_worktime]
-        total_duration = self.count_total_duration(worktime_sheets)
+        if day_totals is self.timesheet_totals:
+            total_duration = self.get_day_worktime(date_ordinal)
+        else:
+            archived_totals = day_totals.get_day(date_ordinal)
+            total_duration = archived_totals.worktime if archived_totals else datetime.timedelta()
 
         # We want to disable tabulate's number parsing on the index column
         # because it changes '4.0' to '4', which is not desired.
@@ -323,6 +1099,69 @@ class TimesheetFileStore(Persistent):
         )
         click.echo(f"Total Work Time: {format_timedelta(total_duration)}")
 
+    def _get_running_duration(self, date_ordinal):
+        """
+        :return: the time the running work timesheet of the date has been
+            running since it was started, which is not in the stored totals
+        """
+        running = self.current_running
+        if (running and running.is_worktime and running.is_running()
+                and running.date.toordinal() == date_ordinal):
+            return running.get_duration() - running.duration
+        return datetime.timedelta()
+
+    def get_day_worktime(self, date_ordinal):
+        """
+        :param int date_ordinal: ordinal of the date
+        :return: total work time of the date, including the running timesheet
+        """
+        totals = self.timesheet_totals.get_day(date_ordinal)
+        worktime = totals.worktime if totals else datetime.timedelta()
+        return worktime + self._get_running_duration(date_ordinal)
+
+    def print_report(self, date_min, date_max, group_by, output_format):
+        """
+        Print the work time of a date range (both limits inclusive), grouped
+        by project, task, day or week. The work time is summed up from the
+        daily totals, so the timesheets themselves are not loaded.
+        :param datetime.date date_min: first date to include
+        :param datetime.date date_max: last date to include
+        :param str group_by: one of `report.GROUP_BY_OPTIONS`
+        :param str output_format: one of `report.FORMAT_OPTIONS`
+        """
+        from .report import ReportAggregator, write_report
+
+        min_ordinal = date_min.toordinal()
+        max_ordinal = date_max.toordinal()
+        aggregator = ReportAggregator(group_by)
+        archives = self._get_archives(min_ordinal, max_ordinal)
+        for source in archives + [self]:
+            for date_ordinal, totals in source.timesheet_totals.days.items(min=min_ordinal, max=max_ordinal):
+                aggregator.add_day(date_ordinal, totals)
+
+        running = self.current_running
+        if running and min_ordinal <= running.date.toordinal() <= max_ordinal:
+            running_duration = self._get_running_duration(running.date.toordinal())
+            if running_duration:
+                aggregator.add_duration(
+                    running.date.toordinal(), running.project_id, running.task_code, running_duration)
+
+        def get_name(key):
+            if key is None:
+                return "(none)"
+            # The latest timesheet has the latest name
+            for source in [self] + archives[::-1]:
+                if group_by == 'project':
+                    timesheet_id = source.timesheet_index.get_latest_project_id(key)
+                else:
+                    timesheet_id = source.timesheet_index.get_latest_task_code_id(key)
+                if timesheet_id is not None:
+                    timesheet = source.timesheet_ids[timesheet_id]
+                    return timesheet.project_title if group_by == 'project' else timesheet.task_title
+            return ""
+
+        write_report(aggregator, get_name, date_min, date_max, output_format)
+
     @staticmethod
     def count_total_duration(timesheets):
         total_duration = datetime.timedelta()
@@ -372,6 +1211,8 @@ class TimesheetFileStore(Persistent):
         click.echo(f"Alias {name} deleted.")
 
     def print_aliases(self, include_details=False):
+        from tabulate import tabulate
+
         attributes = [
             ("Alias", "name"),
             ("Task Code", "task_code"),
@@ -401,15 +1242,12 @@ class TimesheetFileStore(Persistent):
         :param str name: name of an alias, or None to update all aliases
         """
         if self.is_session_stored():
-            if name is not None:
-                aliases = [self._get_alias(name)]
-            else:
-                aliases = self.aliases.values()
-
             try:
-                with click.progressbar(aliases) as alias_bar:
-                    for alias in alias_bar:
-                        alias.update(self)
+                if name is not None:
+                    alias = self._get_alias(name)
+                    alias.update(self._refresh_odoo_data(alias, with_employee=False))
+                else:
+                    self._update_all_aliases()
             except Exception as e:  # TODO: Guess
                 click.secho(
                     "Something went wrong when trying to update data from Odoo.\n"
@@ -421,6 +1259,23 @@ class TimesheetFileStore(Persistent):
             raise click.ClickException("Odoo session not available. To update data from Odoo, "
                                        "please log in with 'ots login'.")
 
+    def _update_all_aliases(self):
+        """
+        Update all aliases from Odoo, fetching all their tasks and projects
+        at once instead of alias by alias, even if they are cached.
+        """
+        aliases = list(self.aliases.values())
+        resolved = self.resolve_odoo_data(
+            task_codes=[alias.task_code for alias in aliases if alias.task_code],
+            project_ids=[alias.project_id for alias in aliases
+                         if not alias.task_code and alias.project_id],
+            with_employee=False,
+            refresh=True,
+        )
+        for alias in aliases:
+            alias.update(resolved)
+        click.echo(f"Updated {len(aliases)} alias(es).")
+
     # ============================
     # ===== Odoo connection ======
     # ============================
@@ -428,6 +1283,17 @@ class TimesheetFileStore(Persistent):
     def _get_odoo_session_name(self):
         return f"ots_{self.odoo_hostname}_{self.odoo_port}_{self.odoo_protocol}_{self.odoo_database}_{self.odoo_username}"
 
+    def get_odoo_connection(self):
+        """
+        :return OdooConnectionManager: the connection manager of the current
+            session, which lives as long as this process
+        """
+        session_name = self._get_odoo_session_name()
+        connection = getattr(self, '_v_odoo_connection', None)
+        if connection is None or connection.session_name != session_name:
+            connection = self._v_odoo_connection = OdooConnectionManager(session_name)
+        return connection
+
     def set_odoo_connection_details(self, protocol, hostname, port, database, username):
         self.odoo_protocol = protocol
         self.odoo_hostname = hostname
@@ -448,6 +1314,8 @@ class TimesheetFileStore(Persistent):
         :return:
         """
 
+        import odoorpc
+
         protocol = "jsonrpc+ssl" if ssl else "jsonrpc"
         odoo = odoorpc.ODOO(hostname, protocol=protocol, timeout=60, port=port)
 
@@ -481,43 +1349,488 @@ class TimesheetFileStore(Persistent):
                 username=username,
             )
             odoo.save(self._get_odoo_session_name())
+            self.get_odoo_connection().reset()
+            # The cached data might be from some other database
+            self.odoo_cache.clear()
+            self.last_pull_write_date = None
         return user_id
 
     def logout(self):
+        import odoorpc
+
         odoorpc.ODOO.remove(self._get_odoo_session_name())
+        self.get_odoo_connection().reset()
 
     def load_odoo_session(self):
-        return odoorpc.ODOO.load(self._get_odoo_session_name())
+        """
+        :return: odoorpc.ODOO of the stored session. The session is loaded
+            only once per process.
+        """
+        return self.get_odoo_connection().get_odoo()
 
     def is_session_stored(self):
-        return self._get_odoo_session_name() in odoorpc.ODOO.list()
+        return self.get_odoo_connection().is_session_stored()
 
-    def push(self, index, date):
-        created = []
-        wrote = []
+    def push(self, index=None, date_min=None, date_max=None, include_unchanged=False):
+        """
+        Push timesheets to Odoo. Either a single timesheet given by an index,
+        or all timesheets in the given date range (both limits inclusive).
+        If neither is given, today's timesheets are pushed.
+        The timesheets are queued in the outbox and pushed from there right
+        away. If Odoo can't be reached, they stay in the outbox until the
+        next `sync`.
+        :param str index: index of a single timesheet to push
+        :param datetime.date date_min: first date to push
+        :param datetime.date date_max: last date to push, defaults to `date_min`
+        :param bool include_unchanged: Also push the timesheets that have not
+            changed since they were last pushed.
+        """
         if index:
             timesheets = [self.get_timesheet_by_index(index)]
         else:
-            if not date:
-                date = datetime.date.today()
+            if not date_min:
+                date_min = datetime.date.today()
+            if not date_max:
+                date_max = date_min
 
-            date_ordinal = date.toordinal()
-            timesheets = self.timesheets.get(date_ordinal, [])
+            timesheets = itertools.chain.from_iterable(self.get_timesheets(date_min, date_max))
 
+        if not self.is_session_stored():
+            raise click.ClickException("Odoo session not available. To push timesheets to Odoo, "
+                                       "please log in with 'ots login'.")
+
+        unchanged = 0
+        for timesheet in timesheets:
+            if not timesheet.is_worktime:
+                continue
+            if not include_unchanged and timesheet.get_sync_state() == SYNC_STATE_SYNCED:
+                unchanged += 1
+                continue
+            self.outbox.enqueue(OP_PUSH, timesheet.id, include_unchanged=include_unchanged)
+
+        if unchanged:
+            click.echo(f"Skipped {unchanged} timesheet(s) unchanged since the last push.")
+        self.sync_outbox(retry_now=True, quiet=True)
+
+    def sync_outbox(self, retry_now=False, quiet=False, batch_size=OUTBOX_BATCH_SIZE):
+        """
+        Do the operations waiting in the outbox. Operations that fail are
+        retried by a later sync, after a delay that doubles with every
+        failed attempt.
+        :param bool retry_now: also retry the failed operations whose
+            delay hasn't passed yet
+        :param bool quiet: don't say anything if there is nothing to do
+        :param int batch_size: maximum number of timesheets pushed with a
+            single request
+        """
+        while True:
+            sync = self.prepare_outbox_sync(retry_now=retry_now, quiet=quiet, batch_size=batch_size)
+            if sync is None:
+                return
+            sync.run(self.load_odoo_session)
+            if not self.finish_outbox_sync(sync):
+                return
+
+    def prepare_outbox_sync(self, retry_now=False, quiet=False, batch_size=OUTBOX_BATCH_SIZE):
+        """
+        Read what the operations waiting in the outbox need to do in Odoo,
+        so that it can be done without the filestore, see `OutboxSync`.
+        Operations that another sync is already doing are left out.
+        :param bool retry_now: also the failed operations whose delay
+            hasn't passed yet
+        :param bool quiet: don't say anything if there is nothing to do
+        :param int batch_size: maximum number of timesheets pushed with a
+            single request
+        :return OutboxSync: or None if there is nothing to sync
+        """
+        now = datetime.datetime.now()
+        due_at = None if retry_now else now
+        updates, pushes = (
+            [
+                entry for entry in self.outbox.get_entries(operation, due_at=due_at)
+                if (entry.operation, entry.timesheet_id) not in _syncing_outbox_keys
+            ]
+            for operation in (OP_UPDATE, OP_PUSH)
+        )
+        if not updates and not pushes:
+            if not quiet:
+                self._print_outbox_state("Nothing to sync.")
+            return None
+
+        sync = OutboxSync(self.get_odoo_connection(), now)
+        update_pairs = self._get_outbox_timesheets(updates)
+        sync.update_ids = [timesheet.id for _entry, timesheet in update_pairs]
+        if update_pairs:
+            sync.task_codes, sync.project_ids, sync.with_employee = self._find_missing_update_data(
+                timesheet for _entry, timesheet in update_pairs)
+
+        to_push = []
+        unchanged = 0
+        for entry, timesheet in self._get_outbox_timesheets(pushes):
+            if not timesheet.is_pushable():
+                self.outbox.remove(entry)
+                continue
+            if not entry.include_unchanged and timesheet.get_sync_state() == SYNC_STATE_SYNCED:
+                unchanged += 1
+                self.outbox.remove(entry)
+                continue
+            adopt_since = None
+            if entry.maybe_created and not timesheet.odoo_id:
+                adopt_since = _to_odoo_datetime((entry.first_attempt or entry.queued) - ADOPT_CLOCK_SKEW)
+            to_push.append(_OutboxPush(timesheet.id, copy_timesheet(timesheet), adopt_since))
+        sync.push_batches = [
+            to_push[batch_start:batch_start + batch_size]
+            for batch_start in range(0, len(to_push), batch_size)
+        ]
+        if unchanged:
+            click.echo(f"Skipped {unchanged} timesheet(s) unchanged since the last push.")
+
+        sync.claim()
+        return sync
+
+    def finish_outbox_sync(self, sync):
+        """
+        Write the results of an `OutboxSync` that has run to the filestore,
+        and tell what was done.
+        :param OutboxSync sync: returned by `prepare_outbox_sync`
+        :return bool: whether or not some timesheets were left in the outbox
+            to be pushed again right away, by another sync
+        """
+        sync.release()
+        now = sync.now
+        failed = []
+
+        # Entries removed since, e.g. with their timesheet, have nothing to do
+        update_entries = [self.outbox.entries.get((OP_UPDATE, timesheet_id)) for timesheet_id in sync.update_ids]
+        update_entries = [entry for entry in update_entries if entry is not None]
+        update_error = sync.update_error or (sync.needs_fetch() and sync.connect_error)
+        if update_error:
+            for entry in update_entries:
+                self.outbox.mark_failed(entry, update_error, now)
+            failed.extend(update_entries)
+        elif update_entries:
+            self.cache_odoo_data(**sync.fetched)
+            updated = self.apply_cached_updates(sync.task_codes, sync.project_ids, entries=update_entries)
+            if updated:
+                click.echo(f"Updated {updated} timesheet(s) from Odoo.")
+
+        push_again = False
+        for push in itertools.chain.from_iterable(sync.push_batches):
+            timesheet = self.timesheet_ids.get(push.timesheet_id)
+            if timesheet is None:
+                # Dropped while it was pushed
+                continue
+            pushed = push.timesheet
+            if pushed.odoo_id and not timesheet.odoo_id:
+                timesheet.odoo_id = pushed.odoo_id
+            if pushed.odoo_pushed_vals is not push.pushed_vals:
+                timesheet.mark_pushed(pushed.odoo_pushed_vals)
+                if timesheet._get_odoo_timesheet_vals() == pushed.odoo_pushed_vals:
+                    # Round the duration the way it was pushed
+                    timesheet._get_odoo_timesheet_vals(round_duration=True)
+            error = push.error or sync.connect_error
+            if push.line_ids and not error:
+                error = self._adopt_created_line(timesheet, push)
+            self._index_timesheet(timesheet)
+            entry = self.outbox.entries.get((OP_PUSH, push.timesheet_id))
+            if entry is None:
+                continue
+            if error:
+                self.outbox.mark_failed(entry, error, now, maybe_created=not timesheet.odoo_id)
+                failed.append(entry)
+            elif push.line_ids and not timesheet.odoo_id:
+                # The lines found were linked to other timesheets after all
+                entry.maybe_created = False
+                push_again = True
+            elif timesheet.get_sync_state() != SYNC_STATE_SYNCED:
+                # Changed while it was pushed
+                push_again = True
+            else:
+                self.outbox.remove(entry)
+
+        if sync.created:
+            click.echo(f"New timesheets created with ids: {', '.join(map(str, sync.created))}")
+        if sync.wrote:
+            click.echo(f"Wrote changes to existing timesheets: {', '.join(map(str, sync.wrote))}")
+        if sync.connect_error:
+            self._print_outbox_state(f"Could not connect to Odoo: {sync.connect_error}", failed=True)
+        elif failed:
+            errors = sorted({entry.last_error for entry in failed})
+            self._print_outbox_state(
+                f"{len(failed)} operation(s) failed: {'; '.join(errors)}", failed=True)
+        return push_again
+
+    def _get_outbox_timesheets(self, entries):
+        """
+        :return: list of (entry, timesheet) pairs. Entries of timesheets that
+            no longer exist are removed from the outbox.
+        """
+        pairs = []
+        for entry in entries:
+            timesheet = self.timesheet_ids.get(entry.timesheet_id)
+            if timesheet is None:
+                self.outbox.remove(entry)
+            else:
+                pairs.append((entry, timesheet))
+        return pairs
+
+    def _adopt_created_line(self, timesheet, push):
+        """
+        A create that failed might have created the timesheet in Odoo anyway,
+        if the connection was lost before Odoo answered. `OutboxSync` looks
+        for identical timesheet lines created by the user since the first
+        failed attempt. Link the one that is not yet linked to any timesheet
+        instead of creating a duplicate. A line is only linked if it is the
+        only one left, as the others could have been added by hand or from
+        another machine.
+        :param _OutboxPush push: the push of the timesheet, with the lines found
+        :return str: the error if several lines match, and the timesheet
+            can't be pushed until the extra lines are removed from Odoo
+        """
+        line_ids = [line_id for line_id in push.line_ids if self.timesheet_index.get_odoo_id(line_id) is None]
+        if len(line_ids) == 1:
+            timesheet.odoo_id = line_ids[0]
+            timesheet.mark_pushed(push.adopt_vals)
+            if timesheet._get_odoo_timesheet_vals() == push.adopt_vals:
+                timesheet._get_odoo_timesheet_vals(round_duration=True)
+        elif line_ids:
+            return (f"Several lines in Odoo match timesheet #{timesheet.id}, which may have "
+                    f"been created by a push that failed. Remove the extra lines in Odoo, "
+                    f"and the remaining one is linked by the next sync.")
+        return None
+
+    def _print_outbox_state(self, message, failed=False):
+        queued = len(self.outbox)
+        if queued:
+            next_attempt = self.outbox.get_next_attempt()
+            message += (f" {queued} operation(s) are waiting in the outbox, the next one "
+                        f"will be tried after {next_attempt.strftime('%Y-%m-%d %H:%M')}. "
+                        f"Run 'ots sync' to try again.")
+        click.secho(message, fg='yellow' if failed else None, bold=failed)
+
+    def print_outbox(self):
+        from tabulate import tabulate
+
+        if not len(self.outbox):
+            click.echo("The outbox is empty.")
+            return
+
+        table = []
+        for entry in self.outbox.entries.values():
+            timesheet = self.timesheet_ids.get(entry.timesheet_id)
+            next_attempt = entry.next_attempt
+            table.append([
+                entry.operation,
+                f"#{entry.timesheet_id}",
+                limit_str_length(repr(timesheet) if timesheet else ""),
+                entry.attempts,
+                next_attempt.strftime('%Y-%m-%d %H:%M') if next_attempt else "now",
+                limit_str_length(entry.last_error),
+            ])
+        headers = ["Operation", "Id", "Timesheet", "Attempts", "Next attempt", "Last error"]
+        click.echo(tabulate(table, headers=headers, disable_numparse=True))
+
+    @staticmethod
+    def _odoo_push_batch(odoo, timesheets, include_unchanged=False):
+        """
+        Push the given timesheets to Odoo using as few RPC calls as possible.
+        All new timesheets are created with a single multi-record `create`,
+        and existing ones are written in groups of identical values.
+        :param odoo: odoorpc.ODOO authenticated to a database
+        :param timesheets: iterable of Timesheets
+        :param bool include_unchanged: Also write the timesheets that have not
+            changed since they were last pushed.
+        :return: tuple of lists (created Odoo ids, written Odoo ids,
+            skipped unchanged Odoo ids)
+        """
+        timesheet_model = odoo.env['account.analytic.line']
+
+        to_create = []
+        to_write = defaultdict(list)
+        unchanged = []
+        for timesheet in timesheets:
+            if not timesheet.is_pushable():
+                continue
+
+            if not include_unchanged and timesheet.get_sync_state() == SYNC_STATE_SYNCED:
+                unchanged.append(timesheet.odoo_id)
+                continue
+
+            timesheet_vals = timesheet._get_odoo_timesheet_vals(round_duration=True)
+            if timesheet.odoo_id:
+                # Group the writes by their values, so that timesheets with
+                # identical values can be written with a single call.
+                frozen_vals = tuple(sorted(timesheet_vals.items()))
+                to_write[frozen_vals].append(timesheet)
+            else:
+                to_create.append((timesheet, timesheet_vals))
+
+        created = []
+        if to_create:
+            vals_list = [timesheet_vals for _timesheet, timesheet_vals in to_create]
+            if _supports_create_multi(odoo):
+                new_ids = timesheet_model.create(vals_list)
+            else:
+                new_ids = [timesheet_model.create(timesheet_vals) for timesheet_vals in vals_list]
+
+            # Odoo returns the ids in the same order as the values were given
+            for (timesheet, timesheet_vals), new_id in zip(to_create, new_ids):
+                timesheet.odoo_id = new_id
+                timesheet.mark_pushed(timesheet_vals)
+                created.append(new_id)
+
+        wrote = []
+        for frozen_vals, write_timesheets in to_write.items():
+            odoo_ids = [timesheet.odoo_id for timesheet in write_timesheets]
+            timesheet_vals = dict(frozen_vals)
+            timesheet_model.write(odoo_ids, timesheet_vals)
+            for timesheet in write_timesheets:
+                timesheet.mark_pushed(timesheet_vals)
+            wrote.extend(odoo_ids)
+
+        return created, wrote, unchanged
+
+    @staticmethod
+    def _get_odoo_line_vals(line):
+        """
+        Convert a timesheet line read from Odoo to the format of
+        `TimeSheet._get_odoo_timesheet_vals`
+        """
+        def many2one_id(value):
+            return value[0] if value else None
+
+        return {
+            'project_id': many2one_id(line.get('project_id')),
+            'task_id': many2one_id(line.get('task_id')),
+            'employee_id': many2one_id(line.get('employee_id')),
+            'unit_amount': round(line.get('unit_amount') or 0.0, 2),
+            'date': line['date'],
+            'name': line.get('name') or "",
+        }
+
+    def pull(self, date_min=None, date_max=None, full=False, overwrite_local=False):
+        """
+        Fetch the user's timesheet lines from Odoo, and reconcile them with
+        the local timesheets by their Odoo id. Lines not found locally are
+        added as new timesheets. Lines changed in Odoo are applied to their
+        local timesheets, unless the local timesheet has also changed since
+        it was last pushed, which is reported as a conflict.
+
+        Only the lines written since the previous pull are fetched, unless
+        a full pull is requested. Pulls limited to a date range don't count
+        as previous pulls, as the lines outside the range were not fetched.
+        :param datetime.date date_min: first date to pull
+        :param datetime.date date_max: last date to pull
+        :param bool full: ignore the previous pulls
+        :param bool overwrite_local: apply the changes made in Odoo even if
+            the local timesheet has changed too
+        """
         odoo = self.load_odoo_session()
-        with click.progressbar(timesheets) as timesheet_bar:
-            for timesheet in timesheet_bar:
-                odoo_id = timesheet.odoo_id
-                new_id = timesheet.odoo_push(odoo)
-                if odoo_id:
-                    wrote.append(str(odoo_id))
-                elif new_id:
-                    created.append(str(new_id))
-
-        if created:
-            click.echo(f"New timesheets created with ids: {', '.join(created)}")
-        if wrote:
-            click.echo(f"Wrote possible changes to existing timesheets: {', '.join(wrote)}")
+        changed_since = None if full else self.last_pull_write_date
+        lines = fetch_timesheet_lines(
+            odoo,
+            self.get_odoo_employee_id(),
+            date_min=date_min,
+            date_max=date_max,
+            changed_since=changed_since,
+        )
+
+        # Task codes are not part of the lines, so find the tasks of the lines
+        # from the cache, and fetch the rest in one request
+        task_ids = {line['task_id'][0] for line in lines if line.get('task_id')}
+        task_codes = {}
+        missing_task_ids = []
+        for task_id in task_ids:
+            task_vals = self.odoo_cache.get_task(task_id)
+            if task_vals:
+                task_codes[task_id] = task_vals['code']
+            else:
+                missing_task_ids.append(task_id)
+        if missing_task_ids:
+            tasks = fetch_tasks(odoo, missing_task_ids)
+            self._cache_tasks(tasks)
+            task_codes.update((task_vals['id'], task_vals['code']) for task_vals in tasks)
+
+        added = []
+        updated = []
+        unchanged = []
+        conflicts = []
+        archived = []
+        for line in lines:
+            line_vals = self._get_odoo_line_vals(line)
+            odoo_vals = {
+                'task_code': task_codes.get(line_vals['task_id'], ""),
+                'task_title': line['task_id'][1] if line.get('task_id') else "",
+                'project_title': line['project_id'][1] if line.get('project_id') else "",
+            }
+            line_date = datetime.datetime.strptime(line_vals['date'], '%Y-%m-%d').date()
+            timesheet = self.get_timesheet_by_odoo_id(line['id'])
+            if timesheet is None and self.is_archived(line_date):
+                # Most likely an archived timesheet
+                archived.append(line)
+            elif timesheet is None:
+                timesheet = TimeSheet(date=line_date)
+                timesheet.odoo_id = line['id']
+                timesheet.apply_odoo_vals(line_vals, **odoo_vals)
+                self._add_timesheet(timesheet, update=False)
+                added.append(timesheet)
+            elif line_vals == timesheet.odoo_pushed_vals:
+                unchanged.append(timesheet)
+            elif timesheet.is_running() or (timesheet.is_dirty() and not overwrite_local):
+                conflicts.append((timesheet, line_vals, line.get('write_date')))
+            else:
+                old_date = timesheet.date
+                timesheet.apply_odoo_vals(line_vals, **odoo_vals)
+                if timesheet.date != old_date:
+                    self._move_timesheet(timesheet, old_date)
+                self._index_timesheet(timesheet)
+                updated.append(timesheet)
+
+        write_dates = [line['write_date'] for line in lines if line.get('write_date')]
+        if write_dates and date_min is None and date_max is None:
+            high_water_mark = max(write_dates + [self.last_pull_write_date or ""])
+            # Conflicting lines need to be fetched again by the next pull
+            conflict_write_dates = [write_date for _ts, _vals, write_date in conflicts if write_date]
+            if conflict_write_dates:
+                high_water_mark = min(high_water_mark, min(conflict_write_dates))
+            self.last_pull_write_date = high_water_mark
+
+        click.echo(f"Pulled {len(lines)} timesheet line(s) from Odoo: {len(added)} new, "
+                   f"{len(updated)} updated, {len(unchanged)} unchanged.")
+        if archived:
+            click.echo(f"Ignored {len(archived)} line(s) dated before the archived date "
+                       f"{datetime.date.fromordinal(self.archived_before).isoformat()}.")
+        if conflicts:
+            self._print_pull_conflicts(conflicts)
+
+    @staticmethod
+    def _print_pull_conflicts(conflicts):
+        from tabulate import tabulate
+
+        table = [
+            [
+                f"#{timesheet.id}",
+                timesheet.date.isoformat(),
+                limit_str_length(timesheet.description, 30),
+                timesheet.get_formatted_duration(show_running=True),
+                line_vals['date'],
+                limit_str_length(line_vals['name'], 30),
+                format_timedelta(datetime.timedelta(hours=line_vals['unit_amount'])),
+            ]
+            for timesheet, line_vals, _write_date in conflicts
+        ]
+        headers = [
+            "Id", "Local date", "Local description", "Local duration",
+            "Odoo date", "Odoo description", "Odoo duration",
+        ]
+        click.secho(
+            f"{len(conflicts)} timesheet(s) were changed both locally and in Odoo, and were "
+            f"not updated. Push them to keep the local changes, or pull again with "
+            f"--overwrite-local to keep the changes made in Odoo.",
+            fg='yellow',
+            bold=True,
+        )
+        click.echo(tabulate(table, headers=headers, disable_numparse=True))
 
     def print_odoo_search_results(self, search_term):
         raise NotImplementedError()
@@ -563,61 +1876,340 @@ class TimesheetFileStore(Persistent):
         result['project_ids'] = project_ids
         return result
 
-    def odoo_search_task(self, search_term):
+    @staticmethod
+    def _task_search_vals(task_vals):
+        """
+        Convert cached task values to the format Odoo's `read` returns them
+        """
+        return {
+            "code": task_vals["code"],
+            "name": task_vals["name"],
+            "project_id": [task_vals["project_id"], task_vals["project_title"]],
+            "stage_id": task_vals.get("stage", ""),
+            "id": task_vals["id"],
+        }
+
+    def local_search_task(self, search_term, limit=SEARCH_RESULT_LIMIT):
+        """
+        Search tasks and projects from the local cache. Matches task codes,
+        task names and project names, by whole words or their beginnings.
+        """
+        tasks = []
+        projects = []
+        for kind, values in self.odoo_cache.search(search_term):
+            if kind == 'task' and len(tasks) < limit:
+                tasks.append(self._task_search_vals(values))
+            elif kind == 'project' and len(projects) < limit:
+                projects.append(values)
+            if len(tasks) >= limit and len(projects) >= limit:
+                break
+
+        self._print_search_results(search_term, tasks, projects)
+
+    def odoo_search_task(self, search_term, remote=False):
+        """
+        Search tasks and projects. The search is done from the local cache
+        if the tasks and projects have been synced, unless a remote search
+        is requested.
+        :param str search_term:
+        :param bool remote: Search directly from Odoo
+        """
+        if not remote:
+            if self.odoo_cache.last_sync:
+                self.local_search_task(search_term)
+                return
+
+            # A perfect match by task code can be answered from the cache
+            # without contacting Odoo at all.
+            cached_task = self.odoo_cache.get_task_by_code(
+                search_term, ttl=self._get_cache_ttl())
+            if cached_task:
+                self._print_search_results(search_term, [self._task_search_vals(cached_task)], [])
+                return
+
         odoo = self.load_odoo_session()
         search_results = self._odoo_search_tasks_and_projects(search_term)
         project_ids = search_results.get('project_ids', [])
         task_ids = search_results.get('task_ids', [])
 
-        if not project_ids and not task_ids:
+        task_vals = []
+        if task_ids:
+            task_vals = odoo.env['project.task'].browse(task_ids).read(SEARCH_TASK_FIELDS)
+        project_vals = []
+        if project_ids:
+            project_vals = odoo.env['project.project'].browse(project_ids).read(
+                SEARCH_PROJECT_FIELDS)
+
+        self._print_search_results(search_term, task_vals, project_vals)
+
+    @staticmethod
+    def _print_search_results(search_term, task_vals, project_vals):
+        from tabulate import tabulate
+
+        if not project_vals and not task_vals:
             click.secho("No results found.", fg='yellow', bold=True)
             return
         else:
             click.secho(f"Search results for \"{search_term}\"", fg='green', bold=True)
 
         result_strings = []
-        if task_ids:
-
-            # read always returns id, even if we don't ask for it, but we use it as a header
-            # so simpler to include it here and reuse the fields-list as the table headers
-            task_fields = [
-                "code",
-                "name",
-                "project_id",
-                "stage_id",
-                "id",
-            ]
-            task_vals = odoo.env['project.task'].browse(task_ids).read(task_fields)
+        if task_vals:
             table = [
                 [
-                    limit_str_length(data[field]) for field in task_fields
+                    limit_str_length(data[field]) for field in SEARCH_TASK_FIELDS
                 ]
                 for data in task_vals
             ]
             ttitle = click.style("Tasks:", fg='green', bold=True)
-            ttable = tabulate(table, headers=task_fields)
+            ttable = tabulate(table, headers=SEARCH_TASK_FIELDS)
             task_result = f"{ttitle}\n{ttable}"
             result_strings.append(task_result)
 
-        if project_ids:
-            project_fields = [
-                "name",
-                "id",
-            ]
-            project_vals = odoo.env['project.project'].browse(project_ids).read(project_fields)
-
+        if project_vals:
             table = [
-                [limit_str_length(data[field]) for field in project_fields] for data in project_vals
+                [limit_str_length(data[field]) for field in SEARCH_PROJECT_FIELDS]
+                for data in project_vals
             ]
             ptitle = click.style("Projects:", fg='green', bold=True)
-            ptable = tabulate(table, headers=project_fields)
+            ptable = tabulate(table, headers=SEARCH_PROJECT_FIELDS)
             project_result = f"{ptitle}\n{ptable}"
             result_strings.append(project_result)
 
         if result_strings:
             click.echo("\n\n".join(result_strings))
 
+    # ============================
+    # =====  Odoo metadata  ======
+    # ============================
+
+    def _get_cache_ttl(self):
+        """
+        :return: time to live of cached Odoo data in seconds, or None if
+            cached data never expires
+        """
+        ttl_hours = self._get_config_value('cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS)
+        return ttl_hours * 3600 if ttl_hours else None
+
+    def _get_cache_max_entries(self):
+        return self._get_config_value('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES) or None
+
+    def _cache_tasks(self, tasks):
+        max_entries = self._get_cache_max_entries()
+        for task_vals in tasks:
+            self.odoo_cache.store_task(task_vals, max_entries=max_entries)
+            if task_vals['project_id']:
+                self.odoo_cache.store_project(
+                    {'id': task_vals['project_id'], 'name': task_vals['project_title']},
+                    max_entries=max_entries,
+                )
+
+    def _cache_projects(self, projects):
+        max_entries = self._get_cache_max_entries()
+        for project_vals in projects:
+            self.odoo_cache.store_project(project_vals, max_entries=max_entries)
+
+    def get_odoo_task(self, task_code):
+        """
+        Get the details of a task from the local cache, or from Odoo if
+        the task is not cached.
+        :param str task_code: Odoo task code
+        :return: dictionary of task values, or None if no such task exists
+        """
+        task_vals = self.odoo_cache.get_task_by_code(task_code, ttl=self._get_cache_ttl())
+        if task_vals is None:
+            tasks = fetch_tasks_by_code(self.load_odoo_session(), [task_code])
+            self._cache_tasks(tasks)
+            task_vals = next((t for t in tasks if t['code'] == task_code), None)
+        return task_vals
+
+    def get_odoo_project(self, project_id):
+        """
+        Get the details of a project from the local cache, or from Odoo if
+        the project is not cached.
+        :param int project_id: Odoo database id of the project
+        :return: dictionary of project values, or None if no such project exists
+        """
+        project_vals = self.odoo_cache.get_project(project_id, ttl=self._get_cache_ttl())
+        if project_vals is None:
+            projects = fetch_projects(self.load_odoo_session(), [project_id])
+            self._cache_projects(projects)
+            project_vals = projects[0] if projects else None
+        return project_vals
+
+    def get_odoo_employee_id(self):
+        """
+        :return: Odoo database id of the employee of the logged in user
+        """
+        session_name = self._get_odoo_session_name()
+        found, employee_id = self.odoo_cache.get_employee_id(
+            session_name, ttl=self._get_cache_ttl())
+        if not found:
+            employee_id = fetch_employee_id(self.load_odoo_session())
+            self.odoo_cache.store_employee_id(session_name, employee_id)
+        return employee_id
+
+    def refresh_odoo_cache(self):
+        """
+        Fetch all the currently cached tasks, projects and the employee
+        again from Odoo.
+        """
+        cache = self.odoo_cache
+        task_codes = list(cache.task_codes.keys())
+        project_ids = list(cache.projects.keys())
+
+        odoo = self.load_odoo_session()
+        tasks, projects, employee_id = _run_concurrently([
+            (fetch_tasks_by_code, (odoo, task_codes)),
+            (fetch_projects, (odoo, project_ids)),
+            (fetch_employee_id, (odoo,)),
+        ])
+
+        cache.clear()
+        self._cache_projects(projects)
+        self._cache_tasks(tasks)
+        cache.store_employee_id(self._get_odoo_session_name(), employee_id)
+        click.echo(f"Refreshed {len(tasks)} task(s) and {len(projects)} project(s).")
+
+    def sync_odoo_metadata(self, full=False):
+        """
+        Fetch the open tasks and the projects from Odoo into the local cache.
+        After the first sync, only the tasks and projects changed since the
+        previous sync are fetched, unless a full sync is requested.
+        :param bool full: fetch everything, replacing the ones fetched by the
+            previous syncs
+        """
+        cache = self.odoo_cache
+        changed_since = None if full else cache.sync_write_date
+
+        odoo = self.load_odoo_session()
+        projects = fetch_all_projects(odoo, changed_since=changed_since)
+        tasks = fetch_open_tasks(odoo, changed_since=changed_since)
+        if changed_since:
+            # Tasks that were changed, but are no longer open
+            open_task_ids = {task_vals['id'] for task_vals in tasks}
+            closed_task_ids = [
+                task_id for task_id in fetch_changed_task_ids(odoo, changed_since)
+                if task_id not in open_task_ids
+            ]
+            cache.update_synced(tasks, projects, closed_task_ids=closed_task_ids)
+            click.echo(f"Synced {len(tasks)} changed open task(s) and {len(projects)} "
+                       f"changed project(s) from Odoo.")
+        else:
+            cache.replace_synced(tasks, projects)
+            click.echo(f"Synced {len(tasks)} open task(s) and {len(projects)} project(s) from Odoo.")
+        cache.store_employee_id(self._get_odoo_session_name(), fetch_employee_id(odoo))
+
+    def clear_odoo_cache(self):
+        self.odoo_cache.clear()
+        click.echo("Cache cleared.")
+
+    def resolve_odoo_data(self, task_codes=(), project_ids=(), with_employee=True, refresh=False,
+                          cache_only=False):
+        """
+        Get the Odoo data of many tasks and projects at once. Whatever is not
+        in the local cache is fetched from Odoo with a single request for
+        the tasks and another one for the projects, made at the same time.
+        :param task_codes: iterable of task codes
+        :param project_ids: iterable of project database ids
+        :param bool with_employee: also get the employee of the user
+        :param bool refresh: fetch everything from Odoo, even if it is cached
+        :param bool cache_only: never contact Odoo
+        :return ResolvedOdooData: or None if `cache_only` is given and
+            something is not cached
+        """
+        ttl = self._get_cache_ttl()
+        tasks = []
+        missing_task_codes = []
+        for task_code in set(task_codes):
+            task_vals = None if refresh else self.odoo_cache.get_task_by_code(task_code, ttl=ttl)
+            if task_vals is None:
+                missing_task_codes.append(task_code)
+            else:
+                tasks.append(task_vals)
+        projects = []
+        missing_project_ids = []
+        for project_id in set(project_ids):
+            project_vals = None if refresh else self.odoo_cache.get_project(project_id, ttl=ttl)
+            if project_vals is None:
+                missing_project_ids.append(project_id)
+            else:
+                projects.append(project_vals)
+
+        if cache_only:
+            found, employee_id = self.odoo_cache.get_employee_id(
+                self._get_odoo_session_name(), ttl=ttl)
+            if missing_task_codes or missing_project_ids or (with_employee and not found):
+                return None
+            return ResolvedOdooData(tasks, projects, employee_id=employee_id)
+
+        if missing_task_codes or missing_project_ids:
+            odoo = self.load_odoo_session()
+            fetched_tasks, fetched_projects = _run_concurrently([
+                (fetch_tasks_by_code, (odoo, missing_task_codes)),
+                (fetch_projects, (odoo, missing_project_ids)),
+            ])
+            self._cache_tasks(fetched_tasks)
+            self._cache_projects(fetched_projects)
+            tasks.extend(fetched_tasks)
+            projects.extend(fetched_projects)
+
+        employee_id = self.get_odoo_employee_id() if with_employee else None
+        return ResolvedOdooData(tasks, projects, employee_id=employee_id)
+
+    def _refresh_odoo_data(self, record, with_employee=True):
+        """
+        Fetch the task or the project of a Timesheet or an alias from Odoo,
+        even if it is cached, to pick up the changes made in Odoo.
+        :return ResolvedOdooData: to give to the `update` of the record
+        """
+        return self.resolve_odoo_data(
+            task_codes=[record.task_code] if record.task_code else [],
+            project_ids=[record.project_id] if not record.task_code and record.project_id else [],
+            with_employee=with_employee,
+            refresh=True,
+        )
+
+    def _update_timesheets_from_odoo(self, timesheets, refresh=False):
+        """
+        Update many timesheets from Odoo, with their tasks and projects
+        fetched in a single batch. Timesheets without a task code or a project
+        have nothing to update.
+        :param timesheets: iterable of Timesheets
+        :param bool refresh: fetch the tasks and projects from Odoo even if
+            they are cached
+        :return: the number of timesheets updated
+        """
+        timesheets = [ts for ts in timesheets if ts.task_code or ts.project_id]
+        if not timesheets:
+            return 0
+        resolved = self.resolve_odoo_data(
+            task_codes=[ts.task_code for ts in timesheets if ts.task_code],
+            project_ids=[ts.project_id for ts in timesheets if not ts.task_code],
+            refresh=refresh,
+        )
+        for timesheet in timesheets:
+            timesheet.update(resolved)
+            self._index_timesheet(timesheet)
+        return len(timesheets)
+
+    def update_timesheets_odoo_data(self, date_min=None, date_max=None):
+        """
+        Update the task and project information of all the timesheets in
+        a date range from Odoo. The tasks and projects are fetched again
+        from Odoo, with one request for all the tasks and another for all
+        the projects.
+        :param datetime.date date_min: first date to update, or None to
+            start from the first timesheet
+        :param datetime.date date_max: last date to update, or None to
+            continue until the last timesheet
+        """
+        # Archived timesheets are read only
+        updated = self._update_timesheets_from_odoo(
+            self.iter_timesheets(date_min, date_max, include_archived=False), refresh=True)
+        click.echo(f"Updated {updated} timesheet(s).")
+
     def update_timesheet_odoo_data(self, index):
         timesheet = self.get_timesheet_by_index(index)
-        # TODO: Create a mass-update version with date-ranges or something.
-        timesheet.update(self)
+        # Asked for explicitly, so don't settle for the cache
+        timesheet.update(self._refresh_odoo_data(timesheet))
+        self._index_timesheet(timesheet)
@@ -0,0 +1,147 @@
+"""
+Reading timesheets to import from CSV and JSON Lines files. The files use
+the same fields as `ots export`, of which only the following are imported:
+
+date (required, YYYY-MM-DD), task_code, alias, description, duration (HH:mm),
+hours (used if there is no duration), project_id, task_id and is_worktime.
+"""
+import csv
+import datetime
+import json
+
+import click
+
+from .helpers import apply_duration_string
+
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+
+_TRUE_STRINGS = ('1', 'true', 'yes', 'y')
+_FALSE_STRINGS = ('0', 'false', 'no', 'n', '')
+
+
+class InvalidRowError(ValueError):
+    pass
+
+
+def guess_format(file_name):
+    """
+    :return: format of the file based on its extension, defaults to CSV
+    """
+    if file_name.endswith(('.jsonl', '.ndjson', '.json')):
+        return FORMAT_JSONL
+    return FORMAT_CSV
+
+
+def read_rows(file, file_format):
+    """
+    Read the rows of a file one at a time
+    :param file: open text file
+    :param str file_format: FORMAT_CSV or FORMAT_JSONL
+    :return: generator of (line number, row dictionary)
+    """
+    if file_format == FORMAT_CSV:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, InvalidRowError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, InvalidRowError("Expected a JSON object.")
+                continue
+            yield line_number, row
+
+
+def _get_str(row, field):
+    value = row.get(field)
+    return str(value).strip() if value is not None else ""
+
+
+def _get_int(row, field):
+    value = _get_str(row, field)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidRowError(f"{field} needs to be an integer, got {repr(value)}.")
+
+
+def _get_bool(row, field, default):
+    value = row.get(field)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in _TRUE_STRINGS:
+        return True
+    if value in _FALSE_STRINGS:
+        return False
+    raise InvalidRowError(f"{field} needs to be true or false, got {repr(value)}.")
+
+
+def _get_duration(row):
+    duration = _get_str(row, 'duration')
+    if duration:
+        try:
+            return apply_duration_string(duration)
+        except click.ClickException as e:
+            raise InvalidRowError(e.message)
+
+    hours = _get_str(row, 'hours')
+    if hours:
+        try:
+            return datetime.timedelta(hours=float(hours))
+        except ValueError:
+            raise InvalidRowError(f"hours needs to be a number, got {repr(hours)}.")
+    return datetime.timedelta()
+
+
+def parse_row(row, aliases):
+    """
+    Validate a row and convert it to the arguments of
+    `TimesheetFileStore.add_timesheet`
+    :param dict row: row read from the file
+    :param aliases: the aliases of the filestore
+    :return: dictionary of arguments
+    :raise InvalidRowError: if the row is not valid
+    """
+    if isinstance(row, InvalidRowError):
+        raise row
+
+    date_str = _get_str(row, 'date')
+    if not date_str:
+        raise InvalidRowError("date is required.")
+    try:
+        date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidRowError(f"date needs to be in the format YYYY-MM-DD, got {repr(date_str)}.")
+
+    task_code = _get_str(row, 'task_code')
+    alias = _get_str(row, 'alias')
+    if alias:
+        if alias not in aliases:
+            raise InvalidRowError(f"Alias {alias} does not exist.")
+        if task_code:
+            raise InvalidRowError("Give either a task code or an alias, not both.")
+        # Aliases are given to `add_timesheet` in place of the task code
+        task_code = alias
+
+    return {
+        'date': date,
+        'task_code': task_code,
+        'description': _get_str(row, 'description'),
+        'duration': _get_duration(row),
+        'project_id': _get_int(row, 'project_id'),
+        'task_id': _get_int(row, 'task_id'),
+        'is_worktime': _get_bool(row, 'is_worktime', default=True),
+    }
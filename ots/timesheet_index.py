@@ -0,0 +1,142 @@
+from persistent import Persistent
+from BTrees.IIBTree import IIBTree
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree, OOTreeSet
+
+
+# Largest timesheet id, used as the upper limit of (date ordinal, id) ranges
+_MAX_ID = 2 ** 31 - 1
+
+
+class TimesheetIndex(Persistent):
+    """
+    Secondary indexes of Timesheets by their task code, project and Odoo id.
+
+    Task codes and projects map to sets of (date ordinal, timesheet id)
+    pairs, so that the timesheets of a task or a project within a date range
+    can be found without going through all the timesheets of that range.
+
+    The indexed values of each timesheet are remembered, so that the
+    timesheet can be removed from the indexes even after its values
+    have changed.
+    """
+
+    def __init__(self):
+        self.task_codes = OOBTree()  # task code -> OOTreeSet of (date ordinal, id)
+        self.projects = IOBTree()  # project id -> OOTreeSet of (date ordinal, id)
+        self.odoo_ids = IIBTree()  # Odoo id -> timesheet id
+        self.indexed_values = IOBTree()  # timesheet id -> indexed values
+
+    @staticmethod
+    def _get_index_values(timesheet):
+        return (
+            timesheet.date.toordinal(),
+            timesheet.task_code or None,
+            timesheet.project_id or None,
+            timesheet.odoo_id or None,
+        )
+
+    @staticmethod
+    def _add_to_set(tree, key, value):
+        entries = tree.get(key)
+        if entries is None:
+            entries = tree[key] = OOTreeSet()
+        entries.add(value)
+
+    @staticmethod
+    def _remove_from_set(tree, key, value):
+        entries = tree.get(key)
+        if entries is None:
+            return
+        if value in entries:
+            entries.remove(value)
+        if not entries:
+            del tree[key]
+
+    def index(self, timesheet):
+        """
+        Add the timesheet to the indexes, or update its entries if it
+        is already indexed.
+        """
+        values = self._get_index_values(timesheet)
+        if self.indexed_values.get(timesheet.id) == values:
+            return
+        self.unindex(timesheet)
+
+        date_ordinal, task_code, project_id, odoo_id = values
+        entry = (date_ordinal, timesheet.id)
+        if task_code:
+            self._add_to_set(self.task_codes, task_code, entry)
+        if project_id:
+            self._add_to_set(self.projects, project_id, entry)
+        if odoo_id:
+            self.odoo_ids[odoo_id] = timesheet.id
+        self.indexed_values[timesheet.id] = values
+
+    def unindex(self, timesheet):
+        values = self.indexed_values.pop(timesheet.id, None)
+        if values is None:
+            return
+
+        date_ordinal, task_code, project_id, odoo_id = values
+        entry = (date_ordinal, timesheet.id)
+        if task_code:
+            self._remove_from_set(self.task_codes, task_code, entry)
+        if project_id:
+            self._remove_from_set(self.projects, project_id, entry)
+        if odoo_id and self.odoo_ids.get(odoo_id) == timesheet.id:
+            del self.odoo_ids[odoo_id]
+
+    @staticmethod
+    def _ids_in_range(entries, min_ordinal, max_ordinal):
+        if entries is None:
+            return
+        min_entry = (min_ordinal, 0) if min_ordinal is not None else None
+        max_entry = (max_ordinal, _MAX_ID) if max_ordinal is not None else None
+        for _date_ordinal, timesheet_id in entries.keys(min=min_entry, max=max_entry):
+            yield timesheet_id
+
+    def get_task_code_ids(self, task_code, min_ordinal=None, max_ordinal=None):
+        """
+        :return: generator of the ids of the timesheets with the task code,
+            in date order, optionally limited to a range of date ordinals
+        """
+        return self._ids_in_range(self.task_codes.get(task_code), min_ordinal, max_ordinal)
+
+    def get_project_ids(self, project_id, min_ordinal=None, max_ordinal=None):
+        """
+        :return: generator of the ids of the timesheets of the project,
+            in date order, optionally limited to a range of date ordinals
+        """
+        return self._ids_in_range(self.projects.get(project_id), min_ordinal, max_ordinal)
+
+    @staticmethod
+    def _latest_id(entries):
+        if not entries:
+            return None
+        _date_ordinal, timesheet_id = entries.maxKey()
+        return timesheet_id
+
+    def get_latest_task_code_id(self, task_code):
+        """
+        :return: id of the latest timesheet with the task code, or None
+        """
+        return self._latest_id(self.task_codes.get(task_code))
+
+    def get_latest_project_id(self, project_id):
+        """
+        :return: id of the latest timesheet of the project, or None
+        """
+        return self._latest_id(self.projects.get(project_id))
+
+    def get_odoo_id(self, odoo_id):
+        """
+        :return: id of the timesheet pushed to Odoo with the Odoo id, or None
+        """
+        return self.odoo_ids.get(odoo_id)
+
+    def clear(self):
+        self.task_codes.clear()
+        self.projects.clear()
+        self.odoo_ids.clear()
+        self.indexed_values.clear()
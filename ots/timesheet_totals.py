@@ -0,0 +1,134 @@
+import datetime
+
+from persistent import Persistent
+from BTrees.IOBTree import IOBTree
+
+
+def get_week_ordinal(date_ordinal):
+    """
+    :param int date_ordinal: ordinal of a date
+    :return: ordinal of the Monday of the date's week
+    """
+    # Ordinal 1 (0001-01-01) is a Monday
+    return date_ordinal - (date_ordinal - 1) % 7
+
+
+class DurationTotals(Persistent):
+    """
+    Summed work time of a set of Timesheets, in total, per project and per
+    task. Timesheets without a project or a task are summed under None.
+    """
+
+    def __init__(self):
+        self.worktime = datetime.timedelta()
+        self.timesheet_count = 0
+        self.projects = {}  # project id -> datetime.timedelta
+        self.tasks = {}  # task code -> datetime.timedelta
+
+    @staticmethod
+    def _add_to(sums, key, duration):
+        total = sums.get(key, datetime.timedelta()) + duration
+        if total:
+            sums[key] = total
+        else:
+            sums.pop(key, None)
+
+    def add(self, contribution, sign=1):
+        """
+        Add or subtract the contribution of a single Timesheet
+        :param tuple contribution: (project id, task code, duration)
+        :param int sign: 1 to add, -1 to subtract
+        """
+        project_id, task_code, duration = contribution
+        duration = duration * sign
+        self.worktime += duration
+        self.timesheet_count += sign
+        self._add_to(self.projects, project_id, duration)
+        self._add_to(self.tasks, task_code, duration)
+        # The dictionaries are not persistent by themselves
+        self._p_changed = True
+
+    def is_empty(self):
+        return self.timesheet_count <= 0
+
+
+class TimesheetTotals(Persistent):
+    """
+    Work time totals of every day and week, kept up to date one Timesheet
+    at a time, so that the total of a day or a week can be read without
+    going through its Timesheets.
+
+    The totals only include the duration stored on the Timesheets. The time
+    a running Timesheet has been running since it was started is not included.
+    """
+
+    def __init__(self):
+        self.days = IOBTree()  # date ordinal -> DurationTotals
+        self.weeks = IOBTree()  # ordinal of the Monday of the week -> DurationTotals
+        # timesheet id -> (date ordinal, contribution) currently in the totals
+        self.contributions = IOBTree()
+
+    @staticmethod
+    def _get_contribution(timesheet):
+        return (
+            timesheet.project_id or None,
+            timesheet.task_code or None,
+            timesheet.duration,
+        )
+
+    @staticmethod
+    def _get_totals(tree, key):
+        totals = tree.get(key)
+        if totals is None:
+            totals = tree[key] = DurationTotals()
+        return totals
+
+    def _apply(self, date_ordinal, contribution, sign):
+        for tree, key in ((self.days, date_ordinal), (self.weeks, get_week_ordinal(date_ordinal))):
+            totals = self._get_totals(tree, key)
+            totals.add(contribution, sign=sign)
+            if totals.is_empty():
+                del tree[key]
+
+    def update(self, timesheet):
+        """
+        Add the timesheet to the totals, or replace its previous values in
+        them. Timesheets that are not work time are not included.
+        """
+        if timesheet.is_worktime:
+            new = (timesheet.date.toordinal(), self._get_contribution(timesheet))
+        else:
+            new = None
+        old = self.contributions.get(timesheet.id)
+        if old == new:
+            return
+
+        if old is not None:
+            self._apply(*old, sign=-1)
+        if new is not None:
+            self._apply(*new, sign=1)
+            self.contributions[timesheet.id] = new
+        else:
+            self.contributions.pop(timesheet.id, None)
+
+    def remove(self, timesheet):
+        old = self.contributions.pop(timesheet.id, None)
+        if old is not None:
+            self._apply(*old, sign=-1)
+
+    def get_day(self, date_ordinal):
+        """
+        :return: DurationTotals of the date, or None if it has no work time
+        """
+        return self.days.get(date_ordinal)
+
+    def get_week(self, date_ordinal):
+        """
+        :return: DurationTotals of the week of the date, or None if it has no work time
+        """
+        return self.weeks.get(get_week_ordinal(date_ordinal))
+
+    def clear(self):
+        self.days.clear()
+        self.weeks.clear()
+        self.contributions.clear()
@@ -14,13 +14,15 @@ setup(
         'OdooRPC',
         'packaging',
         'persistent',
-        'python-dateutil',
         'tabulate',
         'ZODB',
     ],
+    extras_require={
+        'sqlite': ['RelStorage'],
+    },
     python_requires='>=3.6',
     entry_points='''
         [console_scripts]
-        ots=ots.cli:cli
+        ots=ots.client:main
     ''',
 )
@@ -63,3 +63,50 @@ class OtsCase(TestCase):
         except (OSError, IOError):
             pass
         super().tearDownClass()
+
+
+class FakeOdooModel:
+    """
+    Minimal stand-in for an odoorpc model proxy. Records every call made
+    through it and returns values from `responses` when given.
+    """
+
+    def __init__(self, odoo, name):
+        self.odoo = odoo
+        self.name = name
+
+    def __getattr__(self, method):
+        def rpc_method(*args, **kwargs):
+            self.odoo.calls.append((self.name, method, args, kwargs))
+            response = self.odoo.responses.get((self.name, method))
+            if callable(response):
+                return response(*args, **kwargs)
+            return response
+        return rpc_method
+
+
+class FakeOdoo:
+    """
+    Minimal stand-in for an authenticated `odoorpc.ODOO` that never touches
+    the network.
+    """
+
+    def __init__(self, version="13.0", uid=1, responses=None):
+        self.version = version
+        self.calls = []
+        self.responses = responses or {}
+        self.env = FakeOdooEnv(self, uid)
+
+    def calls_to(self, model, method):
+        return [call for call in self.calls if call[:2] == (model, method)]
+
+
+class FakeOdooEnv(dict):
+
+    def __init__(self, odoo, uid):
+        super().__init__()
+        self.odoo = odoo
+        self.uid = uid
+
+    def __missing__(self, model):
+        return FakeOdooModel(self.odoo, model)
@@ -0,0 +1,102 @@
+import csv
+import datetime
+import io
+import os
+from unittest import mock
+
+from ots.timesheet_filestore import TimesheetFileStore
+from . import common
+
+
+class TestArchive(common.OtsCase):
+
+    def setUp(self):
+        super().setUp()
+        self._add("T1", "old", datetime.date(2019, 12, 30), "2:00")
+        self._add("T1", "older", datetime.date(2018, 5, 2), "1:00")
+        self._add("T2", "kept", datetime.date(2020, 6, 1), "3:00")
+
+    def _add(self, task_code, description, date, duration):
+        result = self.runner.ots_invoke(
+            ['add', task_code, '-m', description, '--date', date.isoformat(), '-d', duration])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+    def _archive(self):
+        result = self.runner.ots_invoke(['archive', '--before', '2020-01-01'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result
+
+    def _export(self, *args):
+        result = self.runner.ots_invoke(['export', *args])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return [row['description'] for row in csv.DictReader(io.StringIO(result.output))]
+
+    def test_archive_and_read(self):
+        result = self._archive()
+        self.assertIn("Archived 2 timesheet(s).", result.output)
+        for year in (2018, 2019):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.tmp_config_dir, f"filestore-archive-{year}.fs")))
+
+        self.assertEqual(self._export(), ["older", "old", "kept"])
+        self.assertEqual(self._export('--from', '2020-01-01'), ["kept"])
+        self.assertEqual(self._export('--since-id', '1'), ["older", "kept"])
+
+        result = self.runner.ots_invoke(['list', '--date', '2019-12-30'])
+        self.assertIn("old", result.output)
+        self.assertIn("Total Work Time: 02:00", result.output)
+
+        result = self.runner.ots_invoke([
+            'report', '--from', '2018-01-01', '--to', '2020-12-31',
+            '--group-by', 'task', '--format', 'csv'])
+        rows = list(csv.DictReader(io.StringIO(result.output)))
+        self.assertEqual(
+            [(row['task_code'], row['duration']) for row in rows],
+            [("T1", "03:00"), ("T2", "03:00")],
+        )
+
+    def test_archive_to_archived_day(self):
+        self._archive()
+        self._add("T1", "same day", datetime.date(2019, 12, 30), "1:00")
+        result = self._archive()
+        self.assertIn("Archived 1 timesheet(s).", result.output)
+        self.assertEqual(self._export(), ["older", "old", "same day", "kept"])
+
+        result = self.runner.ots_invoke(['list', '--date', '2019-12-30'])
+        self.assertIn("Total Work Time: 03:00", result.output)
+
+    def test_archive_again(self):
+        self._archive()
+        self._add("T1", "late addition", datetime.date(2019, 3, 1), "1:00")
+        result = self._archive()
+        self.assertIn("Archived 1 timesheet(s).", result.output)
+        self.assertEqual(self._export(), ["older", "late addition", "old", "kept"])
+
+    def test_no_empty_archives(self):
+        # Moving the only timesheet of 2020-06-01 away leaves nothing on the day
+        result = self.runner.ots_invoke(['edit', '#3', '--date', '2021-01-04'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        result = self.runner.ots_invoke(['archive', '--before', '2020-06-02'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertNotIn("of 2020", result.output)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_config_dir, "filestore-archive-2020.fs")))
+        self.assertEqual(self._export('--from', '2020-01-01'), ["kept"])
+
+    def test_update_all_skips_archives(self):
+        self._archive()
+        odoo = common.FakeOdoo(responses={
+            ('project.task', 'search_read'): [
+                {'id': 5, 'code': "T2", 'name': "Task title", 'project_id': [7, "Project"]},
+            ],
+            ('hr.employee', 'search'): [3],
+        })
+        for name, value in (('is_session_stored', True), ('load_odoo_session', odoo)):
+            patcher = mock.patch.object(TimesheetFileStore, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        result = self.runner.ots_invoke(['update', '--all'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Updated 1 timesheet(s).", result.output)
+        self.assertEqual(len(odoo.calls_to('project.task', 'search_read')), 1)
+        self.assertEqual(self._export(), ["older", "old", "kept"])
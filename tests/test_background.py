@@ -0,0 +1,100 @@
+from unittest import mock
+
+import click
+
+from ots import background, cli
+from ots.timesheet_filestore import TimesheetFileStore
+from .common import FakeOdoo, OtsCase
+
+
+class TestBackgroundSync(OtsCase):
+
+    def test_spawned_after_commit(self):
+        patcher = mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch('ots.background.spawn_background_sync') as spawn:
+            result = self.runner.ots_invoke(['start', 'T1234'])
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            spawn.assert_called_once_with(self.tmp_config_dir)
+
+            result = self.runner.ots_invoke(['sync', '--list'])
+            self.assertIn("T1234", result.output)
+
+    def test_filestore_released_while_fetching(self):
+        with mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True), \
+                mock.patch('ots.background.spawn_background_sync') as spawn:
+            result = self.runner.ots_invoke(['add', 'T1234', '-d', '1:00'])
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            spawn.assert_called_once_with(self.tmp_config_dir)
+
+        def search_read(*args, **kwargs):
+            # Other commands can be run while Odoo is contacted
+            result = self.runner.ots_invoke(['list'])
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            return [{'id': 5, 'code': "T1234", 'name': "Task title", 'project_id': [7, "Project"]}]
+
+        odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): search_read,
+            ('hr.employee', 'search'): [3],
+        })
+        with mock.patch('ots.odoo_connection.OdooConnectionManager.is_session_stored',
+                        return_value=True), \
+                mock.patch('ots.odoo_connection.OdooConnectionManager.get_odoo',
+                           return_value=odoo):
+            background.main(self.tmp_config_dir)
+
+        self.assertEqual(len(odoo.calls_to('project.task', 'search_read')), 1)
+        result = self.runner.ots_invoke(['sync', '--list'])
+        self.assertNotIn("T1234", result.output)
+        _config, db = cli._do_setup(self.tmp_config_dir)
+        try:
+            with db.transaction() as connection:
+                timesheet = next(connection.root.timesheet_storage.iter_timesheets())
+                self.assertEqual(timesheet.task_id, 5)
+                self.assertEqual(timesheet.employee_id, 3)
+        finally:
+            db.close()
+
+    def test_wait_for_lock(self):
+        _config, db = cli._do_setup(self.tmp_config_dir)
+        try:
+            with self.assertRaises(click.ClickException):
+                cli._do_setup(self.tmp_config_dir, lock_wait=0.3, quiet=True)
+        finally:
+            db.close()
+        _config, db = cli._do_setup(self.tmp_config_dir, lock_wait=0)
+        db.close()
+
+    def test_unknown_task_not_retried(self):
+        with mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True), \
+                mock.patch('ots.background.spawn_background_sync'):
+            self.runner.ots_invoke(['add', 'NOPE', '-d', '1:00'])
+        result = self.runner.ots_invoke(['sync', '--list'])
+        self.assertIn("NOPE", result.output)
+
+        odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): [],
+            ('hr.employee', 'search'): [3],
+        })
+        with mock.patch('ots.odoo_connection.OdooConnectionManager.is_session_stored',
+                        return_value=True), \
+                mock.patch('ots.odoo_connection.OdooConnectionManager.get_odoo',
+                           return_value=odoo):
+            background.main(self.tmp_config_dir)
+
+        # Odoo has no such task, so there is nothing to wait for
+        result = self.runner.ots_invoke(['sync', '--list'])
+        self.assertNotIn("NOPE", result.output)
+
+    def test_spawn_detached(self):
+        with mock.patch('ots.background.subprocess.Popen') as popen:
+            with mock.patch('ots.background.os.name', 'posix'):
+                background.spawn_background_sync(self.tmp_config_dir)
+            self.assertTrue(popen.call_args[1]['start_new_session'])
+
+            with mock.patch('ots.background.os.name', 'nt'):
+                background.spawn_background_sync(self.tmp_config_dir)
+            kwargs = popen.call_args[1]
+            self.assertNotIn('close_fds', kwargs)
+            self.assertEqual(kwargs['creationflags'], 0x00000008)
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import click
+
+from ots import cli
+from ots.client import forward_command, is_daemon_supported, send_request
+from ots.daemon import OtsDaemon
+from .common import FakeOdoo
+
+
+@unittest.skipUnless(is_daemon_supported(), "Unix sockets are not supported")
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir, ignore_errors=True)
+        _config, self.db = cli._do_setup(self.config_dir)
+        self.addCleanup(self.db.close)
+
+        self.daemon = OtsDaemon(cli.cli, self.db, self.config_dir)
+        self.daemon.start()
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.addCleanup(self._stop_daemon)
+
+    def _stop_daemon(self):
+        if self.thread.is_alive():
+            self._send('daemon', 'stop')
+            self.thread.join(5)
+
+    def _send(self, *args):
+        return send_request(self.config_dir, {
+            'args': ['--config-dir', self.config_dir, *args],
+            'cwd': os.getcwd(),
+            'color': False,
+        })
+
+    def test_commands_run_in_daemon(self):
+        response = self._send('start', 'T1234', '-m', 'daemon test')
+        self.assertEqual(response['exit_code'], 0)
+        self.assertIn("Timesheet started: T1234, daemon test", response['stdout'])
+
+        response = self._send('list')
+        self.assertIn("daemon test", response['stdout'])
+        self.assertIn("(running)", response['stdout'])
+
+        response = self._send('daemon', 'status')
+        self.assertIn("is running", response['stdout'])
+
+    def test_errors(self):
+        response = self._send('edit', 'not an index')
+        self.assertEqual(response['exit_code'], 2)
+        self.assertIn("The index needs to be an integer", response['stderr'])
+
+        # Prompts are not possible through the daemon
+        response = self._send('drop', '0')
+        self.assertEqual(response['exit_code'], 1)
+        self.assertIn("not possible while the ots daemon is running", response['stderr'])
+
+        # Neither is reading the standard input of the client
+        response = self._send('import', '-', '--format', 'csv')
+        self.assertEqual(response['exit_code'], 1)
+        self.assertIn("read the standard input", response['stderr'])
+
+    def test_output_streamed(self):
+        for day in range(1, 6):
+            self._send('add', 'T1234', '-d', '1:00', '-m', f"Day {day}", '--date', f"2020-06-0{day}")
+        expected = self._send('export')['stdout']
+
+        received = []
+        with mock.patch('ots.daemon.OUTPUT_CHUNK_SIZE', 20):
+            response = send_request(self.config_dir, {
+                'args': ['--config-dir', self.config_dir, 'export'],
+                'cwd': os.getcwd(),
+                'color': False,
+            }, on_output=lambda name, text: received.append((name, text)))
+        self.assertEqual(response, {'exit_code': 0})
+        # Sent in pieces as the export goes, not all at once at the end
+        self.assertGreater(len(received), 1)
+        self.assertEqual(''.join(text for name, text in received if name == 'stdout'), expected)
+
+    def test_record_sent_right_away(self):
+        received = threading.Event()
+        seen_before_end = []
+
+        def export_timesheets(storage, *args, **kwargs):
+            click.echo("first record")
+            # The client gets the record while the command still goes on
+            seen_before_end.append(received.wait(5))
+
+        with mock.patch('ots.timesheet_filestore.TimesheetFileStore.export_timesheets',
+                        export_timesheets):
+            response = send_request(self.config_dir, {
+                'args': ['--config-dir', self.config_dir, 'export'],
+                'cwd': os.getcwd(),
+                'color': False,
+            }, on_output=lambda name, text: received.set())
+        self.assertEqual(response, {'exit_code': 0})
+        self.assertEqual(seen_before_end, [True])
+
+    def test_client_gone(self):
+        for day in range(1, 6):
+            self._send('add', 'T1234', '-d', '1:00', '-m', f"Day {day}", '--date', f"2020-06-0{day}")
+
+        # Like `ots export | head`
+        with mock.patch('ots.daemon.OUTPUT_CHUNK_SIZE', 20):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(self.daemon.socket_path)
+                client.sendall(json.dumps({'args': ['--config-dir', self.config_dir, 'export']}).encode())
+                client.shutdown(socket.SHUT_WR)
+
+            response = self._send('list')
+        self.assertEqual(response['exit_code'], 0)
+        self.assertTrue(self.thread.is_alive())
+
+    def test_sync_doesnt_block(self):
+        odoo_answers = threading.Event()
+
+        def search_read(*args, **kwargs):
+            odoo_answers.wait(5)
+            return [{'id': 5, 'code': "T1234", 'name': "Task title", 'project_id': [7, "Project"]}]
+
+        odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): search_read,
+            ('hr.employee', 'search'): [3],
+        })
+        with mock.patch('ots.odoo_connection.OdooConnectionManager.is_session_stored',
+                        return_value=True), \
+                mock.patch('ots.odoo_connection.OdooConnectionManager.get_odoo', return_value=odoo):
+            # Left to a sync, since the task is not cached
+            response = self._send('add', 'T1234', '-d', '1:00')
+            self.assertEqual(response['exit_code'], 0)
+
+            # Odoo is slow to answer the sync, but commands are answered
+            response = self._send('sync', '--list')
+            self.assertIn("T1234", response['stdout'])
+            self.assertIsNotNone(self.daemon.sync_thread)
+
+            odoo_answers.set()
+            self.daemon.sync_thread.join(5)
+            # Written to the filestore by the daemon, between the commands
+            for _attempt in range(50):
+                response = self._send('sync', '--list')
+                if "The outbox is empty" in response['stdout']:
+                    break
+            self.assertIn("The outbox is empty", response['stdout'])
+            response = self._send('list')
+            self.assertIn("Task title", response['stdout'])
+
+    def test_stop(self):
+        self._send('daemon', 'stop')
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.daemon.socket_path))
+        # Without a daemon, the client runs commands itself
+        self.assertIsNone(forward_command(['--config-dir', self.config_dir, 'list']))
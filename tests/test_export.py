@@ -0,0 +1,40 @@
+import csv
+import datetime
+import io
+import json
+
+from . import common
+
+
+class TestExport(common.OtsCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first_date = datetime.date(2020, 6, 2)
+        self._add("later", self.first_date)
+        self._add("earlier", self.first_date - datetime.timedelta(days=1))
+        self._add("latest", self.first_date + datetime.timedelta(days=1))
+
+    def _add(self, description, date):
+        result = self.runner.ots_invoke(
+            ['add', '-m', description, '--date', date.isoformat(), '-d', '1:15'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+    def test_csv_in_date_order(self):
+        result = self.runner.ots_invoke(['export'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        rows = list(csv.DictReader(io.StringIO(result.output)))
+        self.assertEqual([row['description'] for row in rows], ["earlier", "later", "latest"])
+        self.assertEqual(rows[0]['date'], "2020-06-01")
+        self.assertEqual(rows[0]['duration'], "01:15")
+
+    def test_jsonl_range_and_since_id(self):
+        result = self.runner.ots_invoke([
+            'export', '--format', 'jsonl', '--from', self.first_date.isoformat()])
+        records = [json.loads(line) for line in result.output.splitlines()]
+        self.assertEqual([record['description'] for record in records], ["later", "latest"])
+        self.assertEqual(records[0]['hours'], 1.25)
+
+        result = self.runner.ots_invoke(['export', '--format', 'jsonl', '--since-id', '1'])
+        records = [json.loads(line) for line in result.output.splitlines()]
+        self.assertEqual([record['id'] for record in records], [2, 3])
@@ -0,0 +1,94 @@
+import datetime
+from unittest import TestCase
+
+from ots.outbox import OP_UPDATE
+from ots.timesheet_filestore import TimesheetFileStore
+from ots.timesheet_import import read_rows
+from . import common
+from .common import FakeOdoo
+
+
+CSV_ROWS = """date,task_code,description,duration,is_worktime
+2020-06-01,T1,first,1:30,
+2020-06-02,,lunch,0:30,false
+2020-06-03,T2,third,2:00,true
+"""
+
+
+class TestImportCli(common.OtsCase):
+
+    def _write(self, name, content):
+        with open(name, 'w') as file:
+            file.write(content)
+        return name
+
+    def test_import_csv(self):
+        file_name = self._write('timesheets.csv', CSV_ROWS)
+        result = self.runner.ots_invoke(['import', file_name])
+        self.assertIn("Imported 3 timesheet(s).", result.output)
+
+        result = self.runner.ots_invoke(['export', '--format', 'jsonl'])
+        self.assertEqual(len(result.output.splitlines()), 3)
+        self.assertIn('"is_worktime": false', result.output)
+
+    def test_invalid_rows(self):
+        content = CSV_ROWS + "2020-13-01,T3,bad date,1:00,\n2020-06-04,T4,bad duration,1h,\n"
+        file_name = self._write('timesheets.csv', content)
+        result = self.runner.ots_invoke(['import', file_name])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("Line 5: date needs to be", result.output)
+        self.assertIn("Line 6: Both hours and minutes", result.output)
+        result = self.runner.ots_invoke(['export'])
+        self.assertEqual(len(result.output.splitlines()), 1)  # Only the header
+
+        result = self.runner.ots_invoke(['import', '--skip-invalid', file_name])
+        self.assertIn("Skipped 2 invalid row(s)", result.output)
+        self.assertIn("Imported 3 timesheet(s).", result.output)
+
+    def test_import_jsonl_alias(self):
+        self.runner.ots_invoke(['alias', 'add', 'meeting', '-m', 'Weekly meeting'])
+        file_name = self._write('timesheets.jsonl', '{"date": "2020-06-01", "alias": "meeting", "hours": 1}\n'
+                                                    '{"date": "2020-06-01", "alias": "missing"}\n')
+        result = self.runner.ots_invoke(['import', file_name])
+        self.assertIn("Line 2: Alias missing does not exist.", result.output)
+
+
+class TestImportResolution(TestCase):
+
+    def test_single_batch_resolution(self):
+        odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): [
+                {'id': 10, 'code': "T1", 'name': "Task 1", 'project_id': [5, "Project"]},
+                {'id': 11, 'code': "T2", 'name': "Task 2", 'project_id': [5, "Project"]},
+            ],
+            ('hr.employee', 'search'): [7],
+        })
+        storage = TimesheetFileStore()
+        storage.is_session_stored = lambda: True
+        storage.load_odoo_session = lambda: odoo
+
+        rows = read_rows(CSV_ROWS.splitlines(keepends=True), 'csv')
+        self.assertEqual(storage.import_timesheets(rows), 3)
+
+        self.assertEqual(len(odoo.calls_to('project.task', 'search_read')), 1)
+        self.assertEqual(len(odoo.calls_to('project.project', 'search_read')), 0)
+        timesheets = list(storage.find_timesheets(project_id=5))
+        self.assertEqual([ts.task_title for ts in timesheets], ["Task 1", "Task 2"])
+        self.assertEqual(timesheets[0].employee_id, 7)
+        self.assertEqual(timesheets[0].date, datetime.date(2020, 6, 1))
+
+    def test_failed_resolution_is_queued(self):
+        def search_read(*args, **kwargs):
+            raise ConnectionError("Odoo is down")
+
+        odoo = FakeOdoo(responses={('project.task', 'search_read'): search_read})
+        storage = TimesheetFileStore()
+        storage.is_session_stored = lambda: True
+        storage.load_odoo_session = lambda: odoo
+
+        rows = read_rows(CSV_ROWS.splitlines(keepends=True), 'csv')
+        self.assertEqual(storage.import_timesheets(rows), 3)
+        self.assertEqual(
+            sorted(entry.timesheet_id for entry in storage.outbox.get_entries(OP_UPDATE)),
+            sorted(storage.timesheet_ids.keys()),
+        )
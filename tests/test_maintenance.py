@@ -0,0 +1,38 @@
+import os
+from unittest import TestCase, mock
+
+from ots.maintenance import needs_auto_pack
+from . import common
+
+
+class TestPack(common.OtsCase):
+
+    def _filestore_path(self):
+        return os.path.join(self.tmp_config_dir, 'filestore.fs')
+
+    def test_pack_reclaims_old_revisions(self):
+        self.runner.ots_invoke(['add', 'T1', '-m', 'description 0'])
+        for i in range(1, 20):
+            result = self.runner.ots_invoke(['edit', '0', '-m', f'description {i}'])
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+        size_before = os.path.getsize(self._filestore_path())
+
+        result = self.runner.ots_invoke(['maintenance', 'pack', '--keep-days', '0'])
+        self.assertEqual(result.exit_code, 0, msg=result.output)
+        self.assertIn("reclaiming", result.output)
+        self.assertIn("The index is", result.output)
+        self.assertLess(os.path.getsize(self._filestore_path()), size_before)
+        self.assertFalse(os.path.exists(self._filestore_path() + '.old'))
+
+        result = self.runner.ots_invoke(['list'])
+        self.assertIn("description 19", result.output)
+
+
+class TestAutoPack(TestCase):
+
+    def test_growth_threshold(self):
+        db = mock.Mock()
+        db.storage.getSize.return_value = 3 * 1024 * 1024
+        self.assertFalse(needs_auto_pack(db, None, 0))
+        self.assertTrue(needs_auto_pack(db, None, 2))
+        self.assertFalse(needs_auto_pack(db, 2 * 1024 * 1024, 2))
@@ -0,0 +1,135 @@
+import datetime
+from unittest import TestCase
+
+from ZODB import DB
+from ZODB.MappingStorage import MappingStorage
+
+from ots.__about__ import __version__
+from ots.migration.migrate import check_and_migrate, count_migration_changes
+from ots.migration.migration_helpers import MigrationRun, STEP_DONE
+from ots.timesheet import TimeSheet
+from ots.timesheet_day import TimesheetDay
+from ots.timesheet_filestore import TimesheetFileStore
+
+
+class TestMigration(TestCase):
+
+    def _old_filestore(self):
+        """
+        A filestore the way version 0.2 stored it
+        """
+        filestore = TimesheetFileStore()
+        filestore.version = "0.2"
+        del filestore.odoo_cache
+        date = datetime.date(2020, 6, 1)
+        sheets = []
+        for description in ("first", "second"):
+            timesheet = TimeSheet(description=description, date=date)
+            del timesheet.odoo_pushed_vals
+            del timesheet.last_push
+            timesheet.id = filestore._get_next_id()
+            sheets.append(timesheet)
+        filestore.timesheets[date.toordinal()] = sheets
+        return filestore
+
+    def test_migrate_0_3(self):
+        filestore = self._old_filestore()
+        check_and_migrate(filestore)
+
+        self.assertEqual(filestore.version, __version__)
+        day = filestore.timesheets[datetime.date(2020, 6, 1).toordinal()]
+        self.assertIsInstance(day, TimesheetDay)
+        self.assertEqual([ts.description for ts in day], ["first", "second"])
+        self.assertIsNone(day[0].odoo_pushed_vals)
+        self.assertTrue(hasattr(filestore, 'odoo_cache'))
+
+    def test_datetime_upgraded_on_load(self):
+        state = TimeSheet().__getstate__()
+        state['date'] = datetime.datetime(2020, 6, 1)
+        loaded = TimeSheet.__new__(TimeSheet)
+        loaded.__setstate__(state)
+        self.assertIs(type(loaded.date), datetime.date)
+        self.assertEqual(loaded.date, datetime.date(2020, 6, 1))
+
+    def test_add_to_day(self):
+        filestore = TimesheetFileStore()
+        date = datetime.date(2020, 6, 1)
+        filestore.add_timesheet(description="first", date=date)
+        filestore.add_timesheet(description="second", date=date)
+        day = filestore.timesheets[date.toordinal()]
+        self.assertIsInstance(day, TimesheetDay)
+        self.assertEqual(len(day), 2)
+
+
+class TestChunkedMigration(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = DB(MappingStorage())
+        self.addCleanup(self.db.close)
+        self.first_date = datetime.date(2020, 6, 1)
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage = TimesheetFileStore()
+            filestore.version = "0.2"
+            for days in range(5):
+                date = self.first_date + datetime.timedelta(days=days)
+                timesheet = TimeSheet(description=f"day {days}", date=date)
+                # Stored the way versions before 0.3 did
+                del timesheet.odoo_pushed_vals
+                timesheet.id = filestore._get_next_id()
+                filestore.timesheets[date.toordinal()] = [timesheet]
+
+    def test_dry_run(self):
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage
+            # Five days converted and five timesheets indexed
+            self.assertEqual(count_migration_changes(filestore), [("0.3", 10)])
+            self.assertNotIsInstance(filestore.timesheets[self.first_date.toordinal()], TimesheetDay)
+            self.assertEqual(filestore.version, "0.2")
+
+    def test_lazy_defaults(self):
+        with self.db.transaction() as connection:
+            timesheet = connection.root.timesheet_storage.timesheets[self.first_date.toordinal()][0]
+            self.assertNotIn('odoo_pushed_vals', timesheet.__dict__)
+            self.assertIsNone(timesheet.odoo_pushed_vals)
+
+    def test_resume_interrupted(self):
+        migrated = []
+
+        def migrate_day(date_ordinal, sheets, dry_run):
+            if len(migrated) == 3:
+                raise KeyboardInterrupt
+            migrated.append(date_ordinal)
+            sheets[0].description += " migrated"
+            return 1
+
+        with self.assertRaises(KeyboardInterrupt):
+            with self.db.transaction() as connection:
+                filestore = connection.root.timesheet_storage
+                MigrationRun(filestore, chunk_size=2).for_each_day("test", migrate_day)
+
+        # The first chunk was committed
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage
+            self.assertEqual(filestore.migration_progress, {"test": migrated[1]})
+            descriptions = [day[0].description for day in filestore.timesheets.values()]
+            self.assertEqual(descriptions[:3], ["day 0 migrated", "day 1 migrated", "day 2"])
+
+        migrated.clear()
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage
+            MigrationRun(filestore, chunk_size=2).for_each_day("test", migrate_day)
+            self.assertEqual(len(migrated), 3)
+            self.assertEqual(filestore.migration_progress, {"test": STEP_DONE})
+
+    def test_migrate_in_chunks(self):
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage
+            check_and_migrate(filestore, chunk_size=2)
+            self.assertIsNone(filestore.migration_progress)
+
+        with self.db.transaction() as connection:
+            filestore = connection.root.timesheet_storage
+            self.assertEqual(filestore.version, __version__)
+            self.assertEqual(len(filestore.timesheet_ids), 5)
+            self.assertTrue(all(isinstance(day, TimesheetDay) for day in filestore.timesheets.values()))
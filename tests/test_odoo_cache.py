@@ -0,0 +1,256 @@
+import datetime
+import time
+from unittest import TestCase, mock
+
+from ZODB import DB
+
+from ots.odoo_cache import LRU_TOUCH_INTERVAL, OdooMetadataCache, fetch_open_tasks
+from ots.timesheet import TimeSheet
+from ots.timesheet_filestore import TimesheetFileStore
+from .common import FakeOdoo
+
+
+class TestOdooMetadataCache(TestCase):
+
+    @mock.patch('ots.odoo_cache.LRU_TOUCH_INTERVAL', 0)
+    def test_lru_eviction(self):
+        cache = OdooMetadataCache()
+        for project_id in range(1, 4):
+            cache.store_project({'id': project_id, 'name': f"P{project_id}"}, max_entries=3)
+        # Use the first one, so that the second one is the least recently used
+        self.assertTrue(cache.get_project(1))
+        cache.store_project({'id': 4, 'name': "P4"}, max_entries=3)
+
+        self.assertIsNone(cache.get_project(2))
+        for project_id in (1, 3, 4):
+            self.assertTrue(cache.get_project(project_id))
+        self.assertEqual(cache.size(), 3)
+
+    def test_hits_dont_write(self):
+        db = DB(None)
+        self.addCleanup(db.close)
+        with db.transaction() as connection:
+            connection.root.cache = OdooMetadataCache()
+            connection.root.cache.store_task({'id': 1, 'code': "T1", 'name': "Task"})
+        last_transaction = db.lastTransaction()
+
+        with db.transaction() as connection:
+            self.assertTrue(connection.root.cache.get_task_by_code("T1"))
+        self.assertEqual(db.lastTransaction(), last_transaction)
+
+        # Uses are still recorded once in a while, for the eviction
+        with mock.patch('time.time', return_value=time.time() + LRU_TOUCH_INTERVAL + 1), \
+                db.transaction() as connection:
+            self.assertTrue(connection.root.cache.get_task_by_code("T1"))
+        self.assertNotEqual(db.lastTransaction(), last_transaction)
+
+    def test_ttl(self):
+        cache = OdooMetadataCache()
+        cache.store_task({'id': 1, 'code': "T1", 'name': "Task"})
+        self.assertTrue(cache.get_task_by_code("T1", ttl=60))
+        cache.tasks[1].fetched = time.time() - 120
+        self.assertIsNone(cache.get_task_by_code("T1", ttl=60))
+        self.assertTrue(cache.get_task_by_code("T1", ttl=None))
+
+    def test_code_change(self):
+        cache = OdooMetadataCache()
+        cache.store_task({'id': 1, 'code': "T1", 'name': "Task"})
+        cache.store_task({'id': 1, 'code': "T2", 'name': "Task"})
+        self.assertIsNone(cache.get_task_by_code("T1"))
+        self.assertEqual(cache.get_task_by_code("T2")['id'], 1)
+        self.assertEqual(cache.size(), 1)
+
+
+class TestTimesheetUpdateCache(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): [
+                {'id': 5, 'code': "T1234", 'name': "Task title", 'project_id': [7, "Project"]},
+            ],
+            ('hr.employee', 'search'): [3],
+        })
+        self.storage = TimesheetFileStore()
+        patcher = mock.patch.object(
+            TimesheetFileStore, 'load_odoo_session', return_value=self.odoo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_update_warm_cache(self):
+        timesheet = TimeSheet(task_code="T1234")
+        timesheet.update(self.storage)
+        self.assertEqual(timesheet.task_id, 5)
+        self.assertEqual(timesheet.project_id, 7)
+        self.assertEqual(timesheet.project_title, "Project")
+        self.assertEqual(timesheet.employee_id, 3)
+        self.assertEqual(len(self.odoo.calls), 2)
+
+        self.odoo.calls.clear()
+        another = TimeSheet(task_code="T1234")
+        another.update(self.storage)
+        self.assertEqual(another.task_title, "Task title")
+        self.assertEqual(another.employee_id, 3)
+        self.assertFalse(self.odoo.calls, msg="A warm cache should not need Odoo")
+
+    def test_add_updates_in_background(self):
+        patcher = mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Cold cache: the update is left to a background sync
+        queued = self.storage.add_timesheet(task_code="T1234")
+        self.assertFalse(self.odoo.calls)
+        self.assertEqual(len(self.storage.outbox), 1)
+        self.assertTrue(self.storage.pop_background_sync_request())
+        self.assertFalse(self.storage.pop_background_sync_request())
+
+        self.storage.sync_outbox(quiet=True)
+        self.assertFalse(len(self.storage.outbox))
+        self.assertEqual(queued.task_title, "Task title")
+
+        # Warm cache: updated right away, still without Odoo
+        self.odoo.calls.clear()
+        timesheet = self.storage.add_timesheet(task_code="T1234")
+        self.assertFalse(self.odoo.calls)
+        self.assertFalse(len(self.storage.outbox))
+        self.assertFalse(self.storage.pop_background_sync_request())
+        self.assertEqual(timesheet.project_id, 7)
+        self.assertEqual(self.storage.timesheet_index.get_latest_project_id(7), timesheet.id)
+
+    def test_update_all_aliases_batched(self):
+        self.odoo.responses[('project.project', 'search_read')] = [{'id': 8, 'name': "Other"}]
+        patcher = mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for i in range(5):
+            self.storage.add_alias(f"task{i}", task_code="T1234")
+            self.storage.add_alias(f"project{i}", project_id=8)
+        self.storage.clear_odoo_cache()
+        self.odoo.calls.clear()
+
+        self.storage.update_alias(None)
+        self.assertEqual(len(self.odoo.calls_to('project.task', 'search_read')), 1)
+        self.assertEqual(len(self.odoo.calls_to('project.project', 'search_read')), 1)
+        self.assertEqual(len(self.odoo.calls), 2)
+        self.assertEqual(self.storage.aliases["task3"].project_title, "Project")
+        self.assertEqual(self.storage.aliases["project3"].project_title, "Other")
+
+    def test_update_all_aliases_warm_cache(self):
+        patcher = mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for i in range(3):
+            self.storage.add_alias(f"task{i}", task_code="T1234")
+        self.storage.update_alias(None)
+        # The task is renamed in Odoo while it is cached
+        self.odoo.responses[('project.task', 'search_read')] = [
+            {'id': 5, 'code': "T1234", 'name': "Renamed", 'project_id': [7, "Project"]},
+        ]
+        self.odoo.calls.clear()
+
+        self.storage.update_alias(None)
+        self.assertEqual(len(self.odoo.calls_to('project.task', 'search_read')), 1)
+        self.assertEqual(self.storage.aliases["task2"].task_title, "Renamed")
+
+    def test_explicit_update_refreshes(self):
+        timesheet = self.storage.add_timesheet(task_code="T1234", update=False)
+        self.storage.add_alias("a", task_code="T1234")
+        self.storage.get_odoo_task("T1234")
+        self.storage.get_odoo_employee_id()
+        # The task is renamed in Odoo after it was cached
+        self.odoo.responses[('project.task', 'search_read')] = [
+            {'id': 5, 'code': "T1234", 'name': "Renamed", 'project_id': [7, "Project"]},
+        ]
+        self.odoo.calls.clear()
+        patcher = mock.patch.object(TimesheetFileStore, 'is_session_stored', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.storage.update_timesheet_odoo_data('0')
+        self.storage.update_alias("a")
+        self.assertEqual(len(self.odoo.calls_to('project.task', 'search_read')), 2)
+        self.assertEqual(timesheet.task_title, "Renamed")
+        self.assertEqual(self.storage.aliases["a"].task_title, "Renamed")
+
+    def test_mass_update_range(self):
+        for day in range(1, 11):
+            self.storage.add_timesheet(
+                task_code="T1234", date=datetime.date(2020, 6, day), update=False)
+        self.storage.get_odoo_task("T1234")
+        self.storage.get_odoo_employee_id()
+        # The project is renamed in Odoo after it was cached
+        self.odoo.responses[('project.task', 'search_read')] = [
+            {'id': 5, 'code': "T1234", 'name': "Task title", 'project_id': [7, "Renamed"]},
+        ]
+        self.odoo.calls.clear()
+
+        self.storage.update_timesheets_odoo_data(datetime.date(2020, 6, 3), datetime.date(2020, 6, 10))
+        self.assertEqual(len(self.odoo.calls), 1)
+        titles = [ts.project_title for ts in self.storage.iter_timesheets()]
+        self.assertEqual(titles, [""] * 2 + ["Renamed"] * 8)
+
+
+class TestSyncMetadata(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tasks = [
+            {'id': i, 'code': f"T{i}", 'name': f"Task {i}", 'project_id': [1, "Project"],
+             'stage_id': [1, "New"]}
+            for i in range(1, 6)
+        ]
+        self.odoo = FakeOdoo(responses={
+            ('project.task', 'search_read'): self._read_tasks,
+            ('project.project', 'search_read'): [{'id': 1, 'name': "Project"}],
+            ('hr.employee', 'search'): [],
+        })
+        self.storage = TimesheetFileStore()
+        patcher = mock.patch.object(
+            TimesheetFileStore, 'load_odoo_session', return_value=self.odoo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _read_tasks(self, domain, fields, offset=0, limit=None, order=None):
+        return self.tasks[offset:offset + limit]
+
+    def test_paged_sync(self):
+        tasks = fetch_open_tasks(self.odoo, page_size=2)
+        self.assertEqual(len(tasks), 5)
+        self.assertEqual(len(self.odoo.calls_to('project.task', 'search_read')), 3)
+
+    def test_sync_replaces_and_pins(self):
+        self.storage.sync_odoo_metadata()
+        cache = self.storage.odoo_cache
+        self.assertEqual(cache.get_task_by_code("T3")['stage'], "New")
+        # Synced entries do not count towards the maximum size
+        self.assertEqual(cache.size(), 0)
+        cache.store_project({'id': 2, 'name': "Other"}, max_entries=1)
+        self.assertTrue(cache.get_task_by_code("T5"))
+
+        # A task that is no longer open disappears on the next sync
+        self.tasks.pop()
+        self.storage.sync_odoo_metadata()
+        self.assertIsNone(cache.get_task_by_code("T5"))
+        self.assertTrue(cache.get_task_by_code("T4"))
+
+    def test_incremental_sync(self):
+        for task_vals in self.tasks:
+            task_vals['write_date'] = "2020-01-01 00:00:00"
+        self.storage.sync_odoo_metadata()
+        cache = self.storage.odoo_cache
+        self.assertEqual(cache.sync_write_date, "2020-01-01 00:00:00")
+
+        # T1 was renamed, T2 was closed
+        self.tasks = [dict(self.tasks[0], name="Renamed", write_date="2020-02-01 00:00:00")]
+        self.odoo.responses[('project.task', 'search')] = [1, 2]
+        self.odoo.responses[('project.project', 'search_read')] = []
+        self.odoo.calls.clear()
+        self.storage.sync_odoo_metadata()
+
+        domain = self.odoo.calls_to('project.task', 'search_read')[0][2][0]
+        self.assertIn(('write_date', '>=', "2020-01-01 00:00:00"), domain)
+        self.assertEqual(cache.get_task_by_code("T1")['name'], "Renamed")
+        self.assertIsNone(cache.get_task_by_code("T2"))
+        self.assertTrue(cache.get_task_by_code("T3"))
+        self.assertEqual(cache.sync_write_date, "2020-02-01 00:00:00")
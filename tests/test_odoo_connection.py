@@ -0,0 +1,56 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ots.odoo_connection import OdooConnectionManager
+from ots.timesheet_filestore import TimesheetFileStore
+from .common import FakeOdoo
+
+
+class TestOdooConnectionManager(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        rc_fd, self.rc_file = tempfile.mkstemp()
+        os.close(rc_fd)
+        self.addCleanup(os.remove, self.rc_file)
+
+    def _write_sessions(self, *names):
+        with open(self.rc_file, 'w') as rc:
+            for name in names:
+                rc.write(f"[{name}]\ntype = ODOO\n\n")
+
+    def test_session_stored(self):
+        connection = OdooConnectionManager("ots_session", rc_file=self.rc_file)
+        self.assertFalse(connection.is_session_stored())
+        self._write_sessions("ots_session")
+        # Make sure the modification time changes
+        os.utime(self.rc_file, ns=(0, 10 ** 9))
+        self.assertTrue(connection.is_session_stored())
+
+    def test_session_loaded_once(self):
+        odoo = FakeOdoo()
+        odoo.json = lambda url, params: {}
+        connection = OdooConnectionManager("ots_session", rc_file=self.rc_file)
+        with mock.patch('odoorpc.ODOO.load', return_value=odoo) as load:
+            self.assertIs(connection.get_odoo(), odoo)
+            self.assertIs(connection.get_odoo(), odoo)
+            odoo.json('/web/dataset/call_kw', {})
+        self.assertEqual(load.call_count, 1)
+        stats = connection.get_stats()
+        self.assertEqual(stats['session_loads'], 1)
+        self.assertEqual(stats['requests'], 1)
+
+        connection.reset()
+        with mock.patch('odoorpc.ODOO.load', return_value=odoo) as load:
+            connection.get_odoo()
+        self.assertEqual(load.call_count, 1)
+
+    def test_filestore_connection_not_persisted(self):
+        storage = TimesheetFileStore()
+        connection = storage.get_odoo_connection()
+        self.assertIs(storage.get_odoo_connection(), connection)
+        self.assertNotIn('_v_odoo_connection', storage.__getstate__())
+
+        storage.odoo_username = "someone else"
+        self.assertIsNot(storage.get_odoo_connection(), connection)
@@ -0,0 +1,126 @@
+import datetime
+import itertools
+from unittest import TestCase
+
+from ots.outbox import Outbox, OP_PUSH, RETRY_BASE_DELAY
+from ots.timesheet_filestore import TimesheetFileStore
+from .common import FakeOdoo
+
+
+class TestOutbox(TestCase):
+
+    def test_enqueue_once_and_backoff(self):
+        outbox = Outbox()
+        entry = outbox.enqueue(OP_PUSH, 1)
+        self.assertIs(outbox.enqueue(OP_PUSH, 1), entry)
+        self.assertEqual(len(outbox), 1)
+
+        now = datetime.datetime(2020, 6, 1, 12)
+        outbox.mark_failed(entry, "offline", now)
+        outbox.mark_failed(entry, "offline", now)
+        self.assertEqual(entry.next_attempt, now + 2 * RETRY_BASE_DELAY)
+        self.assertFalse(outbox.get_entries(OP_PUSH, due_at=now))
+        self.assertEqual(outbox.get_entries(OP_PUSH, due_at=now + 2 * RETRY_BASE_DELAY), [entry])
+
+
+class TestOfflinePush(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.id_sequence = itertools.count(100)
+        self.offline = True
+        self.odoo = FakeOdoo(responses={
+            ('account.analytic.line', 'create'): self._create,
+            ('account.analytic.line', 'search'): [],
+        })
+        self.storage = TimesheetFileStore()
+        self.storage.is_session_stored = lambda: True
+        self.storage.load_odoo_session = lambda: self.odoo
+        for description in ("first", "second"):
+            self.storage.add_timesheet(
+                description=description, project_id=1, duration="1:00", update=False)
+
+    def _create(self, vals_list):
+        if self.offline:
+            raise ConnectionError("Odoo is down")
+        return [next(self.id_sequence) for _vals in vals_list]
+
+    def test_push_queued_until_online(self):
+        self.storage.push()
+        self.assertEqual(len(self.storage.outbox), 2)
+        entry = self.storage.outbox.get_entries(OP_PUSH)[0]
+        self.assertEqual(entry.attempts, 1)
+        self.assertTrue(entry.maybe_created)
+
+        # Not due yet
+        self.offline = False
+        self.storage.sync_outbox()
+        self.assertEqual(len(self.storage.outbox), 2)
+
+        self.storage.sync_outbox(retry_now=True)
+        self.assertFalse(len(self.storage.outbox))
+        self.assertEqual(self.storage.get_timesheet_by_odoo_id(100).description, "first")
+        # Looked for lines created by the failed attempt before creating again
+        self.assertEqual(len(self.odoo.calls_to('account.analytic.line', 'search')), 2)
+
+    def test_created_line_adopted(self):
+        self.storage.push()
+        self.odoo.responses[('account.analytic.line', 'search')] = [42]
+        self.offline = False
+        self.storage.sync_outbox(retry_now=True)
+
+        adopted = self.storage.get_timesheet_by_odoo_id(42)
+        self.assertEqual(adopted.description, "first")
+        # Only the timesheet without a matching line was created
+        create_calls = self.odoo.calls_to('account.analytic.line', 'create')
+        self.assertEqual(len(create_calls[-1][2][0]), 1)
+        self.assertFalse(len(self.storage.outbox))
+
+    def test_adoption_limited_to_failed_push(self):
+        self.storage.push()
+        entry = self.storage.outbox.get_entries(OP_PUSH)[0]
+        self.assertIsNotNone(entry.first_attempt)
+        self.offline = False
+        self.storage.sync_outbox(retry_now=True)
+
+        domain = self.odoo.calls_to('account.analytic.line', 'search')[0][2][0]
+        self.assertIn(('create_uid', '=', 1), domain)
+        created_since = [value for field, op, value in domain if field == 'create_date']
+        self.assertEqual(len(created_since), 1)
+        # In UTC, a little before the failed push in case the clocks differ
+        first_attempt_utc = entry.first_attempt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        self.assertLess(created_since[0], first_attempt_utc.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def test_several_matching_lines(self):
+        self.storage.push()
+        self.odoo.responses[('account.analytic.line', 'search')] = [42, 43]
+        self.offline = False
+        self.storage.sync_outbox(retry_now=True)
+
+        # Neither line is adopted, nor is the timesheet created again
+        self.assertIsNone(self.storage.get_timesheet_by_odoo_id(42))
+        self.assertFalse(self.odoo.calls_to('account.analytic.line', 'create')[1:])
+        entries = self.storage.outbox.get_entries(OP_PUSH)
+        self.assertEqual(len(entries), 2)
+        self.assertIn("Several lines in Odoo match", entries[0].last_error)
+
+    def test_changed_while_pushed(self):
+        self.offline = False
+        for timesheet in self.storage.iter_timesheets():
+            self.storage.outbox.enqueue(OP_PUSH, timesheet.id)
+        sync = self.storage.prepare_outbox_sync()
+        # Another sync leaves the timesheets being pushed alone
+        self.assertIsNone(self.storage.prepare_outbox_sync(quiet=True))
+
+        timesheet = self.storage.get_timesheet_by_index("0")
+        timesheet.description = "changed meanwhile"
+        sync.run(self.storage.load_odoo_session)
+        self.assertTrue(self.storage.finish_outbox_sync(sync))
+        self.assertTrue(timesheet.odoo_id)
+        self.assertEqual(len(self.storage.outbox), 1)
+
+        self.storage.sync_outbox()
+        self.assertFalse(len(self.storage.outbox))
+        write_call = self.odoo.calls_to('account.analytic.line', 'write')[-1]
+        self.assertEqual(write_call[2], ([timesheet.odoo_id], dict(timesheet.odoo_pushed_vals)))
+        self.assertEqual(timesheet.odoo_pushed_vals['name'], "changed meanwhile")
@@ -0,0 +1,82 @@
+import datetime
+from unittest import TestCase
+
+from ots.timesheet_filestore import TimesheetFileStore
+from ots.timesheet import SYNC_STATE_SYNCED
+from .common import FakeOdoo
+
+
+class TestPull(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.lines = []
+        self.odoo = FakeOdoo(responses={
+            ('account.analytic.line', 'search_read'): lambda *args, **kwargs: list(self.lines),
+            ('project.task', 'search_read'): [
+                {'id': 10, 'code': "T1", 'name': "Task", 'project_id': [5, "Project"]},
+            ],
+            ('hr.employee', 'search'): [7],
+        })
+        self.storage = TimesheetFileStore()
+        self.storage.is_session_stored = lambda: False
+        self.storage.load_odoo_session = lambda: self.odoo
+
+    def _line(self, odoo_id, name, hours, date="2020-06-01", write_date="2020-06-01 12:00:00"):
+        return {
+            'id': odoo_id,
+            'date': date,
+            'name': name,
+            'unit_amount': hours,
+            'project_id': [5, "Project"],
+            'task_id': [10, "Task"],
+            'employee_id': [7, "Me"],
+            'write_date': write_date,
+        }
+
+    def test_pull_new_and_changed(self):
+        self.lines = [self._line(100, "From Odoo", 1.5)]
+        self.storage.pull()
+
+        timesheet = self.storage.get_timesheet_by_odoo_id(100)
+        self.assertEqual(timesheet.task_code, "T1")
+        self.assertEqual(timesheet.duration, datetime.timedelta(hours=1.5))
+        self.assertEqual(timesheet.get_sync_state(), SYNC_STATE_SYNCED)
+        self.assertEqual(self.storage.last_pull_write_date, "2020-06-01 12:00:00")
+
+        # Changed in Odoo, and moved to another date
+        self.lines = [self._line(100, "Changed", 2, date="2020-06-02", write_date="2020-06-02 08:00:00")]
+        self.storage.pull()
+        self.assertEqual(timesheet.description, "Changed")
+        self.assertEqual(list(self.storage.timesheets[datetime.date(2020, 6, 2).toordinal()]), [timesheet])
+        self.assertNotIn(datetime.date(2020, 6, 1).toordinal(), self.storage.timesheets)
+
+        # The second pull only asked for lines changed since the first one
+        domain = self.odoo.calls_to('account.analytic.line', 'search_read')[-1][2][0]
+        self.assertIn(('write_date', '>=', "2020-06-01 12:00:00"), domain)
+        self.assertIn(('employee_id', '=', 7), domain)
+
+    def test_conflict(self):
+        self.lines = [self._line(100, "From Odoo", 1.5)]
+        self.storage.pull()
+        timesheet = self.storage.get_timesheet_by_odoo_id(100)
+        timesheet.description = "Changed locally"
+
+        self.lines = [self._line(100, "Changed in Odoo", 1.5, write_date="2020-06-03 00:00:00")]
+        self.storage.pull()
+        self.assertEqual(timesheet.description, "Changed locally")
+        # The conflicting line is fetched again by the next pull
+        self.assertEqual(self.storage.last_pull_write_date, "2020-06-03 00:00:00")
+
+        self.storage.pull(overwrite_local=True)
+        self.assertEqual(timesheet.description, "Changed in Odoo")
+
+    def test_date_range_keeps_high_water_mark(self):
+        self.lines = [self._line(100, "From Odoo", 1.5)]
+        self.storage.pull()
+
+        self.lines = [self._line(101, "Later", 1, date="2020-06-05", write_date="2020-06-05 08:00:00")]
+        self.storage.pull(date_min=datetime.date(2020, 6, 5), date_max=datetime.date(2020, 6, 5))
+        self.assertTrue(self.storage.get_timesheet_by_odoo_id(101))
+        # Lines of other dates changed meanwhile are still fetched by the next pull
+        self.assertEqual(self.storage.last_pull_write_date, "2020-06-01 12:00:00")
@@ -0,0 +1,95 @@
+import datetime
+import itertools
+from unittest import TestCase
+
+from ots.timesheet import TimeSheet
+from ots.timesheet_filestore import TimesheetFileStore
+from .common import FakeOdoo
+
+
+class TestBatchPush(TestCase):
+
+    def _create_ids(self, vals_list):
+        return [next(self.id_sequence) for _vals in vals_list]
+
+    def setUp(self):
+        super().setUp()
+        self.id_sequence = itertools.count(100)
+        self.odoo = FakeOdoo(responses={
+            ('account.analytic.line', 'create'): self._create_ids,
+        })
+
+    def _timesheet(self, description, odoo_id=None, project_id=1, duration_hours=1):
+        timesheet = TimeSheet(
+            project_id=project_id,
+            description=description,
+            duration=datetime.timedelta(hours=duration_hours),
+            date=datetime.date(2020, 6, 1),
+        )
+        timesheet.odoo_id = odoo_id
+        return timesheet
+
+    def test_single_create_for_new_timesheets(self):
+        timesheets = [self._timesheet(f"new {i}") for i in range(5)]
+        created, wrote, _unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, timesheets)
+
+        create_calls = self.odoo.calls_to('account.analytic.line', 'create')
+        self.assertEqual(len(create_calls), 1)
+        self.assertEqual(len(create_calls[0][2][0]), 5)
+        self.assertEqual(created, [100, 101, 102, 103, 104])
+        self.assertEqual([ts.odoo_id for ts in timesheets], created)
+        self.assertFalse(wrote)
+
+    def test_writes_grouped_by_values(self):
+        timesheets = [
+            self._timesheet("same", odoo_id=1),
+            self._timesheet("same", odoo_id=2),
+            self._timesheet("different", odoo_id=3),
+        ]
+        created, wrote, _unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, timesheets)
+
+        write_calls = self.odoo.calls_to('account.analytic.line', 'write')
+        self.assertEqual(len(write_calls), 2)
+        written_ids = sorted(call[2][0] for call in write_calls)
+        self.assertEqual(written_ids, [[1, 2], [3]])
+        self.assertEqual(sorted(wrote), [1, 2, 3])
+        self.assertFalse(created)
+
+    def test_unpushable_skipped(self):
+        lunch = self._timesheet("Lunch")
+        lunch.is_worktime = False
+        no_project = self._timesheet("no project", project_id=None)
+        created, wrote, _unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, [lunch, no_project])
+        self.assertFalse(self.odoo.calls)
+        self.assertFalse(created or wrote)
+
+    def test_create_per_record_on_old_odoo(self):
+        self.odoo.version = "11.0"
+        self.odoo.responses[('account.analytic.line', 'create')] = lambda vals: next(
+            self.id_sequence)
+        timesheets = [self._timesheet(f"new {i}") for i in range(2)]
+        created, _wrote, _unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, timesheets)
+        self.assertEqual(len(self.odoo.calls_to('account.analytic.line', 'create')), 2)
+        self.assertEqual(created, [100, 101])
+
+    def test_unchanged_skipped(self):
+        timesheet = self._timesheet("pushed")
+        TimesheetFileStore._odoo_push_batch(self.odoo, [timesheet])
+        self.odoo.calls.clear()
+
+        created, wrote, unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, [timesheet])
+        self.assertFalse(self.odoo.calls)
+        self.assertEqual(unchanged, [timesheet.odoo_id])
+
+        timesheet.edit(description="changed")
+        created, wrote, unchanged = TimesheetFileStore._odoo_push_batch(self.odoo, [timesheet])
+        self.assertEqual(wrote, [timesheet.odoo_id])
+        self.assertFalse(unchanged)
+
+    def test_resend_unchanged(self):
+        timesheet = self._timesheet("pushed")
+        TimesheetFileStore._odoo_push_batch(self.odoo, [timesheet])
+        _created, wrote, unchanged = TimesheetFileStore._odoo_push_batch(
+            self.odoo, [timesheet], include_unchanged=True)
+        self.assertEqual(wrote, [timesheet.odoo_id])
+        self.assertFalse(unchanged)
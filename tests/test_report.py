@@ -0,0 +1,55 @@
+import csv
+import datetime
+import io
+import json
+
+from . import common
+
+
+class TestReport(common.OtsCase):
+
+    def setUp(self):
+        super().setUp()
+        self.monday = datetime.date(2020, 6, 1)
+        self._add("T1", self.monday, "2:00")
+        self._add("T2", self.monday, "1:30")
+        self._add("T1", self.monday + datetime.timedelta(days=7), "3:00")
+        self._add("T1", self.monday - datetime.timedelta(days=1), "5:00")
+
+    def _add(self, task_code, date, duration):
+        result = self.runner.ots_invoke(
+            ['add', task_code, '-m', 'work', '--date', date.isoformat(), '-d', duration])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+    def _report(self, *args):
+        return self.runner.ots_invoke([
+            'report',
+            '--from', self.monday.isoformat(),
+            '--to', (self.monday + datetime.timedelta(days=13)).isoformat(),
+            *args,
+        ])
+
+    def test_group_by_task_csv(self):
+        result = self._report('--group-by', 'task', '--format', 'csv')
+        self.assertEqual(result.exit_code, 0, result.output)
+        rows = list(csv.DictReader(io.StringIO(result.output)))
+        self.assertEqual(
+            [(row['task_code'], row['duration']) for row in rows],
+            [("T1", "05:00"), ("T2", "01:30")],
+        )
+
+    def test_group_by_week_json(self):
+        result = self._report('--group-by', 'week', '--format', 'json')
+        report = json.loads(result.output)
+        self.assertEqual(
+            [(row['week'], row['hours']) for row in report['rows']],
+            [("2020-W23", 3.5), ("2020-W24", 3.0)],
+        )
+        self.assertEqual(report['total']['duration'], "06:30")
+
+    def test_table(self):
+        result = self._report('--group-by', 'day')
+        self.assertIn("2020-06-01", result.output)
+        self.assertIn("Monday", result.output)
+        self.assertNotIn("2020-05-31", result.output)
+        self.assertIn("Total Work Time: 06:30", result.output)
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from ots.odoo_cache import OdooMetadataCache
+from ots.search_index import SearchIndex, tokenize
+
+
+class TestSearchIndex(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = OdooMetadataCache()
+        self.cache.store_project({'id': 1, 'name': "Internal Development"})
+        self.cache.store_project({'id': 2, 'name': "Customer Portal"})
+        self.cache.store_task({
+            'id': 10, 'code': "T1234", 'name': "Uncrash production",
+            'project_id': 1, 'project_title': "Internal Development",
+        })
+        self.cache.store_task({
+            'id': 11, 'code': "T2000", 'name': "Portal development",
+            'project_id': 2, 'project_title': "Customer Portal",
+        })
+
+    def _found(self, search_term):
+        return [(kind, values['id']) for kind, values in self.cache.search(search_term)]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Uncrash production, NOW!"), ["uncrash", "production", "now"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_code_match_first(self):
+        self.assertEqual(self._found("t1234")[0], ('task', 10))
+
+    def test_prefix(self):
+        self.assertEqual(self._found("uncr"), [('task', 10)])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self._found("portal dev"), [('task', 11)])
+        self.assertEqual(self._found("portal nothing"), [])
+
+    def test_ranking(self):
+        # The task named "development" beats the task whose project is named so
+        found = self._found("development")
+        self.assertLess(found.index(('task', 11)), found.index(('task', 10)))
+        self.assertIn(('project', 1), found)
+
+    def test_reindex_and_remove(self):
+        self.cache.store_task({
+            'id': 10, 'code': "T1234", 'name': "Renamed",
+            'project_id': 1, 'project_title': "Internal Development",
+        })
+        self.assertEqual(self._found("uncrash"), [])
+        self.assertEqual(self._found("renamed"), [('task', 10)])
+        self.cache.clear()
+        self.assertEqual(self._found("renamed"), [])
+
+    def test_empty_terms_removed(self):
+        index = SearchIndex()
+        index.index_document(('task', 1), [("unique", 1)])
+        index.unindex_document(('task', 1))
+        self.assertNotIn("unique", index.terms)
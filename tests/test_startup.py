@@ -0,0 +1,88 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from ots.startup_benchmark import run_startup_benchmark
+
+
+# Generous budget for importing `ots.cli`, to catch regressions such as
+# a heavy dependency being imported at module level again, without
+# failing on slow CI machines. Can be overridden with an environment variable.
+IMPORT_BUDGET_MS = int(os.environ.get('OTS_IMPORT_BUDGET_MS', 1500))
+
+# Modules that the quick commands should never need
+HEAVY_MODULES = ('odoorpc', 'tabulate', 'dateutil')
+
+
+def run_with_importtime(code):
+    """
+    Run the code in a new interpreter with `-X importtime`.
+    :return: dictionary of imported module name -> cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert result.returncode == 0, result.stderr
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_time, cumulative, module = line[len('import time:'):].split('|')
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime needs Python 3.7")
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir, ignore_errors=True)
+
+    def _run_command(self, *args):
+        code = (
+            "from ots.cli import cli\n"
+            f"cli({['--config-dir', self.config_dir, *args]!r}, standalone_mode=False)\n"
+        )
+        return run_with_importtime(code)
+
+    def assertNotImported(self, import_times, modules=HEAVY_MODULES):
+        for module in modules:
+            self.assertNotIn(module, import_times, msg=f"{module} should be imported lazily")
+
+    def test_import_cli(self):
+        import_times = run_with_importtime("import ots.cli")
+        self.assertNotImported(import_times)
+        self.assertLess(
+            import_times['ots.cli'] / 1000, IMPORT_BUDGET_MS,
+            msg="Importing ots.cli took longer than the budget",
+        )
+
+    def test_quick_commands(self):
+        self.assertNotImported(self._run_command('start', 'T1234'))
+        self.assertNotImported(self._run_command('stop'))
+        # Listing prints a table, but still never needs odoorpc
+        self.assertNotImported(self._run_command('list'), modules=('odoorpc', 'dateutil'))
+
+    def test_up_to_date_filestore_not_migrated(self):
+        self._run_command('start', 'T1234')
+        # The filestore is up to date, so checking its version is enough
+        self.assertNotImported(self._run_command('stop'), modules=('ots.migration.migrate', 'packaging'))
+
+    def test_startup_benchmark(self):
+        results = run_startup_benchmark(runs=1)
+        self.assertGreater(results['stop_ms'], 0)
+        self.assertGreater(results['migration_import_ms'], 0)
+
+    def test_import_client(self):
+        # The entry point should not import anything heavy before it knows
+        # if the command is run by the daemon
+        import_times = run_with_importtime("import ots.client")
+        self.assertNotImported(import_times, modules=('ZODB', 'click', 'ots.cli'))
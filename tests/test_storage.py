@@ -0,0 +1,92 @@
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import unittest
+from unittest import TestCase
+
+import click
+from ZODB import DB
+
+from ots.storage import open_storage
+from ots.storage_benchmark import run_benchmark
+from . import common
+
+
+class TestStorageBackends(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.filestore_path = self.work_dir / 'filestore.fs'
+
+    def _read(self, storage_config):
+        db = DB(open_storage(storage_config, self.filestore_path))
+        with db.transaction() as connection:
+            value = getattr(connection.root, 'value', None)
+        db.close()
+        return value
+
+    def _write_and_read(self, storage_config):
+        db = DB(open_storage(storage_config, self.filestore_path))
+        with db.transaction() as connection:
+            connection.root.value = 42
+        db.close()
+        return self._read(storage_config)
+
+    def test_file_is_default(self):
+        self.assertEqual(self._write_and_read(None), 42)
+        self.assertTrue(self.filestore_path.exists())
+
+    def test_memory_is_not_kept(self):
+        self.assertIsNone(self._write_and_read({'backend': 'memory'}))
+        self.assertFalse(self.filestore_path.exists())
+
+    def test_demo_changes_on_top(self):
+        changes_path = self.work_dir / 'changes.fs'
+        self.assertEqual(self._write_and_read({'backend': 'demo', 'changes': str(changes_path)}), 42)
+        # The filestore itself was not written to
+        self.assertIsNone(self._read({'backend': 'file'}))
+        self.assertIsNone(self._read({'backend': 'demo'}))
+
+    @unittest.skipIf(importlib.util.find_spec('relstorage') is None, "RelStorage is not installed")
+    def test_sqlite(self):
+        data_dir = self.work_dir / 'data'
+        self.assertEqual(self._write_and_read({'backend': 'sqlite', 'data_dir': str(data_dir)}), 42)
+        self.assertTrue(data_dir.exists())
+        self.assertFalse(self.filestore_path.exists())
+
+        # Next to the filestore by default
+        self.assertEqual(self._write_and_read({'backend': 'sqlite'}), 42)
+        self.assertTrue(self.filestore_path.with_suffix('.sqlite').exists())
+
+    def test_unknown_backend(self):
+        with self.assertRaises(click.ClickException):
+            open_storage({'backend': 'nosuch'}, self.filestore_path)
+
+    def test_benchmark(self):
+        results = run_benchmark(['file', 'memory', 'demo'], timesheet_count=50, commits=2)
+        self.assertEqual([result['backend'] for result in results], ['file', 'memory', 'demo'])
+        for result in results:
+            self.assertEqual(result['timesheets'], 52)
+        self.assertIsNone(results[1]['open_ms'])
+
+
+class TestStorageConfig(common.OtsCase):
+
+    def test_memory_backend(self):
+        with open(os.path.join(self.tmp_config_dir, 'config.json'), 'w') as config_file:
+            json.dump({'storage': {'backend': 'memory'}}, config_file)
+        result = self.runner.ots_invoke(['start', 'T1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_config_dir, 'filestore.fs')))
+
+    def test_demo_without_changes_warns(self):
+        with open(os.path.join(self.tmp_config_dir, 'config.json'), 'w') as config_file:
+            json.dump({'storage': {'backend': 'demo'}}, config_file)
+        result = self.runner.ots_invoke(['start', 'T1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("none of the changes are kept", result.output)
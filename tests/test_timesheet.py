@@ -15,3 +15,13 @@ class TestBasics(unittest.TestCase):
         self.assertIsNot(t_sheet, copy_sheet)
         self.assertNotEqual(t_sheet.date, copy_sheet.date)
         self.assertEqual(copy_sheet.date, new_date)
+
+    def test_sync_state(self):
+        t_sheet = timesheet.TimeSheet(project_id=1, description="test")
+        self.assertEqual(t_sheet.get_sync_state(), timesheet.SYNC_STATE_NEW)
+        t_sheet.odoo_id = 1
+        self.assertEqual(t_sheet.get_sync_state(), timesheet.SYNC_STATE_DIRTY)
+        t_sheet.mark_pushed(t_sheet._get_odoo_timesheet_vals())
+        self.assertEqual(t_sheet.get_sync_state(), timesheet.SYNC_STATE_SYNCED)
+        t_sheet.edit(duration="01:00")
+        self.assertEqual(t_sheet.get_sync_state(), timesheet.SYNC_STATE_DIRTY)
@@ -0,0 +1,43 @@
+import datetime
+from . import common
+
+
+class TestTimesheetIds(common.OtsCase):
+
+    def test_reference_by_id(self):
+        two_days_ago = datetime.date.today() - datetime.timedelta(days=2)
+        self.runner.ots_invoke(['add', '-m', 'first'])
+        self.runner.ots_invoke(['add', '-m', 'second', '--date', two_days_ago.isoformat()])
+
+        result = self.runner.ots_invoke(['list', '3', '--ids'])
+        self.assertIn("#1", result.output)
+        self.assertIn("#2", result.output)
+
+        result = self.runner.ots_invoke(['edit', '#2', '-m', 'edited'])
+        self.assertIn("Timesheet updated.", result.output)
+        result = self.runner.ots_invoke(['list', '3'])
+        self.assertIn("edited", result.output)
+
+        result = self.runner.ots_invoke(['drop', '-f', '#1'])
+        self.assertIn("Dropped timesheet first", result.output)
+        result = self.runner.ots_invoke(['list', '3'])
+        self.assertNotIn("first", result.output)
+
+        result = self.runner.ots_invoke(['edit', '#1', '-m', 'gone'])
+        self.assertIn("No timesheet with id 1.", result.output)
+        result = self.runner.ots_invoke(['edit', '#one', '-m', 'gone'])
+        self.assertIn("needs to be an integer", result.output)
+
+    def test_move_date(self):
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        self.runner.ots_invoke(['add', '-m', 'moving'])
+        result = self.runner.ots_invoke(['edit', '#1', '--date', yesterday.isoformat()])
+        self.assertEqual(result.exit_code, 0)
+
+        result = self.runner.ots_invoke(['list'])
+        self.assertNotIn("moving", result.output)
+        result = self.runner.ots_invoke(['list', '--date', yesterday.isoformat()])
+        self.assertIn("moving", result.output)
+        # Yesterday's first timesheet is now at index 1.0
+        result = self.runner.ots_invoke(['edit', '1.0', '-m', 'moved'])
+        self.assertIn("Timesheet updated.", result.output)
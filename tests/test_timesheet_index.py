@@ -0,0 +1,58 @@
+import datetime
+from unittest import TestCase
+
+from ots.timesheet_filestore import TimesheetFileStore
+
+
+class TestTimesheetIndex(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.storage = TimesheetFileStore()
+        self.storage.is_session_stored = lambda: False
+
+    def _add(self, description, date, task_code="", project_id=None):
+        return self.storage.add_timesheet(
+            task_code=task_code,
+            description=description,
+            date=date,
+            project_id=project_id,
+        )
+
+    def test_find_by_task_code_and_project(self):
+        first = self._add("first", datetime.date(2020, 6, 3), task_code="T1", project_id=5)
+        second = self._add("second", datetime.date(2020, 6, 1), task_code="T1", project_id=5)
+        other = self._add("other", datetime.date(2020, 6, 2), task_code="T2", project_id=6)
+
+        # In date order, not in the order they were added
+        self.assertEqual(list(self.storage.find_timesheets(task_code="T1")), [second, first])
+        self.assertEqual(list(self.storage.find_timesheets(project_id=6)), [other])
+        found = self.storage.find_timesheets(
+            task_code="T1", date_min=datetime.date(2020, 6, 2), date_max=datetime.date(2020, 6, 3))
+        self.assertEqual(list(found), [first])
+
+        self.assertIs(
+            self.storage.find_timesheet(datetime.date(2020, 6, 2), project_id=6), other)
+        self.assertIsNone(
+            self.storage.find_timesheet(datetime.date(2020, 6, 2), project_id=5))
+        self.assertIs(
+            self.storage.find_timesheet(datetime.date(2020, 6, 1), description="second"), second)
+
+    def test_reindexed_after_changes(self):
+        timesheet = self._add("moving", datetime.date(2020, 6, 1), task_code="T1", project_id=5)
+
+        self.storage.edit_timesheet(f"#{timesheet.id}", date=datetime.date(2020, 7, 1))
+        timesheet.task_code = "T2"
+        self.storage._index_timesheet(timesheet)
+        self.assertFalse(list(self.storage.find_timesheets(task_code="T1")))
+        self.assertEqual(list(self.storage.find_timesheets(
+            task_code="T2", date_min=datetime.date(2020, 7, 1))), [timesheet])
+
+        timesheet.odoo_id = 42
+        self.storage._index_timesheet(timesheet)
+        self.assertIs(self.storage.get_timesheet_by_odoo_id(42), timesheet)
+
+        self.storage.drop_timesheet(f"#{timesheet.id}")
+        self.assertFalse(list(self.storage.find_timesheets(project_id=5)))
+        self.assertIsNone(self.storage.get_timesheet_by_odoo_id(42))
+        self.assertFalse(self.storage.timesheet_index.indexed_values)
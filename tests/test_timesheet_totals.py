@@ -0,0 +1,59 @@
+import datetime
+from unittest import TestCase
+
+from ots.timesheet_filestore import TimesheetFileStore
+from ots.timesheet_totals import get_week_ordinal
+
+
+class TestTimesheetTotals(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.storage = TimesheetFileStore()
+        self.storage.is_session_stored = lambda: False
+        self.monday = datetime.date(2020, 6, 1)
+
+    def _add(self, description, date, hours, **kwargs):
+        return self.storage.add_timesheet(
+            description=description, date=date, duration=datetime.timedelta(hours=hours), **kwargs)
+
+    def test_totals_follow_changes(self):
+        totals = self.storage.timesheet_totals
+        tuesday = self.monday + datetime.timedelta(days=1)
+        first = self._add("first", self.monday, 2, task_code="T1", project_id=5)
+        self._add("second", tuesday, 3, task_code="T2", project_id=5)
+        self._add("lunch", self.monday, 1, is_worktime=False)
+
+        monday_totals = totals.get_day(self.monday.toordinal())
+        self.assertEqual(monday_totals.worktime, datetime.timedelta(hours=2))
+        self.assertEqual(monday_totals.tasks, {"T1": datetime.timedelta(hours=2)})
+        week_totals = totals.get_week(tuesday.toordinal())
+        self.assertEqual(week_totals.worktime, datetime.timedelta(hours=5))
+        self.assertEqual(week_totals.projects, {5: datetime.timedelta(hours=5)})
+
+        self.storage.edit_timesheet(f"#{first.id}", duration="+1:00", date=tuesday)
+        self.assertIsNone(totals.get_day(self.monday.toordinal()))
+        self.assertEqual(totals.get_day(tuesday.toordinal()).worktime, datetime.timedelta(hours=6))
+
+        self.storage.drop_timesheet(f"#{first.id}")
+        self.assertEqual(totals.get_day(tuesday.toordinal()).tasks, {"T2": datetime.timedelta(hours=3)})
+
+    def test_running_timesheet_added_live(self):
+        today = datetime.date.today()
+        self.storage.add_and_start_timesheet(description="running", date=today)
+        running = self.storage.current_running
+        running.start_time -= datetime.timedelta(minutes=30)
+
+        self.assertFalse(self.storage.timesheet_totals.get_day(today.toordinal()).worktime)
+        self.assertGreaterEqual(
+            self.storage.get_day_worktime(today.toordinal()), datetime.timedelta(minutes=30))
+
+        self.storage.stop_running()
+        self.assertGreaterEqual(
+            self.storage.timesheet_totals.get_day(today.toordinal()).worktime,
+            datetime.timedelta(minutes=30))
+
+    def test_week_ordinal(self):
+        sunday = self.monday + datetime.timedelta(days=6)
+        self.assertEqual(get_week_ordinal(sunday.toordinal()), self.monday.toordinal())
+        self.assertEqual(get_week_ordinal(self.monday.toordinal()), self.monday.toordinal())